@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""文件系统活动记录
+
+监控线程把每个事件追加到固定容量的环形缓冲区，并按监控目录累计每秒的事件数（最近 WINDOW 秒），
+事件风暴中内存占用也保持不变，超出容量的旧事件被丢弃，只计入总数。
+record() 只持有很短的锁，不等待界面；有新事件时只在空闲转为有待处理事件时调用一次 on_pending，
+界面取走待处理的事件（take_pending）后才会再次通知，多个事件因此合并为一次刷新。
+"""
+import threading
+import time
+from collections import Counter, deque
+
+CAPACITY = 10000
+WINDOW = 60  # 每个监控目录保留的每秒事件数的秒数
+RATE_SECONDS = 10  # 事件/秒按最近这么多秒平均
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+KIND_LABELS = {"created": "创建", "deleted": "删除", "modified": "修改", "moved": "移动", "error": "无法访问"}
+
+
+def describe(event):
+    """事件的说明文字，如 "修改: /path/file" """
+    _, _, kind, path, dest = event
+    if dest:
+        return f"{KIND_LABELS[kind]}: {path} -> {dest}"
+    return f"{KIND_LABELS[kind]}: {path}"
+
+
+def sparkline(values):
+    """用方块字符画出 values 的走势，全为 0 时为最低的方块"""
+    peak = max(values, default=0)
+    if not peak:
+        return SPARK_CHARS[0] * len(values)
+    top = len(SPARK_CHARS) - 1
+    return "".join(SPARK_CHARS[(value * top + peak - 1) // peak] for value in values)
+
+
+class _Rate:
+    """一个监控目录最近 window 秒的每秒事件数（按秒取模的环形数组）"""
+
+    def __init__(self, window):
+        self.counts = [0] * window
+        self.seconds = [0] * window
+        self.total = 0
+        self.last = 0
+
+    def add(self, second):
+        index = second % len(self.counts)
+        if self.seconds[index] != second:
+            self.seconds[index] = second
+            self.counts[index] = 0
+        self.counts[index] += 1
+        self.total += 1
+        self.last = second
+
+    def series(self, now_second):
+        """从最早到当前秒的每秒事件数"""
+        window = len(self.counts)
+        result = []
+        for second in range(now_second - window + 1, now_second + 1):
+            index = second % window
+            result.append(self.counts[index] if self.seconds[index] == second else 0)
+        return result
+
+
+class ActivityLog:
+    """所有监控目录的事件记录
+
+    事件为 (时间, 监控目录, 类型, 路径, 目标路径)，类型见 KIND_LABELS，目标路径只在移动时不为 None。
+    """
+
+    def __init__(self, capacity=CAPACITY, window=WINDOW, on_pending=None):
+        self.events = deque(maxlen=capacity)
+        self.window = window
+        self.total = 0
+        self.on_pending = on_pending
+        self._rates = {}  # 监控目录 -> _Rate
+        self._pending = {}  # 监控目录 -> (界面取走后的事件数, 最后一个事件)
+        self._lock = threading.Lock()
+
+    def record(self, root, kind, path, dest=None):
+        """记录一个事件（在监控线程中调用）"""
+        now = time.time()
+        event = (now, root, kind, path, dest)
+        with self._lock:
+            self.events.append(event)
+            self.total += 1
+            rate = self._rates.get(root)
+            if rate is None:
+                rate = self._rates[root] = _Rate(self.window)
+            rate.add(int(now))
+            notify = not self._pending
+            count = self._pending[root][0] if root in self._pending else 0
+            self._pending[root] = (count + 1, event)
+        if notify and self.on_pending:
+            self.on_pending()
+
+    def take_pending(self):
+        """取走上次调用以来各监控目录的 (事件数, 最后一个事件)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self._rates.clear()
+            self.total = 0
+
+    @property
+    def dropped(self):
+        """因超出容量被丢弃的事件数"""
+        return self.total - len(self.events)
+
+    def stats(self):
+        """[(监控目录, 事件/秒, 每秒事件数序列, 总数)]，按事件/秒从高到低；超过 window 秒没有事件的目录不再保留"""
+        now = int(time.time())
+        result = []
+        with self._lock:
+            for root, rate in list(self._rates.items()):
+                if now - rate.last >= self.window:
+                    del self._rates[root]
+                    continue
+                series = rate.series(now)
+                result.append((root, sum(series[-RATE_SECONDS:]) / RATE_SECONDS, series, rate.total))
+        result.sort(key=lambda row: (-row[1], row[0]))
+        return result
+
+    def recent(self, root=None):
+        """缓冲区中的事件，最新的在前；root 不为 None 时只返回该监控目录的事件"""
+        with self._lock:
+            events = list(self.events)
+        events.reverse()
+        if root is not None:
+            events = [event for event in events if event[1] == root]
+        return events
+
+    def top_files(self, count=20, root=None):
+        """缓冲区中事件最多的文件 [(路径, 事件数)]"""
+        counter = Counter(event[3] for event in self.recent(root))
+        return counter.most_common(count)
@@ -0,0 +1,467 @@
+# -*- coding: utf-8 -*-
+"""把 zip / tar 归档作为只读的虚拟文件夹浏览
+
+归档内的路径写作 归档文件路径 + 内部路径，如 D:\\data\\logs.tar.gz\\2024\\01，
+列表使用与普通目录相同的 ListingEntry。
+
+- zip 只读取末尾的中央目录，打开很快，索引只保存在内存中；
+- tar（包括 .tar.gz / .tar.bz2 / .tar.xz）只能从头顺序读取，第一次打开时流式读一遍，
+  建立的索引保存在磁盘上，归档的大小和修改时间不变时直接使用。
+
+解压直接把成员数据分块写入目标文件，不产生临时的完整副本：zip 和未压缩的 tar 按偏移读取，
+压缩的 tar 顺序读一遍，选中的成员全部写完后立即停止。
+成员名称中的 ".." 和绝对路径会被忽略，解压不会写到目标文件夹以外。
+"""
+import hashlib
+import os
+import struct
+import tarfile
+import threading
+import time
+import zipfile
+import zlib
+from array import array
+from collections import namedtuple
+
+from listcache import ListingEntry
+from membudget import private_cache
+from pathprobe import ProbeResult, probe_path
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz", ".tbz2", ".tar.xz", ".txz")
+COMPRESSED_MAGIC = (b"\x1f\x8b", b"BZh", b"\xfd7zXZ\x00")
+
+INDEX_MAGIC = b"WXTI"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sBQqBI")  # 魔数, 版本, 归档大小, 归档修改时间(ns), 是否压缩, 成员数
+
+CHUNK_SIZE = 1024 * 1024
+
+# ref：zip 为原始成员名称，tar 为数据在（解压后的）流中的偏移
+Member = namedtuple("Member", "parts is_dir size mtime ref")
+
+
+def is_archive_name(name):
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def split_member(name):
+    """规范化成员名称，返回组件元组；名称为空、包含 .. 或（在 Windows 上）带盘符或流名称的 : 时返回 None"""
+    parts = tuple(p for p in name.replace("\\", "/").split("/") if p and p != ".")
+    if not parts or ".." in parts:
+        return None
+    if os.name == "nt" and any(":" in p for p in parts):
+        return None  # os.path.join(目标, "C:", ...) 会跳出目标文件夹
+    return parts
+
+
+def is_inside(folder, path):
+    """path 是否在 folder 之内（只比较字符串，不访问磁盘）"""
+    folder = os.path.abspath(folder)
+    try:
+        return os.path.commonpath([folder, os.path.abspath(path)]) == folder
+    except ValueError:
+        return False  # 不同的盘符
+
+
+def archive_stem(name):
+    """去掉归档扩展名，如 logs.tar.gz -> logs"""
+    lower = name.lower()
+    for suffix in sorted(ARCHIVE_SUFFIXES, key=len, reverse=True):
+        if lower.endswith(suffix):
+            return name[:-len(suffix)] or name
+    return name
+
+
+def is_compressed(path):
+    with open(path, "rb") as f:
+        head = f.read(6)
+    return head.startswith(COMPRESSED_MAGIC)
+
+
+class ArchiveIndex:
+    """归档成员的目录树"""
+
+    def __init__(self, path, kind, stamp):
+        self.path = path
+        self.kind = kind  # "zip"、"tar"（可随机访问）或 "tar-stream"（压缩，只能顺序读取）
+        self.stamp = stamp
+        self.members = {}  # 组件元组 -> Member
+        self.dirs = {(): {}}  # 目录组件元组 -> {名称: ListingEntry}
+
+    def add(self, member):
+        parts = member.parts
+        # 补上没有单独记录的上级目录
+        for depth in range(1, len(parts)):
+            parent = parts[:depth]
+            if parent not in self.dirs:
+                self.dirs[parent] = {}
+                self.dirs[parent[:-1]][parent[-1]] = ListingEntry(parent[-1], True, 0, member.mtime)
+        if member.is_dir:
+            self.dirs.setdefault(parts, {})
+        elif parts in self.dirs:
+            return  # 同名的文件和目录，保留目录
+        self.members[parts] = member
+        self.dirs[parts[:-1]][parts[-1]] = ListingEntry(parts[-1], member.is_dir, member.size, member.mtime)
+
+    def list_dir(self, parts):
+        listing = self.dirs.get(tuple(parts))
+        if listing is None:
+            if tuple(parts) in self.members:
+                raise NotADirectoryError(f"不是文件夹: {'/'.join(parts)}")
+            raise FileNotFoundError(f"归档中没有: {'/'.join(parts)}")
+        return list(listing.values())
+
+    def collect(self, parts):
+        """返回 parts 本身及其下所有成员 [(组件元组, 是否目录, Member 或 None)]，父目录在前"""
+        parts = tuple(parts)
+        if parts in self.dirs:
+            result = [(parts, True, self.members.get(parts))]
+            for name, entry in sorted(self.dirs[parts].items()):
+                result.extend(self.collect(parts + (name,)) if entry.is_dir
+                              else [(parts + (name,), False, self.members[parts + (name,)])])
+            return result
+        if parts in self.members:
+            return [(parts, False, self.members[parts])]
+        raise FileNotFoundError(f"归档中没有: {'/'.join(parts)}")
+
+
+def archive_stamp(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def read_zip_index(path):
+    index = ArchiveIndex(path, "zip", archive_stamp(path))
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            parts = split_member(info.filename)
+            if parts is None:
+                continue
+            try:
+                mtime = time.mktime(info.date_time + (0, 0, -1))
+            except (OverflowError, ValueError):
+                mtime = 0.0
+            index.add(Member(parts, info.is_dir(), 0 if info.is_dir() else info.file_size, mtime, info.filename))
+    return index
+
+
+def read_tar_index(path, progress=None, cancelled=None):
+    """流式读取 tar 成员列表；只记录普通文件和目录（链接和设备文件被忽略）"""
+    stamp = archive_stamp(path)
+    index = ArchiveIndex(path, "tar-stream" if is_compressed(path) else "tar", stamp)
+    with tarfile.open(path, "r|*") as tf:
+        for count, info in enumerate(tf, 1):
+            if cancelled and cancelled():
+                raise InterruptedError("已取消")
+            if progress and count % 1000 == 0:
+                progress(count)
+            # 流式读取时 TarFile 会保留所有成员，大归档会占用大量内存，只保留索引
+            tf.members = []
+            if not (info.isreg() or info.isdir()):
+                continue
+            parts = split_member(info.name)
+            if parts is None:
+                continue
+            index.add(Member(parts, info.isdir(), info.size if info.isreg() else 0, float(info.mtime),
+                             info.offset_data))
+    return index
+
+
+def encode_tar_index(index):
+    members = list(index.members.values())
+    names = "\0".join("/".join(m.parts) for m in members).encode("utf-8", "surrogateescape")
+    flags = bytes(1 if m.is_dir else 0 for m in members)
+    sizes = array("Q", (m.size for m in members))
+    mtimes = array("d", (m.mtime for m in members))
+    offsets = array("Q", (m.ref for m in members))
+    body = struct.pack("<I", len(names)) + names + flags + sizes.tobytes() + mtimes.tobytes() + offsets.tobytes()
+    size, mtime_ns = index.stamp
+    return (INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, size, mtime_ns, index.kind == "tar-stream", len(members))
+            + zlib.compress(body, 6))
+
+
+def decode_tar_index(path, data):
+    """格式不对时抛出 ValueError"""
+    try:
+        magic, version, size, mtime_ns, compressed, count = INDEX_HEADER.unpack_from(data, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError("不支持的索引格式")
+        body = zlib.decompress(data[INDEX_HEADER.size:])
+        (names_len,) = struct.unpack_from("<I", body, 0)
+        offset = 4
+        names = body[offset:offset + names_len].decode("utf-8", "surrogateescape").split("\0") if count else []
+        offset += names_len
+        flags = body[offset:offset + count]
+        offset += count
+        columns = []
+        for typecode in "QdQ":
+            column = array(typecode)
+            column.frombytes(body[offset:offset + 8 * count])
+            offset += 8 * count
+            columns.append(column)
+    except (struct.error, zlib.error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+    sizes, mtimes, offsets = columns
+    if not (len(names) == len(flags) == len(sizes) == len(mtimes) == len(offsets) == count):
+        raise ValueError("索引数据不完整")
+    index = ArchiveIndex(path, "tar-stream" if compressed else "tar", (size, mtime_ns))
+    for name, flag, member_size, mtime, data_offset in zip(names, flags, sizes, mtimes, offsets):
+        index.add(Member(tuple(name.split("/")), bool(flag), member_size, mtime, data_offset))
+    return index
+
+
+def default_index_root():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "wx_explorer", "archives")
+
+
+class ArchiveCache:
+    """打开过的归档的索引：内存中保留最近使用的若干个（受 cache 的内存预算或 max_open 限制），tar 索引同时保存在磁盘上
+
+    所有方法都可能访问磁盘，应在后台线程中调用（archive_of 除外）。
+    """
+
+    def __init__(self, index_root=None, max_open=8, max_index_files=100, cache=None):
+        self.index_root = index_root or default_index_root()
+        self.max_index_files = max_index_files
+        self._lock = threading.Lock()
+        # 归档路径 -> ArchiveIndex；cache 为 membudget 的缓存，不给出时最多保留 max_open 个
+        self._indexes = cache if cache is not None else private_cache(max_open)
+        self._build_locks = {}  # 归档路径 -> Lock，同一归档只建立一次索引
+        self._known = set()  # 已确认是归档文件的路径（规范化大小写）
+
+    def locate(self, path):
+        """返回 (归档路径, 内部组件元组)；path 不在归档中时返回 (None, ())"""
+        head, tail = os.path.normpath(path), []
+        while True:
+            if is_archive_name(head) and os.path.isfile(head):
+                with self._lock:
+                    self._known.add(os.path.normcase(head))
+                return head, tuple(reversed(tail))
+            parent, name = os.path.split(head)
+            if not name or parent == head:
+                return None, ()
+            tail.append(name)
+            head = parent
+
+    def archive_of(self, path):
+        """（只做字符串比较，可在界面线程调用）path 位于已打开过的归档中时返回归档路径"""
+        head = os.path.normpath(path)
+        with self._lock:
+            known = self._known
+            while True:
+                if os.path.normcase(head) in known:
+                    return head
+                parent = os.path.dirname(head)
+                if parent == head:
+                    return None
+                head = parent
+
+    def probe(self, path):
+        """与 probe_path 相同，但归档文件和归档中的路径视为可读的文件夹"""
+        try:
+            result = probe_path(path)
+        except NotADirectoryError:
+            result = None  # 上级路径中有文件，可能是归档
+        if result and result.exists and (result.is_dir or not is_archive_name(path)):
+            return result
+        archive, inner = self.locate(path)
+        if archive is None:
+            return result or probe_path(path)
+        # 读取 tar 索引可能需要很久，探测时只检查已在内存中的索引，其余在列目录时检查
+        with self._lock:
+            index = self._indexes.get(archive)
+        if index is not None and inner and inner not in index.dirs:
+            return ProbeResult(inner in index.members, False, True, None)
+        return ProbeResult(True, True, os.access(archive, os.R_OK), None)
+
+    def index(self, archive, progress=None):
+        """返回归档的索引，归档变化后重新读取；progress(已读成员数) 在读取 tar 时调用"""
+        stamp = archive_stamp(archive)
+        with self._lock:
+            build_lock = self._build_locks.setdefault(archive, threading.Lock())
+        with build_lock:
+            with self._lock:
+                index = self._indexes.get(archive)
+                if index is not None and index.stamp == stamp:
+                    return index
+            if archive.lower().endswith(".zip"):
+                index = read_zip_index(archive)
+            else:
+                index = self._load_tar_index(archive, stamp)
+                if index is None:
+                    index = read_tar_index(archive, progress)
+                    self._save_tar_index(index)
+            self._indexes.put(archive, index)
+            return index
+
+    def list_dir(self, path, progress=None):
+        archive, inner = self.locate(path)
+        if archive is None:
+            raise FileNotFoundError(f"不是归档: {path}")
+        return self.index(archive, progress).list_dir(inner)
+
+    def _index_file(self, archive):
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(archive)).encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.index_root, key + ".idx")
+
+    def _load_tar_index(self, archive, stamp):
+        file = self._index_file(archive)
+        try:
+            with open(file, "rb") as f:
+                index = decode_tar_index(archive, f.read())
+            os.utime(file)  # 记录最近使用时间
+        except (OSError, ValueError):
+            return None
+        return index if index.stamp == stamp else None
+
+    def _save_tar_index(self, index):
+        try:
+            os.makedirs(self.index_root, exist_ok=True)
+            file = self._index_file(index.path)
+            tmp = f"{file}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(encode_tar_index(index))
+            os.replace(tmp, file)
+            files = sorted((entry for entry in os.scandir(self.index_root) if entry.name.endswith(".idx")),
+                           key=lambda entry: entry.stat().st_mtime)
+            for entry in files[:max(0, len(files) - self.max_index_files)]:
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+
+class ExtractJob:
+    """把归档中的若干路径（同一归档）解压到 dest 文件夹
+
+    在后台线程中调用 run()；done_bytes / total_bytes / current / finished 可随时读取，cancel() 后尽快停止，
+    写了一半的文件会被删除。目标中已存在的文件不会被覆盖，计入 skipped。
+    """
+
+    def __init__(self, cache, sources, dest):
+        self.cache = cache
+        self.sources = sources
+        self.dest = dest
+        self.done_bytes = 0
+        self.total_bytes = 0
+        self.files = 0
+        self.skipped = 0
+        self.current = ""
+        self.started = None
+        self.finished = False
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+    def plan(self):
+        """返回 (索引, [(目标路径, 是否目录, Member)])；目标不在 dest 之内的成员跳过"""
+        archive = None
+        plan = []
+        for source in self.sources:
+            source_archive, inner = self.cache.locate(source)
+            if source_archive is None or (archive and source_archive != archive):
+                raise ValueError(f"不在同一个归档中: {source}")
+            archive = source_archive
+            index = self.cache.index(archive)
+            base = len(inner) - 1  # 保留选中项自身的名称
+            for parts, is_dir, member in index.collect(inner):
+                if base < 0:
+                    parts = (archive_stem(os.path.basename(archive)),) + parts  # 选中的是整个归档
+                    target = os.path.join(self.dest, *parts)
+                else:
+                    target = os.path.join(self.dest, *parts[base:])
+                if not is_inside(self.dest, target):
+                    self.skipped += 1
+                    continue
+                plan.append((target, is_dir, member))
+        return index, plan
+
+    def run(self):
+        self.started = time.monotonic()
+        try:
+            self._run()
+        finally:
+            self.finished = True
+
+    def _run(self):
+        index, plan = self.plan()
+        files = []
+        for target, is_dir, member in plan:
+            if is_dir:
+                os.makedirs(target, exist_ok=True)
+            elif os.path.lexists(target):
+                self.skipped += 1
+            else:
+                files.append((target, member))
+        self.total_bytes = sum(member.size for target, member in files)
+
+        if index.kind == "zip":
+            with zipfile.ZipFile(index.path) as zf:
+                for target, member in files:
+                    with zf.open(member.ref) as src:
+                        self._write(target, member, src)
+        elif index.kind == "tar":
+            with open(index.path, "rb") as f:
+                for target, member in files:
+                    f.seek(member.ref)
+                    self._write(target, member, _Slice(f, member.size))
+        else:
+            # 压缩的 tar 不能跳转，顺序读一遍，需要的成员全部写完后停止；
+            # 按数据偏移匹配，追加过同名成员的归档取到的是索引中显示的那一个（最后一个）
+            wanted = {member.ref: (target, member) for target, member in files}
+            with tarfile.open(index.path, "r|*") as tf:
+                for info in tf:
+                    tf.members = []
+                    if not wanted or self._cancelled:
+                        break
+                    if info.isreg() and info.offset_data in wanted:
+                        target, member = wanted.pop(info.offset_data)
+                        self._write(target, member, tf.extractfile(info))
+
+    def _write(self, target, member, src):
+        if self._cancelled:
+            raise InterruptedError("已取消")
+        self.current = target
+        # 在 try 之外创建文件，出错时只删除本任务创建的文件；检查之后才出现的同名文件同样跳过
+        try:
+            out = open(target, "xb")
+        except FileExistsError:
+            self.skipped += 1
+            return
+        try:
+            with out:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+                    self.done_bytes += len(chunk)
+                    if self._cancelled:
+                        raise InterruptedError("已取消")
+        except BaseException:
+            try:
+                os.remove(target)
+            except OSError:
+                pass
+            raise
+        if member.mtime:
+            os.utime(target, (member.mtime, member.mtime))
+        self.files += 1
+
+
+class _Slice:
+    """从文件当前位置起最多读取 size 字节"""
+
+    def __init__(self, f, size):
+        self.f = f
+        self.remaining = size
+
+    def read(self, n):
+        data = self.f.read(min(n, self.remaining))
+        self.remaining -= len(data)
+        return data
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""批量重命名：规则、预览、冲突检查、执行顺序和可撤销的日志
+
+替换文本中可以使用以下标记：
+    {name} 原文件名（不含扩展名）    {ext} 原扩展名（不含点）
+    {n} 序号，{n:3} 补零到 3 位      {date} 修改日期，{date:%Y%m%d_%H%M} 自定义格式
+    {{ 和 }} 表示花括号本身
+使用正则表达式时还可以用 \\1、\\g<name> 引用分组。查找内容为空时替换文本就是新名称。
+
+预览只计算可见行（每行的结果只取决于它自己的序号、名称和时间），5 万个文件也能即时更新；
+完整的冲突检查在停止输入后进行。执行前把所有步骤写入日志，每完成一步追加一行：
+中途失败时已完成的步骤按相反顺序撤回，程序崩溃后也可以根据日志恢复，完成的批次可以整体撤销。
+"""
+import json
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+
+CASES = ("keep", "lower", "upper", "title")
+TARGETS = ("name", "stem", "ext")
+
+_TOKEN_RE = re.compile(r"\{\{|\}\}|\{(\w+)(?::([^{}]*))?\}")
+_ESCAPE_RE = re.compile(r"\\(?:g<([^>]*)>|0[0-7]{0,2}|[0-7]{3}|(\d\d?)|.)", re.DOTALL)
+_INVALID_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]' if os.name == "nt" else r"[/\x00]")
+
+
+def _fold(name):
+    """Windows 文件名不区分大小写"""
+    return name.lower() if os.name == "nt" else name
+
+
+def split_ext(name, is_dir=False):
+    """返回 (主名, 扩展名)；文件夹和以点开头且没有其他点的名称没有扩展名"""
+    if is_dir:
+        return name, ""
+    stem, ext = os.path.splitext(name)
+    return stem, ext[1:]
+
+
+class RenameRule:
+    """批量重命名规则，无效时（正则表达式错误、未知标记）在构造时抛出 ValueError"""
+
+    def __init__(self, find="", replace="", regex=False, case_sensitive=False, case="keep", target="name",
+                 start=1, step=1, width=0):
+        if case not in CASES or target not in TARGETS:
+            raise ValueError("无效的选项")
+        self.find = find
+        self.replace = replace
+        self.regex = regex
+        self.case_sensitive = case_sensitive
+        self.case = case
+        self.target = target
+        self.start = start
+        self.step = step
+        self.width = width
+        flags = 0 if case_sensitive else re.IGNORECASE
+        try:
+            self._pattern = re.compile(find if regex else re.escape(find), flags) if find else None
+        except re.error as e:
+            raise ValueError(f"正则表达式错误: {e}")
+        self._parts = self._parse(replace)
+        if self._pattern is not None and regex:
+            # 替换文本中的分组引用预先解析，每个文件只需拼接
+            try:
+                for is_token, value in self._parts:
+                    if not is_token:
+                        self._pattern.sub(value, "")  # 由 re 检查转义是否有效
+                self._parts = [(is_token, value if is_token else self._compile_literal(value))
+                               for is_token, value in self._parts]
+            except (re.error, IndexError) as e:
+                raise ValueError(f"替换文本错误: {e}")
+
+    def _parse(self, text):
+        """拆分为 [(是否标记, 文本或 (名称, 格式))]"""
+        parts = []
+        pos = 0
+        for match in _TOKEN_RE.finditer(text):
+            if match.start() > pos:
+                parts.append((False, text[pos:match.start()]))
+            token = match.group(0)
+            if token in ("{{", "}}"):
+                parts.append((False, token[0]))
+            else:
+                name, spec = match.group(1), match.group(2)
+                if name not in ("name", "ext", "n", "date"):
+                    raise ValueError(f"未知的标记: {token}")
+                if name == "n" and spec and not spec.isdigit():
+                    raise ValueError(f"序号宽度必须是数字: {token}")
+                parts.append((True, (name, spec)))
+            pos = match.end()
+        if pos < len(text):
+            parts.append((False, text[pos:]))
+        return parts
+
+    def _compile_literal(self, text):
+        """把替换文本拆成 [字符串或分组号]（match.expand 每次调用都要重新解析模板）"""
+        pieces = []
+        pos = 0
+        for match in _ESCAPE_RE.finditer(text):
+            pieces.append(text[pos:match.start()])
+            name, number = match.groups()
+            if name is not None:
+                pieces.append(int(name) if name.isdigit() else self._pattern.groupindex[name])
+            elif number is not None:
+                pieces.append(int(number))
+            else:
+                pieces.append(re.sub("", match.group(0), ""))  # \n、\\ 等普通转义
+            pos = match.end()
+        pieces.append(text[pos:])
+        return [piece for piece in pieces if piece != ""]
+
+    def _expand(self, index, stem, ext, mtime, match=None):
+        """展开标记；使用正则表达式时由 match 填入文本部分中的分组"""
+        out = []
+        for is_token, value in self._parts:
+            if not is_token:
+                if match is not None and self.regex:
+                    out.extend(piece if isinstance(piece, str) else (match.group(piece) or "") for piece in value)
+                else:
+                    out.append(value)
+                continue
+            name, spec = value
+            if name == "name":
+                text = stem
+            elif name == "ext":
+                text = ext
+            elif name == "n":
+                text = str(self.start + index * self.step).zfill(int(spec) if spec else self.width)
+            else:
+                text = datetime.fromtimestamp(mtime).strftime(spec or "%Y-%m-%d")
+            out.append(text)
+        return "".join(out)
+
+    def apply(self, index, name, is_dir=False, mtime=0.0):
+        """返回第 index 个项目（从 0 开始）的新名称"""
+        stem, ext = split_ext(name, is_dir)
+        if self.target == "name":
+            subject = name
+        elif self.target == "stem":
+            subject = stem
+        else:
+            if not ext:
+                return name
+            subject = ext
+        if self._pattern is None:
+            # 没有查找内容时替换文本就是新的名称（替换文本也为空时不修改）
+            result = self._expand(index, stem, ext, mtime) if self._parts else subject
+        else:
+            result = self._pattern.sub(lambda match: self._expand(index, stem, ext, mtime, match), subject)
+        if self.case == "lower":
+            result = result.lower()
+        elif self.case == "upper":
+            result = result.upper()
+        elif self.case == "title":
+            result = result.title()
+        if self.target == "name":
+            return result
+        if self.target == "stem":
+            return result + ("." + ext if ext else "")
+        return stem + "." + result
+
+
+def validate_name(name):
+    """返回名称的问题，没有问题时返回 None"""
+    if not name or name in (".", ".."):
+        return "名称为空"
+    if _INVALID_CHARS.search(name):
+        return "包含无效字符"
+    if os.name == "nt" and name != name.rstrip(". "):
+        return "不能以点或空格结尾"
+    return None
+
+
+class BatchRename:
+    """对一组项目（按显示顺序）应用规则
+
+    names / is_dirs / mtimes 是要重命名的项目，existing 是目录中所有项目的名称（用于检查与未选中项目的冲突）。
+    """
+
+    def __init__(self, names, is_dirs, mtimes, existing):
+        self.names = names
+        self.is_dirs = is_dirs
+        self.mtimes = mtimes
+        self.existing = existing
+        self.rule = None
+        self._cache = {}
+
+    def set_rule(self, rule):
+        self.rule = rule
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def preview(self, index):
+        """返回 (新名称, 问题)；只检查这一项自身的问题，名称重复由 check() 检查"""
+        return self._preview(index, self.rule, self._cache)
+
+    def _preview(self, index, rule, cache):
+        result = cache.get(index)
+        if result is None:
+            name = self.names[index]
+            if rule is None:
+                result = (name, None)
+            else:
+                new = rule.apply(index, name, self.is_dirs[index], self.mtimes[index])
+                result = (new, validate_name(new) if new != name else None)
+            cache[index] = result
+        return result
+
+    def check(self, cancelled=None):
+        """计算全部新名称，返回 (规则, {序号: 问题}, 改名的项目数)
+
+        可以在后台线程中调用：使用调用时的规则和缓存，期间修改规则不受影响；
+        cancelled() 返回 True 时提前结束并返回 None。
+        """
+        rule, cache = self.rule, self._cache
+        problems = {}
+        renamed = set()
+        targets = {}
+        changed = 0
+        for index, name in enumerate(self.names):
+            if cancelled and index % 1000 == 0 and cancelled():
+                return None
+            new, problem = self._preview(index, rule, cache)
+            if problem:
+                problems[index] = problem
+            if new != name:
+                changed += 1
+                renamed.add(_fold(name))
+            targets.setdefault(_fold(new), []).append(index)
+        for indexes in targets.values():
+            if len(indexes) > 1:
+                for index in indexes:
+                    problems.setdefault(index, "与其他项目的新名称相同")
+        # 新名称与不改名的现有项目冲突
+        occupied = {_fold(name) for name in self.existing} - renamed
+        for key, indexes in targets.items():
+            if key in occupied:
+                for index in indexes:
+                    if _fold(self.names[index]) != key:
+                        problems.setdefault(index, "与现有项目同名")
+        return rule, problems, changed
+
+    def plan(self):
+        """返回 [(旧名称, 新名称)]（只含有变化的项目），存在问题时抛出 ValueError"""
+        rule, problems, changed = self.check()
+        if problems:
+            index = min(problems)
+            raise ValueError(f"{len(problems)} 个项目有问题，例如 {self.names[index]}: {problems[index]}")
+        return [(name, self.preview(index)[0]) for index, name in enumerate(self.names)
+                if self.preview(index)[0] != name]
+
+
+def order_renames(pairs):
+    """把 [(旧, 新)] 排成可以逐个执行的 os.rename 步骤
+
+    新名称被另一个尚未改名的项目占用时先等它改名；剩下的都是环（如 a→b、b→a），
+    把环中的一项先改为临时名称打破环。只改大小写的项目不会被自己阻塞。
+    """
+    pending = {_fold(old): (old, new) for old, new in pairs}
+    waiting = {}  # 被占用的名称 -> 等待它的项目
+    ready = []
+    for key, (old, new) in pending.items():
+        target = _fold(new)
+        if target in pending and target != key:
+            waiting.setdefault(target, []).append(key)
+        else:
+            ready.append(key)
+
+    steps = []
+    while pending:
+        while ready:
+            key = ready.pop()
+            old, new = pending.pop(key)
+            steps.append((old, new))
+            # 这个名称空出来了
+            ready.extend(waiting.pop(key, ()))
+        if pending:
+            # 只剩下环：取一项先改为临时名称
+            key = next(iter(pending))
+            old, new = pending[key]
+            temp = f".{old}.{uuid.uuid4().hex[:8]}.renaming"
+            steps.append((old, temp))
+            pending[key] = (temp, new)
+            ready.extend(waiting.pop(key, ()))
+    return steps
+
+
+def default_journal_root():
+    if os.name == "nt":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "wx_explorer", "rename-journal")
+
+
+class RenameJournal:
+    """批量重命名的日志，每个批次一个 JSON Lines 文件
+
+    第一行记录目录和全部步骤，之后每完成一步追加 {"done": i}，最后写入状态
+    （committed / rolled_back / undone / abandoned）。每一步后都刷新缓冲区，程序崩溃后日志仍然完整。
+    """
+
+    def __init__(self, root=None, keep=50):
+        self.root = root or default_journal_root()
+        self.keep = keep
+
+    def run(self, directory, steps, on_progress=None):
+        """执行步骤，返回日志文件路径；失败时撤回已完成的步骤后重新抛出异常"""
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.jsonl")
+        with open(path, "x", encoding="utf-8") as f:
+            f.write(json.dumps({"dir": directory, "time": time.time(), "steps": steps}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            done = 0
+            try:
+                for old, new in steps:
+                    os.rename(os.path.join(directory, old), os.path.join(directory, new))
+                    done += 1
+                    f.write(f'{{"done": {done}}}\n')
+                    f.flush()
+                    if on_progress and done % 100 == 0:
+                        on_progress(done, len(steps))
+            except BaseException:
+                _reverse(directory, steps[:done])
+                f.write('{"state": "rolled_back"}\n')
+                raise
+            f.write('{"state": "committed"}\n')
+        self.prune()
+        return path
+
+    def read(self, path):
+        """返回 (目录, 步骤, 已完成的步骤数, 状态)；状态为 None 表示批次没有正常结束"""
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            done = 0
+            state = None
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # 崩溃时写了一半的行
+                done = record.get("done", done)
+                state = record.get("state", state)
+        return header["dir"], [tuple(step) for step in header["steps"]], done, state
+
+    def journals(self):
+        try:
+            names = sorted(name for name in os.listdir(self.root) if name.endswith(".jsonl"))
+        except OSError:
+            return []
+        return [os.path.join(self.root, name) for name in names]
+
+    def last_undoable(self):
+        """最近一个可以撤销的批次的日志路径"""
+        for path in reversed(self.journals()):
+            try:
+                state = self.read(path)[3]
+            except (OSError, ValueError, KeyError):
+                continue
+            if state == "committed":
+                return path
+            if state in ("rolled_back", "undone", "abandoned"):
+                continue
+            return None
+        return None
+
+    def incomplete(self):
+        """没有正常结束（程序崩溃）的批次"""
+        result = []
+        for path in self.journals():
+            try:
+                if self.read(path)[3] is None:
+                    result.append(path)
+            except (OSError, ValueError, KeyError):
+                continue
+        return result
+
+    def undo(self, path):
+        """撤销一个批次（完成的或中断的），返回撤回的步骤数"""
+        directory, steps, done, state = self.read(path)
+        if state in ("rolled_back", "undone", "abandoned"):
+            return 0
+        _reverse(directory, steps[:done])
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"state": "undone"}\n')
+        return done
+
+    def abandon(self, path):
+        """不恢复中断的批次，之后不再提示"""
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"state": "abandoned"}\n')
+
+    def prune(self):
+        for path in self.journals()[:-self.keep]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _reverse(directory, steps):
+    for old, new in reversed(steps):
+        os.rename(os.path.join(directory, new), os.path.join(directory, old))
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""并行计算文件校验和
+
+每个文件只读取一次，同一块数据依次送入所有选中的哈希算法；
+结果按 (设备, inode, 大小, 修改时间) 缓存，文件未变化时再次计算直接返回。
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from fswalk import walk
+from membudget import private_cache
+
+ALGORITHMS = OrderedDict([
+    ("MD5", hashlib.md5),
+    ("SHA-1", hashlib.sha1),
+    ("SHA-256", hashlib.sha256),
+    ("BLAKE2b", hashlib.blake2b),
+])
+
+READ_CHUNK = 1024 * 1024
+
+
+class ChecksumCancelled(Exception):
+    pass
+
+
+def file_key(st):
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def compute_checksums(path, algorithms, cancel_event=None, progress=None):
+    """读取一次文件，返回 {算法: 十六进制摘要}
+
+    progress(nbytes) 在每块读取后调用。hashlib 在处理大块数据时会释放 GIL，
+    因此多个文件可以在线程池中并行计算。
+    """
+    hashes = [(name, ALGORITHMS[name]()) for name in algorithms]
+    buf = bytearray(READ_CHUNK)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ChecksumCancelled()
+            n = f.readinto(buf)
+            if not n:
+                break
+            chunk = view[:n]
+            for name, h in hashes:
+                h.update(chunk)
+            if progress:
+                progress(n)
+    return {name: h.hexdigest() for name, h in hashes}
+
+
+class ChecksumCache:
+    """线程安全的校验和缓存，按最近使用淘汰；cache 为 membudget 的缓存，不给出时最多保留 max_entries 个"""
+
+    def __init__(self, max_entries=20000, cache=None):
+        self._lock = threading.Lock()
+        self._entries = cache if cache is not None else private_cache(max_entries)  # key -> {算法: 摘要}
+
+    def get(self, key):
+        with self._lock:
+            digests = self._entries.get(key)
+            if digests is not None:
+                return dict(digests)
+            return None
+
+    def update(self, key, digests):
+        with self._lock:
+            merged = dict(self._entries.get(key, {}))
+            merged.update(digests)
+            self._entries.put(key, merged)
+
+
+class ChecksumJob:
+    """为一组路径（文件夹会递归展开）计算校验和
+
+    回调均在工作线程中调用：
+    on_result(path, digests_or_exception)、on_progress(bytes_done, bytes_total)、on_done(job)。
+    """
+
+    def __init__(self, paths, algorithms, cache, on_result, on_progress=None, on_done=None, workers=4):
+        self.paths = paths
+        self.algorithms = list(algorithms)
+        self.cache = cache
+        self.on_result = on_result
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.workers = workers
+        self.cancel_event = threading.Event()
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.files_total = 0
+        self.files_done = 0
+        self.finished = False  # 所有结果都已回调（包括出错和取消）
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def _expand(self):
+        """展开文件夹，返回 [(path, stat)]"""
+        files = []
+        for path in self.paths:
+            if os.path.isdir(path):
+                found = []
+                for entry in walk(path, stat=False):
+                    if self.cancel_event.is_set():
+                        return []
+                    if not entry.is_dir:
+                        found.append(entry.path)
+                files.extend(sorted(found))
+            else:
+                files.append(path)
+        # 缓存键需要 inode，Windows 上 scandir 不提供，因此逐个 stat
+        result = []
+        for path in files:
+            if self.cancel_event.is_set():
+                return []
+            try:
+                result.append((path, os.stat(path)))
+            except OSError as e:
+                self.on_result(path, e)
+        return result
+
+    def _add_progress(self, nbytes):
+        with self._lock:
+            self.bytes_done += nbytes
+            done = self.bytes_done
+        if self.on_progress:
+            self.on_progress(done, self.bytes_total)
+
+    def _hash_one(self, path, st):
+        if self.cancel_event.is_set():
+            return
+        key = file_key(st)
+        cached = self.cache.get(key) or {}
+        missing = [name for name in self.algorithms if name not in cached]
+        try:
+            if missing:
+                cached.update(compute_checksums(path, missing, self.cancel_event, self._add_progress))
+                self.cache.update(key, cached)
+            else:
+                self._add_progress(st.st_size)
+            result = {name: cached[name] for name in self.algorithms}
+        except ChecksumCancelled:
+            return
+        except OSError as e:
+            result = e
+        with self._lock:
+            self.files_done += 1
+        self.on_result(path, result)
+
+    def _run(self):
+        try:
+            files = self._expand()
+            self.files_total = len(files)
+            self.bytes_total = sum(st.st_size for path, st in files)
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for path, st in files:
+                    pool.submit(self._hash_one, path, st)
+        finally:
+            self.finished = True
+            if self.on_done:
+                self.on_done(self)
+
+
+def write_manifest(manifest_path, results, base_dir, algorithm="SHA-256"):
+    """写出 sha256sum 兼容的清单文件（二进制模式标记 *，路径相对于 base_dir）"""
+    with open(manifest_path, "w", encoding="utf-8", newline="\n") as f:
+        for path, digests in results:
+            if isinstance(digests, dict) and algorithm in digests:
+                name = os.path.relpath(path, base_dir).replace(os.sep, "/")
+                f.write(f"{digests[algorithm]} *{name}\n")
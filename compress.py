@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+"""在进程池中并行压缩，创建 zip、tar.gz 或 tar.zst 归档
+
+主进程按顺序读取文件，把数据分成固定大小的块交给进程池压缩，再按原来的顺序写出，
+同时在处理中的块数有上限，内存占用固定：
+
+- zip：每个文件是一个独立的 deflate 流。大文件按块压缩，除最后一块外都以 Z_SYNC_FLUSH 结束，
+  拼接后仍是一个合法的 deflate 流（与 pigz 相同）；小文件直接在主进程中压缩，省去进程间传输。
+- tar.gz：tar 数据流按块压缩为多个独立的 gzip 成员，连在一起就是合法的 .gz 文件；
+- tar.zst：同样按块压缩为多个独立的 zstd 帧，需要可选依赖 zstandard。
+
+分块压缩的压缩率比单线程压缩稍低（块之间不共享字典）。
+
+直接运行本模块可与单线程的 shutil.make_archive 做性能对比：python compress.py --bench [目录]
+"""
+import gzip
+import os
+import stat
+import struct
+import tarfile
+import time
+import zlib
+from collections import deque, namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from fswalk import walk
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMATS = {"zip": ".zip", "tar.gz": ".tar.gz", "tar.zst": ".tar.zst"}
+
+CHUNK_SIZE = 1024 * 1024
+SMALL_FILE = 64 * 1024  # 不超过该大小的 zip 成员在主进程中压缩
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_DEFLATED = 8
+
+SourceFile = namedtuple("SourceFile", "path arcname stat")
+
+
+def available_formats():
+    return [name for name in FORMATS if name != "tar.zst" or zstandard is not None]
+
+
+def collect_sources(paths):
+    """列出选中的文件和文件夹（递归），返回按归档内名称排序的 [SourceFile]"""
+    sources = []
+    for path in paths:
+        path = os.path.normpath(path)
+        base = os.path.dirname(path)
+        st = os.lstat(path)
+        sources.append(SourceFile(path, os.path.relpath(path, base).replace(os.sep, "/"), st))
+        if stat.S_ISDIR(st.st_mode):
+            for entry in walk(path, stat=True):
+                if entry.stat is not None:
+                    arcname = os.path.relpath(entry.path, base).replace(os.sep, "/")
+                    sources.append(SourceFile(entry.path, arcname, entry.stat))
+    sources.sort(key=lambda source: source.arcname)
+    return sources
+
+
+# 以下函数在工作进程中执行
+def _deflate(data, level, final):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _gzip_member(data, level):
+    return gzip.compress(data, level, mtime=0)
+
+
+def _zstd_frame(data, level):
+    return zstandard.ZstdCompressor(level=level).compress(data)
+
+
+class _OrderedWriter:
+    """按提交顺序写出数据，同时最多有 window 个压缩任务在进行
+
+    提交的项目可以是 bytes、Future 或返回 bytes 的函数（写出时才调用，用于依赖前面结果的数据）。
+    on_written(起始位置, 数据) 在写出后调用。
+    """
+
+    def __init__(self, out, window):
+        self.out = out
+        self.window = window
+        self.position = 0
+        self._pending = deque()
+        self._futures = 0
+
+    def put(self, item, on_written=None):
+        self._pending.append((item, on_written))
+        if isinstance(item, Future):
+            self._futures += 1
+            while self._futures > self.window:
+                self._write_one()
+
+    def flush(self):
+        while self._pending:
+            self._write_one()
+
+    def cancel(self):
+        """取消尚未开始的压缩任务并丢弃未写出的项目（Python 3.8 的 shutdown 没有 cancel_futures）"""
+        for item, on_written in self._pending:
+            if isinstance(item, Future):
+                item.cancel()
+        self._pending.clear()
+        self._futures = 0
+
+    def _write_one(self):
+        item, on_written = self._pending.popleft()
+        if isinstance(item, Future):
+            self._futures -= 1
+            data = item.result()
+        elif callable(item):
+            data = item()
+        else:
+            data = item
+        start = self.position
+        self.out.write(data)
+        self.position += len(data)
+        if on_written:
+            on_written(start, data)
+
+
+class ArchiveJob:
+    """把 paths 压缩为 dest 归档
+
+    在后台线程中调用 run()；done_bytes / total_bytes / out_bytes / current / finished 可随时读取，
+    cancel() 后尽快停止并删除未完成的归档。无法读取的文件被跳过，记录在 errors 中；
+    压缩过程中大小发生变化的文件（仅 tar）记录在 changed 中。
+    """
+
+    def __init__(self, paths, dest, fmt="zip", level=None, workers=None, chunk_size=CHUNK_SIZE):
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的格式: {fmt}")
+        if fmt == "tar.zst" and zstandard is None:
+            raise ValueError("tar.zst 需要安装 zstandard")
+        self.paths = paths
+        self.dest = dest
+        self.format = fmt
+        self.level = level if level is not None else (3 if fmt == "tar.zst" else 6)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.done_bytes = 0
+        self.total_bytes = 0
+        self.files = 0
+        self.current = ""
+        self.errors = []
+        self.changed = []
+        self.started = None
+        self.finished = False
+        self._cancelled = False
+        self._writer = None
+
+    @property
+    def out_bytes(self):
+        return self._writer.position if self._writer else 0
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _check_cancelled(self):
+        if self._cancelled:
+            raise InterruptedError("已取消")
+
+    def run(self):
+        self.started = time.monotonic()
+        try:
+            sources = collect_sources(self.paths)
+            self.total_bytes = sum(s.stat.st_size for s in sources if stat.S_ISREG(s.stat.st_mode))
+            with open(self.dest, "xb") as out:
+                # 只有一个 CPU 时直接在本线程中压缩，省去进程间传输数据的开销
+                pool = ProcessPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+                try:
+                    self._writer = _OrderedWriter(out, self.workers * 2)
+                    if self.format == "zip":
+                        self._write_zip(pool, sources)
+                    else:
+                        self._write_tar(pool, sources)
+                    self._writer.flush()
+                except BaseException:
+                    if pool:
+                        if self._writer:
+                            self._writer.cancel()
+                        pool.shutdown()
+                    out.close()
+                    os.remove(self.dest)
+                    raise
+                if pool:
+                    pool.shutdown()
+        finally:
+            self.finished = True
+
+    @staticmethod
+    def _submit(pool, func, *args):
+        return pool.submit(func, *args) if pool else func(*args)
+
+    def _read_chunks(self, f):
+        while True:
+            self._check_cancelled()
+            data = f.read(self.chunk_size)
+            if not data:
+                return
+            self.done_bytes += len(data)
+            yield data
+
+    # ---- zip ----
+    def _write_zip(self, pool, sources):
+        writer = self._writer
+        entries = []
+        for source in sources:
+            self._check_cancelled()
+            mode = source.stat.st_mode
+            if stat.S_ISLNK(mode):
+                try:
+                    mode = os.stat(source.path).st_mode  # 指向文件的链接按文件内容保存
+                except OSError:
+                    continue
+                if not stat.S_ISREG(mode):
+                    continue
+            if stat.S_ISDIR(mode):
+                entry = _ZipEntry(source.arcname + "/", source.stat, is_dir=True)
+                writer.put(entry.local_header(), entry.set_offset)
+                entries.append(entry)
+                continue
+            if not stat.S_ISREG(mode):
+                continue
+            try:
+                f = open(source.path, "rb")
+            except OSError as e:
+                self.errors.append((source.path, e))
+                continue
+            self.current = source.path
+            with f:
+                entry = _ZipEntry(source.arcname, source.stat, zip64=source.stat.st_size * 1.05 > ZIP64_LIMIT)
+                writer.put(entry.local_header(), entry.set_offset)
+                chunks = self._read_chunks(f)
+                pending = next(chunks, b"")
+                while True:
+                    following = next(chunks, None)
+                    final = following is None
+                    entry.add_data(pending)
+                    if final and len(pending) <= SMALL_FILE:
+                        writer.put(_deflate(pending, self.level, True), entry.add_compressed)
+                    else:
+                        writer.put(self._submit(pool, _deflate, pending, self.level, final), entry.add_compressed)
+                    if final:
+                        break
+                    pending = following
+            writer.put(entry.data_descriptor)
+            entries.append(entry)
+            self.files += 1
+
+        writer.flush()
+        central_start = writer.position
+        for entry in entries:
+            writer.put(entry.central_header())
+        writer.flush()
+        writer.put(_zip_end(len(entries), central_start, writer.position - central_start))
+
+    # ---- tar ----
+    def _write_tar(self, pool, sources):
+        writer = self._writer
+        compress = _gzip_member if self.format == "tar.gz" else _zstd_frame
+        buffer = bytearray()
+        length = 0
+
+        def emit(data, final=False):
+            nonlocal length
+            length += len(data)
+            buffer.extend(data)
+            while len(buffer) >= self.chunk_size or (final and buffer):
+                chunk = bytes(buffer[:self.chunk_size])
+                del buffer[:self.chunk_size]
+                writer.put(self._submit(pool, compress, chunk, self.level))
+
+        for source in sources:
+            self._check_cancelled()
+            st = source.stat
+            info = tarfile.TarInfo(source.arcname)
+            info.mode = stat.S_IMODE(st.st_mode)
+            info.mtime = int(st.st_mtime)
+            info.uid, info.gid = st.st_uid, st.st_gid
+            f = None
+            if stat.S_ISDIR(st.st_mode):
+                info.type = tarfile.DIRTYPE
+            elif stat.S_ISLNK(st.st_mode):
+                info.type = tarfile.SYMTYPE
+                try:
+                    info.linkname = os.readlink(source.path)
+                except OSError as e:
+                    self.errors.append((source.path, e))
+                    continue
+            elif stat.S_ISREG(st.st_mode):
+                try:
+                    f = open(source.path, "rb")
+                except OSError as e:
+                    self.errors.append((source.path, e))
+                    continue
+                info.size = st.st_size
+            else:
+                continue
+            emit(info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+            if f is None:
+                continue
+            self.current = source.path
+            with f:
+                # 头部中已写入大小，数据必须正好这么长：变大的文件截断，变小的补零
+                remaining = info.size
+                for data in self._read_chunks(f):
+                    emit(data[:remaining])
+                    remaining -= min(len(data), remaining)
+                    if not remaining:
+                        break
+                if remaining or f.read(1):
+                    self.changed.append(source.path)
+                emit(bytes(remaining))
+            emit(bytes(-info.size % tarfile.BLOCKSIZE))
+            self.files += 1
+
+        # 结尾是两个空块，总长度补齐到 RECORDSIZE 的整数倍（与 tarfile 相同）
+        emit(bytes(2 * tarfile.BLOCKSIZE))
+        emit(bytes(-length % tarfile.RECORDSIZE), final=True)
+
+
+def _dos_datetime(mtime):
+    t = time.localtime(mtime)
+    year = min(max(t.tm_year, 1980), 2107)
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+class _ZipEntry:
+    """一个 zip 成员：写出本地头部后数据流式写入，CRC 和大小在末尾的数据描述符中给出"""
+
+    def __init__(self, name, st, is_dir=False, zip64=False):
+        self.name = name.encode("utf-8", "surrogateescape")
+        self.is_dir = is_dir
+        self.zip64 = zip64
+        self.mode = st.st_mode
+        self.time, self.date = _dos_datetime(st.st_mtime)
+        self.flags = 0x800 if is_dir else 0x808  # UTF-8 名称；文件使用数据描述符
+        self.method = 0 if is_dir else ZIP_DEFLATED
+        self.crc = 0
+        self.size = 0
+        self.compressed = 0
+        self.offset = 0
+
+    @property
+    def version(self):
+        return 45 if self.zip64 else 20
+
+    def set_offset(self, start, data):
+        self.offset = start
+
+    def add_data(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+
+    def add_compressed(self, start, data):
+        self.compressed += len(data)
+
+    def local_header(self):
+        extra = b""
+        sizes = 0
+        if self.zip64:
+            # 大小在数据描述符中给出，这里占位
+            extra = struct.pack("<HHQQ", 1, 16, 0, 0)
+            sizes = 0xFFFFFFFF
+        return struct.pack("<IHHHHHIIIHH", 0x04034B50, self.version, self.flags, self.method,
+                           self.time, self.date, 0, sizes, sizes, len(self.name), len(extra)) + self.name + extra
+
+    def data_descriptor(self):
+        if self.zip64:
+            return struct.pack("<IIQQ", 0x08074B50, self.crc, self.compressed, self.size)
+        if self.compressed > 0xFFFFFFFF or self.size > 0xFFFFFFFF:
+            raise ValueError(f"文件在压缩过程中超过了 4 GB：{self.name.decode('utf-8', 'replace')}")
+        return struct.pack("<IIII", 0x08074B50, self.crc, self.compressed, self.size)
+
+    def central_header(self):
+        values = []
+        size, compressed, offset = self.size, self.compressed, self.offset
+        if size >= 0xFFFFFFFF:
+            values.append(size)
+            size = 0xFFFFFFFF
+        if compressed >= 0xFFFFFFFF:
+            values.append(compressed)
+            compressed = 0xFFFFFFFF
+        if offset >= 0xFFFFFFFF:
+            values.append(offset)
+            offset = 0xFFFFFFFF
+        extra = struct.pack("<HH%dQ" % len(values), 1, 8 * len(values), *values) if values else b""
+        version = 45 if values or self.zip64 else 20
+        attributes = (self.mode & 0xFFFF) << 16 | (0x10 if self.is_dir else 0)
+        return struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, 3 << 8 | version, version, self.flags, self.method,
+                           self.time, self.date, self.crc, compressed, size, len(self.name), len(extra),
+                           0, 0, 0, attributes, offset) + self.name + extra
+
+
+
+def _zip_end(count, start, size):
+    """中央目录结尾记录，条目数或位置超出限制时加上 zip64 记录"""
+    end = b""
+    if count >= 0xFFFF or start >= 0xFFFFFFFF or size >= 0xFFFFFFFF:
+        end_offset = start + size
+        end = (struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, size, start)
+               + struct.pack("<IIQI", 0x07064B50, 0, end_offset, 1))
+        count, start, size = min(count, 0xFFFF), min(start, 0xFFFFFFFF), min(size, 0xFFFFFFFF)
+    return end + struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, size, start, 0)
+
+
+def _make_bench_data(root, mb):
+    """生成大约 mb MB 的测试数据：文本、重复的二进制数据和随机数据，大小文件混合"""
+    import random
+    rng = random.Random(1)
+    words = [("".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(2, 10))))
+             for _ in range(2000)]
+    os.makedirs(root)
+    total = 0
+    index = 0
+    while total < mb * 1024 * 1024:
+        folder = os.path.join(root, f"dir{index // 50:03d}")
+        os.makedirs(folder, exist_ok=True)
+        kind = index % 10
+        if kind < 6:
+            size = rng.randint(1, 64) * 1024  # 小文本文件
+            data = " ".join(rng.choice(words) for _ in range(size // 6)).encode()[:size]
+        elif kind < 9:
+            size = rng.randint(1, 8) * 1024 * 1024  # 较大的日志式文本
+            line = " ".join(rng.choice(words) for _ in range(200)).encode() + b"\n"
+            data = (line * (size // len(line) + 1))[:size]
+        else:
+            size = rng.randint(1, 4) * 1024 * 1024  # 不可压缩的数据
+            data = os.urandom(size)
+        with open(os.path.join(folder, f"file{index:05d}.dat"), "wb") as f:
+            f.write(data)
+        total += len(data)
+        index += 1
+    return total
+
+
+def _bench(paths, mb=256, workers=None):
+    import shutil
+    import tempfile
+    import zipfile
+
+    tmp = tempfile.mkdtemp(prefix="compress-bench-")
+    try:
+        if not paths:
+            print(f"生成约 {mb} MB 的测试数据...")
+            paths = [os.path.join(tmp, "data")]
+            _make_bench_data(paths[0], mb)
+        for path in paths:
+            path = os.path.abspath(path)
+            total = sum(s.stat.st_size for s in collect_sources([path]) if stat.S_ISREG(s.stat.st_mode))
+            print(f"\n{path}（{total / 1024 / 1024:.1f} MB）")
+            base = os.path.join(tmp, "out")
+            parent, name = os.path.split(path)
+            runs = [("make_archive zip", "zip", lambda: shutil.make_archive(base, "zip", parent, name)),
+                    ("make_archive gztar", "tar.gz", lambda: shutil.make_archive(base, "gztar", parent, name))]
+            for fmt in available_formats():
+                def parallel(fmt=fmt):
+                    dest = base + FORMATS[fmt]
+                    job = ArchiveJob([path], dest, fmt, workers=workers)
+                    job.run()
+                    return dest
+                runs.append((f"ArchiveJob {fmt}", fmt, parallel))
+            for label, fmt, func in runs:
+                start = time.perf_counter()
+                dest = func()
+                elapsed = time.perf_counter() - start
+                size = os.path.getsize(dest)
+                if fmt == "zip":
+                    with zipfile.ZipFile(dest) as zf:
+                        ok = zf.testzip() is None
+                elif fmt == "tar.gz":
+                    with tarfile.open(dest, "r:gz") as tf:
+                        ok = sum(m.size for m in tf) == total
+                else:
+                    with open(dest, "rb") as f:
+                        reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+                        with tarfile.open(fileobj=reader, mode="r|") as tf:
+                            ok = sum(m.size for m in tf) == total
+                os.remove(dest)
+                print(f"  {label:<20} {elapsed:8.2f} 秒 {total / 1024 / 1024 / elapsed:8.1f} MB/s "
+                      f"{size / 1024 / 1024:9.1f} MB {'校验通过' if ok else '校验失败'}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="并行压缩与单线程 shutil.make_archive 的性能对比")
+    parser.add_argument("--bench", action="store_true", help="运行性能对比")
+    parser.add_argument("--size", type=int, default=256, help="生成的测试数据大小（MB）")
+    parser.add_argument("--workers", type=int, default=None, help="压缩进程数，默认为 CPU 核数")
+    parser.add_argument("paths", nargs="*", help="要压缩的目录，默认生成测试数据")
+    args = parser.parse_args()
+    if args.bench:
+        _bench(args.paths, args.size, args.workers)
+    else:
+        parser.print_help()
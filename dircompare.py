@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""并行比较两个目录树
+
+两侧按目录逐层同步遍历，每个目录只在比较期间持有两侧的列表，
+只存在于一侧的子目录作为一条差异报告而不再深入，因此内存占用与树的规模无关。
+任一侧无法读取的目录或项目报告为 SCAN_ERROR，不再比较其内容，也不会被当作只存在于另一侧。
+"""
+import hashlib
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+LEFT_ONLY = "left_only"
+RIGHT_ONLY = "right_only"
+CHANGED = "changed"
+TYPE_MISMATCH = "type_mismatch"
+SCAN_ERROR = "scan_error"
+
+DiffEntry = namedtuple("DiffEntry", "relpath status is_dir")
+
+HASH_CHUNK = 1024 * 1024
+
+
+def scan_dir(path):
+    """列出目录，返回 {名称: (是否目录, 大小, 修改时间)}；无法 stat 的项目值为 None"""
+    result = {}
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                result[entry.name] = None
+                continue
+            result[entry.name] = (is_dir, st.st_size, st.st_mtime)
+    return result
+
+
+def file_digest(path, cancel_event=None):
+    """计算文件内容的 BLAKE2b 摘要，被取消时返回 None"""
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        while True:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.digest()
+
+
+class DirectoryComparer:
+    """比较 left 与 right 两个目录树
+
+    on_diff(entries) 在工作线程中以批为单位调用，on_done(comparer) 在全部比较结束
+    或取消后调用一次。use_hash 为 True 时，大小相同但修改时间不同的文件再比较内容。
+    """
+
+    def __init__(self, left, right, on_diff, on_done=None, use_hash=False,
+                 walk_workers=8, hash_workers=4, mtime_tolerance=2.0):
+        self.left = left
+        self.right = right
+        self.on_diff = on_diff
+        self.on_done = on_done
+        self.use_hash = use_hash
+        self.mtime_tolerance = mtime_tolerance  # FAT/SMB 的时间精度为 2 秒
+        self.cancel_event = threading.Event()
+        self.dirs_compared = 0
+        self.files_compared = 0
+        self.files_hashed = 0
+        self.diff_count = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._finished = threading.Event()
+        self._walk_pool = ThreadPoolExecutor(max_workers=walk_workers)
+        self._hash_pool = ThreadPoolExecutor(max_workers=hash_workers) if use_hash else None
+
+    def start(self):
+        self._submit(self._walk_pool, self._compare_dir, "")
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def _submit(self, pool, func, *args):
+        with self._lock:
+            self._pending += 1
+        pool.submit(self._run, func, *args)
+
+    def _run(self, func, *args):
+        try:
+            if not self.cancel_event.is_set():
+                func(*args)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+                done = self._pending == 0
+            if done:
+                self._finish()
+
+    def _finish(self):
+        self._walk_pool.shutdown(wait=False)
+        if self._hash_pool:
+            self._hash_pool.shutdown(wait=False)
+        self._finished.set()
+        if self.on_done:
+            self.on_done(self)
+
+    def _report(self, diffs):
+        with self._lock:
+            self.diff_count += len(diffs)
+        self.on_diff(diffs)
+
+    def _compare_dir(self, rel):
+        left_entries = self._scan(os.path.join(self.left, rel))
+        right_entries = self._scan(os.path.join(self.right, rel))
+        if left_entries is None or right_entries is None:
+            # 一侧读取失败时无法判断哪些项目只存在于一侧
+            self._report([DiffEntry(rel, SCAN_ERROR, True)])
+            return
+
+        diffs = []
+        files = 0
+        for name in left_entries.keys() | right_entries.keys():
+            relpath = os.path.join(rel, name) if rel else name
+            left = left_entries.get(name, False)
+            right = right_entries.get(name, False)
+            if left is None or right is None:
+                with self._lock:
+                    self.errors += 1
+                diffs.append(DiffEntry(relpath, SCAN_ERROR, bool(left and left[0] or right and right[0])))
+            elif right is False:
+                diffs.append(DiffEntry(relpath, LEFT_ONLY, left[0]))
+            elif left is False:
+                diffs.append(DiffEntry(relpath, RIGHT_ONLY, right[0]))
+            elif left[0] != right[0]:
+                diffs.append(DiffEntry(relpath, TYPE_MISMATCH, left[0]))
+            elif left[0]:
+                self._submit(self._walk_pool, self._compare_dir, relpath)
+            else:
+                files += 1
+                if left[1] != right[1]:
+                    diffs.append(DiffEntry(relpath, CHANGED, False))
+                elif abs(left[2] - right[2]) > self.mtime_tolerance:
+                    if self.use_hash:
+                        self._submit(self._hash_pool, self._compare_content, relpath)
+                    else:
+                        diffs.append(DiffEntry(relpath, CHANGED, False))
+
+        with self._lock:
+            self.dirs_compared += 1
+            self.files_compared += files
+        if diffs:
+            self._report(diffs)
+
+    def _scan(self, path):
+        """列出目录，失败时返回 None"""
+        try:
+            return scan_dir(path)
+        except OSError:
+            with self._lock:
+                self.errors += 1
+            return None
+
+    def _compare_content(self, relpath):
+        left = file_digest(os.path.join(self.left, relpath), self.cancel_event)
+        right = file_digest(os.path.join(self.right, relpath), self.cancel_event)
+        if left is None or right is None:
+            return
+        with self._lock:
+            self.files_hashed += 1
+        if left != right:
+            self._report([DiffEntry(relpath, CHANGED, False)])
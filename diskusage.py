@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""磁盘占用分析
+
+目录由 fswalk 在线程池中并行扫描，每个目录扫描完成后立即把大小累加到所有上级目录，
+因此扫描过程中任何时刻的各级合计都是可用的（只会继续增大）。
+每个目录只保存合计和最大的若干个文件，内存占用与目录数而不是文件数成正比。
+"""
+import heapq
+import os
+import threading
+
+from fswalk import Walker
+
+LARGE_FILES_PER_DIR = 32
+
+
+class DirNode:
+    """目录树中的一个目录，total/file_count 包含所有下级"""
+    __slots__ = ("name", "parent", "children", "own_size", "own_files", "total", "file_count",
+                 "large_files", "pending", "complete", "error")
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.children = {}
+        self.own_size = 0  # 直接包含的文件大小
+        self.own_files = 0
+        self.total = 0
+        self.file_count = 0
+        self.large_files = []  # [(大小, 名称)]，从大到小
+        self.pending = 1  # 自身和尚未完成的下级目录数
+        self.complete = False
+        self.error = None
+
+    @property
+    def path(self):
+        parts = []
+        node = self
+        while node.parent is not None:
+            parts.append(node.name)
+            node = node.parent
+        return os.path.join(node.name, *reversed(parts))
+
+    @property
+    def other_size(self):
+        """不在 large_files 中的文件的大小合计"""
+        return self.own_size - sum(size for size, name in self.large_files)
+
+
+class DiskUsageScanner:
+    """并行扫描 root 下的目录树
+
+    遍历由 fswalk.Walker 在线程池中完成，本类在一个汇总线程中按目录合并结果。
+    on_progress(scanner) 在每个目录合并后于汇总线程中调用（可能非常频繁，
+    界面应自行节流）。version 在每次合计变化时递增，界面可据此判断是否需要重绘。
+    同一文件的多个硬链接只计算一次。
+    """
+
+    def __init__(self, root, on_progress=None, on_done=None, workers=8):
+        self.root = root
+        self.root_node = DirNode(root)
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.cancel_event = threading.Event()
+        self.version = 0
+        self.dirs_scanned = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._seen_inodes = set()
+        self._finished = threading.Event()
+        self._walker = Walker(root, workers=workers)
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        self.cancel_event.set()
+        self._walker.cancel()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def find(self, path):
+        """返回 path 对应的节点（已扫描到时），用于下钻时复用已有的合计"""
+        rel = os.path.relpath(path, self.root)
+        node = self.root_node
+        if rel == os.curdir:
+            return node
+        if rel.startswith(os.pardir):
+            return None
+        with self._lock:
+            for part in rel.split(os.sep):
+                node = node.children.get(part)
+                if node is None:
+                    return None
+        return node
+
+    def sorted_children(self, node):
+        """按合计从大到小返回子目录，扫描过程中也可以安全调用"""
+        with self._lock:
+            children = list(node.children.values())
+        return sorted(children, key=lambda n: n.total, reverse=True)
+
+    def _run(self):
+        nodes = {self.root: self.root_node}  # 尚未收到扫描结果的目录
+        try:
+            for batch in self._walker.batches():
+                node = nodes.pop(batch.path, None)
+                if node is not None:
+                    self._add_dir(node, batch, nodes)
+        finally:
+            self._finished.set()
+            if self.on_done:
+                self.on_done(self)
+
+    def _add_dir(self, node, batch, nodes):
+        """合并一个目录的扫描结果：累加到所有上级，并登记将要扫描的子目录"""
+        size = files = 0
+        large = []
+        for entry in batch.files:
+            st = entry.stat
+            if entry.is_dir or st is None:
+                continue
+            if st.st_nlink > 1 and entry.inode:
+                key = (st.st_dev, entry.inode)
+                if key in self._seen_inodes:
+                    continue
+                self._seen_inodes.add(key)
+            size += st.st_size
+            files += 1
+            if len(large) < LARGE_FILES_PER_DIR:
+                heapq.heappush(large, (st.st_size, entry.name))
+            elif st.st_size > large[0][0]:
+                heapq.heapreplace(large, (st.st_size, entry.name))
+                
+        children = []
+        for entry in batch.dirs:
+            child = DirNode(entry.name, node)
+            nodes[entry.path] = child
+            children.append(child)
+        with self._lock:
+            node.own_size = size
+            node.own_files = files
+            node.large_files = sorted(large, reverse=True)
+            node.error = batch.error
+            for child in children:
+                node.children[child.name] = child
+            node.pending += len(children)
+            parent = node
+            while parent is not None:
+                parent.total += size
+                parent.file_count += files
+                parent = parent.parent
+            self.dirs_scanned += 1
+            if batch.error:
+                self.errors += 1
+            self.version += 1
+            # 自身扫描完成，向上传递完成状态
+            while node is not None:
+                node.pending -= 1
+                if node.pending:
+                    break
+                node.complete = True
+                node = node.parent
+        if self.on_progress:
+            self.on_progress(self)
+
+
+def squarify(sizes, x, y, width, height):
+    """Squarified 树图布局
+
+    sizes 为从大到小排列的非负数，返回与之一一对应的 (x, y, w, h) 矩形列表，
+    尽量使每个矩形接近正方形。
+    """
+    total = sum(sizes)
+    rects = [(x, y, 0, 0)] * len(sizes)
+    if total <= 0 or width <= 0 or height <= 0:
+        return rects
+    scale = width * height / total
+    areas = [s * scale for s in sizes]
+
+    def worst(row, side):
+        s = sum(row)
+        if not s:
+            return float("inf")
+        return max((max(side * side * r / (s * s), (s * s) / (side * side * r)) for r in row if r),
+                   default=float("inf"))
+
+    start = 0
+    while start < len(areas) and width > 0 and height > 0:
+        side = min(width, height)
+        end = start + 1
+        while end < len(areas) and worst(areas[start:end + 1], side) <= worst(areas[start:end], side):
+            end += 1
+        row = areas[start:end]
+        row_sum = sum(row)
+        if width >= height:
+            # 在左侧放一列
+            w = row_sum / height if height else 0
+            offset = y
+            for i, a in enumerate(row):
+                h = a / w if w else 0
+                rects[start + i] = (x, offset, w, h)
+                offset += h
+            x += w
+            width -= w
+        else:
+            # 在上方放一行
+            h = row_sum / width if width else 0
+            offset = x
+            for i, a in enumerate(row):
+                w = a / h if h else 0
+                rects[start + i] = (offset, y, w, h)
+                offset += w
+            y += h
+            height -= h
+        start = end
+    return rects
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""重复文件查找
+
+分三步缩小范围：先按大小分组，再比较首尾各 64 KB 的哈希，
+最后只对仍然相同的文件在进程池中做完整哈希（内存映射读取）。
+"""
+import hashlib
+import mmap
+import os
+import stat
+import threading
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from fswalk import Walker
+
+EDGE_BYTES = 64 * 1024
+HASH_CHUNK = 4 * 1024 * 1024
+
+
+def partial_hash(path, size):
+    """文件首尾各 EDGE_BYTES 字节的哈希"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        h.update(f.read(EDGE_BYTES))
+        if size > EDGE_BYTES:
+            f.seek(max(EDGE_BYTES, size - EDGE_BYTES))
+            h.update(f.read(EDGE_BYTES))
+    return h.digest()
+
+
+def full_hash(path):
+    """完整哈希，通过内存映射读取（在子进程中执行）"""
+    h = hashlib.blake2b()
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                for offset in range(0, len(view), HASH_CHUNK):
+                    h.update(view[offset:offset + HASH_CHUNK])
+    return path, h.hexdigest()
+
+
+def is_unchanged(path, size, mtime_ns):
+    """path 仍是大小和修改时间（纳秒）都与扫描时相同的普通文件"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return stat.S_ISREG(st.st_mode) and st.st_size == size and st.st_mtime_ns == mtime_ns
+
+
+class DuplicateGroup:
+    """mtimes 为扫描时各文件的 st_mtime_ns，处理前用 unchanged() 确认文件没有再被修改"""
+
+    def __init__(self, size, digest, paths, mtimes):
+        self.size = size
+        self.digest = digest
+        self.paths = sorted(paths, key=lambda p: (len(p), p))
+        self.mtimes = mtimes
+
+    @property
+    def wasted(self):
+        """删除多余副本后可以释放的空间"""
+        return self.size * (len(self.paths) - 1)
+
+    def unchanged(self, path):
+        return is_unchanged(path, self.size, self.mtimes[path])
+
+
+class DuplicateFinder:
+    """在 root 下查找内容相同的文件
+
+    progress(stage, done, total) 在工作线程中调用，stage 为 "scan"、"partial" 或 "full"。
+    run() 阻塞执行并返回按可释放空间排序的 DuplicateGroup 列表，取消时返回空列表。
+    """
+
+    def __init__(self, root, min_size=1, progress=None, io_workers=8, hash_processes=None):
+        self.root = root
+        self.min_size = min_size
+        self.progress = progress
+        self.io_workers = io_workers
+        self.hash_processes = hash_processes
+        self.cancel_event = threading.Event()
+        self.files_scanned = 0
+        self.errors = 0
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        by_size = self._group_by_size()
+        candidates = []
+        mtimes = {}
+        for size, files in by_size.items():
+            if len(files) > 1:
+                candidates.append((size, [path for path, mtime_ns in files]))
+                mtimes.update(files)
+        del by_size
+
+        groups = self._refine_partial(candidates)
+        return sorted(self._refine_full(groups, mtimes), key=lambda g: g.wasted, reverse=True)
+
+    def _report(self, stage, done, total):
+        if self.progress:
+            self.progress(stage, done, total)
+
+    def _group_by_size(self):
+        """遍历目录，按大小分组为 [(路径, st_mtime_ns)]；同一文件的多个硬链接只记录一次"""
+        by_size = defaultdict(list)
+        seen_inodes = set()
+        walker = Walker(self.root, workers=self.io_workers)
+        for batch in walker.batches():
+            if self.cancel_event.is_set():
+                walker.cancel()
+                break
+            if batch.error:
+                self.errors += 1
+            for entry in batch.files:
+                st = entry.stat
+                if st is None or not stat.S_ISREG(st.st_mode) or st.st_size < self.min_size:
+                    continue
+                if entry.inode:
+                    key = (st.st_dev, entry.inode)
+                    if key in seen_inodes:
+                        continue
+                    seen_inodes.add(key)
+                by_size[st.st_size].append((entry.path, st.st_mtime_ns))
+                self.files_scanned += 1
+                if self.files_scanned % 1000 == 0:
+                    self._report("scan", self.files_scanned, 0)
+        return by_size
+
+    def _refine_partial(self, candidates):
+        """按首尾哈希拆分同大小的分组，I/O 为主，使用线程池"""
+        total = sum(len(paths) for size, paths in candidates)
+        buckets = defaultdict(list)
+        with ThreadPoolExecutor(max_workers=self.io_workers) as pool:
+            futures = {pool.submit(partial_hash, p, size): (size, p)
+                       for size, paths in candidates for p in paths}
+            for done, future in enumerate(as_completed(futures), 1):
+                if self.cancel_event.is_set():
+                    for f in futures:
+                        f.cancel()
+                    return []
+                size, path = futures[future]
+                try:
+                    buckets[(size, future.result())].append(path)
+                except OSError:
+                    self.errors += 1
+                if done % 100 == 0 or done == total:
+                    self._report("partial", done, total)
+        return [(size, bucket) for (size, digest), bucket in buckets.items() if len(bucket) > 1]
+
+    def _refine_full(self, groups, mtimes):
+        """对剩余的文件在进程池中做完整哈希"""
+        paths = [p for size, bucket in groups for p in bucket]
+        if not paths or self.cancel_event.is_set():
+            return []
+        digests = {}
+        with ProcessPoolExecutor(max_workers=self.hash_processes) as pool:
+            futures = [pool.submit(full_hash, p) for p in paths]
+            for done, future in enumerate(as_completed(futures), 1):
+                if self.cancel_event.is_set():
+                    for f in futures:
+                        f.cancel()
+                    return []
+                try:
+                    path, digest = future.result()
+                    digests[path] = digest
+                except OSError:
+                    self.errors += 1
+                self._report("full", done, len(paths))
+
+        result = []
+        for size, bucket in groups:
+            by_digest = defaultdict(list)
+            for p in bucket:
+                if p in digests:
+                    by_digest[digests[p]].append(p)
+            result.extend(DuplicateGroup(size, digest, same, {p: mtimes[p] for p in same})
+                          for digest, same in by_digest.items() if len(same) > 1)
+        return result
+
+
+def replace_with_hardlink(keep, duplicate):
+    """用指向 keep 的硬链接替换 duplicate，先建临时链接再原子替换"""
+    tmp = duplicate + ".dup-link"
+    os.link(keep, tmp)
+    try:
+        os.replace(tmp, duplicate)
+    except OSError:
+        os.remove(tmp)
+        raise
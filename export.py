@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""把目录列表、递归遍历结果或扁平列表导出为 CSV / JSON Lines
+
+行由生成器逐个产生、逐行写出，不在内存中收集，导出上千万个项目时内存占用也不变。
+导出到文件时先写入同一目录下的临时文件，完成后再替换目标文件，取消或失败时删除临时文件。
+
+命令行用法（不需要界面）：
+    python export.py 目录 [-r] [-f csv|jsonl] [-o 输出文件] [--pattern "*.log"] [--max-depth N]
+不指定 -o 时写到标准输出。
+"""
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from fswalk import walk
+
+FORMATS = {"csv": ".csv", "jsonl": ".jsonl"}
+FIELDS = ("path", "name", "type", "size", "mtime")
+
+
+def make_row(path, name, is_dir, size, mtime):
+    """与 FIELDS 对应的一行；修改时间为本地时间的 ISO 8601 字符串"""
+    modified = datetime.fromtimestamp(mtime).isoformat(timespec="seconds") if mtime is not None else ""
+    return (path, name, "dir" if is_dir else "file", size, modified)
+
+
+def directory_rows(path, hidden=True):
+    """一个目录中的项目（不递归），边读取目录边产生"""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not hidden and entry.name.startswith("."):
+                continue
+            try:
+                is_dir = entry.is_dir()
+                st = entry.stat()
+            except OSError:
+                yield make_row(entry.path, entry.name, False, None, None)
+                continue
+            yield make_row(entry.path, entry.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime)
+
+
+def tree_rows(root, **options):
+    """root 下所有层级的项目，参数见 fswalk.Walker；遍历的结果队列有界，不会在内存中堆积"""
+    for entry in walk(root, stat=True, **options):
+        st = entry.stat
+        if st is None:
+            yield make_row(entry.path, entry.name, entry.is_dir, None, None)
+        else:
+            yield make_row(entry.path, entry.name, entry.is_dir, 0 if entry.is_dir else st.st_size, st.st_mtime)
+
+
+def flat_rows(listing):
+    """扁平列表（flatlist.FlatListing）按当前排序的所有文件"""
+    order, count = listing.snapshot()
+    for row in range(count):
+        index = order[row] if order is not None else row
+        yield make_row(listing.path(index), listing.name(index), False, listing.sizes[index], listing.mtimes[index])
+
+
+class _CsvWriter:
+    def __init__(self, out, fields):
+        self._writer = csv.writer(out)
+        self._writer.writerow(fields)
+
+    def write(self, row):
+        self._writer.writerow(row)
+
+
+class _JsonlWriter:
+    def __init__(self, out, fields):
+        self._out = out
+        self._fields = fields
+
+    def write(self, row):
+        self._out.write(json.dumps(dict(zip(self._fields, row)), ensure_ascii=False))
+        self._out.write("\n")
+
+
+def write_rows(out, rows, fmt="csv", fields=FIELDS, job=None):
+    """把 rows 写到文本流 out，返回写出的行数；job 不为 None 时更新其进度并检查是否取消"""
+    writer = (_CsvWriter if fmt == "csv" else _JsonlWriter)(out, fields)
+    count = 0
+    for row in rows:
+        writer.write(row)
+        count += 1
+        if job is not None and not count % 1000:
+            job.rows = count
+            job.current = row[0]
+            if job.cancelled:
+                raise InterruptedError("已取消")
+    if job is not None:
+        job.rows = count
+    return count
+
+
+class ExportJob:
+    """把 rows 导出到 dest
+
+    在后台线程中调用 run()；rows / current / finished 可随时读取，cancel() 后尽快停止，目标文件保持原样。
+    CSV 以带 BOM 的 UTF-8 保存，Excel 可以直接打开。
+    """
+
+    def __init__(self, rows, dest, fmt="csv", fields=FIELDS):
+        if fmt not in FORMATS:
+            raise ValueError(f"不支持的格式: {fmt}")
+        self.source = rows
+        self.dest = dest
+        self.format = fmt
+        self.fields = fields
+        self.rows = 0
+        self.current = ""
+        self.started = None
+        self.finished = False
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        self.started = time.monotonic()
+        folder = os.path.dirname(os.path.abspath(self.dest))
+        fd, tmp = tempfile.mkstemp(prefix=".export-", suffix=".part", dir=folder)
+        try:
+            encoding = "utf-8-sig" if self.format == "csv" else "utf-8"
+            with open(fd, "w", encoding=encoding, errors="backslashreplace", newline="") as out:
+                write_rows(out, self.source, self.format, self.fields, self)
+            os.replace(tmp, self.dest)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        finally:
+            self.finished = True
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="把目录列表导出为 CSV 或 JSON Lines")
+    parser.add_argument("path", help="要导出的目录")
+    parser.add_argument("-r", "--recursive", action="store_true", help="包括所有子目录")
+    parser.add_argument("-f", "--format", choices=sorted(FORMATS), help="输出格式，默认按输出文件的扩展名，否则为 csv")
+    parser.add_argument("-o", "--output", help="输出文件，默认写到标准输出")
+    parser.add_argument("--pattern", action="append", help="只导出名称匹配该通配符的文件（可重复，需要 -r）")
+    parser.add_argument("--exclude", action="append", default=[], help="跳过名称匹配该通配符的项目（可重复，需要 -r）")
+    parser.add_argument("--max-depth", type=int, help="最大遍历深度（需要 -r）")
+    parser.add_argument("--no-hidden", action="store_true", help="不包括隐藏项目")
+    args = parser.parse_args(argv)
+
+    fmt = args.format
+    if fmt is None:
+        fmt = "jsonl" if args.output and args.output.lower().endswith((".jsonl", ".json")) else "csv"
+    if args.recursive:
+        rows = tree_rows(args.path, pattern=args.pattern, exclude=args.exclude, max_depth=args.max_depth,
+                         hidden=not args.no_hidden)
+    else:
+        rows = directory_rows(args.path, hidden=not args.no_hidden)
+    try:
+        if args.output:
+            job = ExportJob(rows, args.output, fmt)
+            job.run()
+            count = job.rows
+        else:
+            sys.stdout.reconfigure(errors="backslashreplace", newline="")
+            count = write_rows(sys.stdout, rows, fmt)
+            sys.stdout.flush()
+    except OSError as e:
+        print(f"导出失败: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    print(f"已导出 {count} 行", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
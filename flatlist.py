@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""目录树中所有文件的扁平列表
+
+后台用 fswalk 遍历，结果按列存放在 array 中：大小、修改时间、所在目录的编号各一列，
+文件名以 UTF-8 连续存放在一个 bytearray 里，每个文件约 30 字节加文件名长度，
+比每个文件一个元组小一个数量级；超过 max_entries 个文件时停止遍历。
+
+同一目录的文件按名称排好后连续存放，按路径排序只需给目录排序，再把各目录的编号段依次接上。
+按大小或时间排序时分段排序（每段最多 SORT_CHUNK 个）再逐个归并，上一次的排列作为已排好的一段，
+临时内存与段长成正比，不随文件数增长。
+
+排序在单独的线程中进行，结果是一个编号的排列（array('I')）及其逆排列（编号 -> 行号），
+排序耗时越长，两次排序的间隔也越长，遍历和排序的总开销保持在线性对数级。
+界面通过 snapshot() 取得已发布的 (排列, 文件数)，只读取可见的行，用 row_of() 查找文件所在的行。
+"""
+import heapq
+import os
+import threading
+import time
+from array import array
+
+from fswalk import Walker
+
+MAX_ENTRIES = 5000000
+SORT_KEYS = ("path", "size", "mtime")
+SORT_CHUNK = 1 << 18
+
+
+class FlatListing:
+    """root 下所有文件（不含文件夹）的扁平列表
+
+    count 为已加入的文件数；version 在发布新的文件或排列后增加，供界面判断是否需要刷新。
+    """
+
+    def __init__(self, root, hidden=True, max_entries=MAX_ENTRIES):
+        self.root = root
+        self.hidden = hidden
+        self.max_entries = max_entries
+        self.sizes = array("q")
+        self.mtimes = array("d")
+        self.dir_ids = array("I")
+        self.dirs = []  # 相对于 root 的目录，"" 为 root 本身
+        self._dir_starts = array("Q")  # 每个目录第一个文件的编号
+        self._names = bytearray()
+        self._name_ends = array("Q")
+        self.count = 0
+        self.version = 0
+        self.sort_key = None  # None 为发现顺序（目录按发现顺序，目录内按名称）
+        self.descending = False
+        self._order = None  # (排列, 排列对应的排序方式, 逆排列)
+        self._sort_lock = threading.Lock()
+        self._sorting = False
+        self._sort_again = False
+        self._sort_cost = 0.0
+        self._sorted_at = 0.0
+        self.finished = False
+        self.truncated = False
+        self.errors = 0
+        self.dirs_scanned = 0
+        self._walker = None
+        self.cancel_event = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self):
+        self.cancel_event.set()
+        if self._walker:
+            self._walker.cancel()
+
+    # ---- 读取 ----
+    def name(self, index):
+        start = self._name_ends[index - 1] if index else 0
+        return self._names[start:self._name_ends[index]].decode("utf-8", "surrogatepass")
+
+    def relpath(self, index):
+        directory = self.dirs[self.dir_ids[index]]
+        return os.path.join(directory, self.name(index)) if directory else self.name(index)
+
+    def path(self, index):
+        return os.path.join(self.root, self.relpath(index))
+
+    def snapshot(self):
+        """返回 (行号 -> 文件编号的排列或 None, 行数)；排序方式改变后、新排列完成前返回发现顺序"""
+        order = self._order
+        if order is not None and order[1] == (self.sort_key, self.descending):
+            return order[0], len(order[0])
+        return None, self.count
+
+    def row_of(self, order, index):
+        """文件编号 index 在 snapshot() 返回的排列 order 中的行号，找不到时返回 None"""
+        if order is None:
+            return index if index < self.count else None
+        published = self._order
+        if published is None or published[0] is not order or index >= len(order):
+            return None
+        return published[2][index]
+
+    # ---- 排序 ----
+    def set_sort(self, key, descending=False):
+        """key 为 SORT_KEYS 之一或 None（发现顺序）；在后台排序，完成后 version 增加"""
+        self.sort_key = key
+        self.descending = descending
+        if key is None:
+            self._order = None
+            self.version += 1
+            return
+        self._request_sort()
+
+    def sort_pending(self):
+        order = self._order
+        return self.sort_key is not None and (
+            order is None or order[1] != (self.sort_key, self.descending) or len(order[0]) < self.count)
+
+    def _path_order(self, count, descending):
+        """目录排序后依次接上各目录的编号段（目录内已按名称排好）"""
+        starts = self._dir_starts
+        dirs = [d for d in range(len(starts)) if starts[d] < count]
+        dirs.sort(key=self.dirs.__getitem__, reverse=descending)
+        order = array("I")
+        for d in dirs:
+            start = starts[d]
+            end = min(starts[d + 1], count) if d + 1 < len(starts) else count
+            order.extend(range(end - 1, start - 1, -1) if descending else range(start, end))
+        return order
+
+    def _column_order(self, column, count, descending, previous):
+        """分段排序后归并；previous 为上一次排好的排列，作为其中一段"""
+        runs = []
+        start = 0
+        if previous is not None:
+            runs.append(previous)
+            start = len(previous)
+        for chunk in range(start, count, SORT_CHUNK):
+            if self.cancel_event.is_set():
+                return None
+            indices = sorted(range(chunk, min(chunk + SORT_CHUNK, count)),
+                             key=column.__getitem__, reverse=descending)
+            runs.append(array("I", indices))
+            del indices
+        if len(runs) == 1:
+            return runs[0]
+        order = array("I")
+        order.extend(heapq.merge(*runs, key=column.__getitem__, reverse=descending))
+        return order
+
+    def _request_sort(self):
+        with self._sort_lock:
+            if self._sorting:
+                self._sort_again = True
+                return
+            self._sorting = True
+        threading.Thread(target=self._sort_loop, daemon=True).start()
+
+    def _sort_loop(self):
+        while not self.cancel_event.is_set():
+            mode = (self.sort_key, self.descending)
+            count = self.count
+            if mode[0] is not None:
+                started = time.perf_counter()
+                if mode[0] == "path":
+                    order = self._path_order(count, mode[1])
+                else:
+                    previous = self._order
+                    previous = previous[0] if previous is not None and previous[1] == mode else None
+                    if previous is not None and len(previous) > count:
+                        previous = None
+                    column = self.sizes if mode[0] == "size" else self.mtimes
+                    order = self._column_order(column, count, mode[1], previous)
+                if order is not None and mode == (self.sort_key, self.descending):
+                    inverse = array("I", [0]) * len(order)
+                    for row, index in enumerate(order):
+                        inverse[index] = row
+                    self._order = (order, mode, inverse)
+                    self.version += 1
+                order = inverse = None
+                self._sort_cost = time.perf_counter() - started
+                self._sorted_at = time.monotonic()
+            with self._sort_lock:
+                if not self._sort_again:
+                    self._sorting = False
+                    return
+                self._sort_again = False
+        with self._sort_lock:
+            self._sorting = False
+
+    def _maybe_sort(self, final=False):
+        """遍历过程中按排序耗时的 4 倍间隔重新排序，排序最多占用约 1/5 的时间"""
+        if self.sort_key is None:
+            return
+        if final or time.monotonic() - self._sorted_at > max(0.5, self._sort_cost * 4):
+            self._request_sort()
+
+    # ---- 遍历 ----
+    def _run(self):
+        root = self.root
+        walker = Walker(root, hidden=self.hidden, stat=True)
+        self._walker = walker
+        published = time.monotonic()
+        try:
+            for batch in walker.batches():
+                if self.cancel_event.is_set():
+                    break
+                self.dirs_scanned += 1
+                if batch.error:
+                    self.errors += 1
+                files = [entry for entry in batch.files if not entry.is_dir and entry.stat is not None]
+                files.sort(key=lambda entry: entry.name)
+                if not files:
+                    continue
+                if self.count + len(files) > self.max_entries:
+                    self.truncated = True
+                    files = files[:self.max_entries - self.count]
+                # 每个目录只有一批，目录内的文件编号连续
+                directory = os.path.relpath(batch.path, root) if batch.path != root else ""
+                dir_id = len(self.dirs)
+                self.dirs.append(directory)
+                self._dir_starts.append(self.count)
+                for entry in files:
+                    st = entry.stat
+                    self.sizes.append(st.st_size)
+                    self.mtimes.append(st.st_mtime)
+                    self.dir_ids.append(dir_id)
+                    self._names += entry.name.encode("utf-8", "surrogatepass")
+                    self._name_ends.append(len(self._names))
+                # 各列都写完后再公开新的行数
+                self.count += len(files)
+                if self.truncated:
+                    break
+                now = time.monotonic()
+                if now - published > 0.2:
+                    published = now
+                    self.version += 1
+                    self._maybe_sort()
+        finally:
+            walker.cancel()
+            self.finished = True
+            self.version += 1
+            self._maybe_sort(final=True)
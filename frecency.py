@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""按“常用度”（访问频率 × 最近程度）排序的目录数据库，用于快速跳转
+
+数据保存在 SQLite 中，读写都在一个后台线程里进行，界面线程只修改内存中的副本。
+访问次数的总和超过上限时所有记录按比例衰减，过低的记录被删除；
+已不存在的目录在后台定期清理（无法判断的网络路径会保留）。
+
+查询按空格分成若干片段，各片段按顺序出现在路径中即为匹配（如 "proj src" 匹配
+/home/me/projects/app/src）。搜索把所有路径按常用度排好并连成一个字符串，用一个正则表达式
+扫描，几万个目录也只需几毫秒；继续输入时只在上一次的结果中查找。
+"""
+import bisect
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+PRUNE_INTERVAL = DAY
+MIN_RANK = 0.5  # 只访问过一次的目录经过几次衰减后才被删除
+
+
+def default_db_path():
+    if os.name == "nt":
+        base = os.environ.get("APPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "wx_explorer", "frecency.sqlite3")
+
+
+def frecency(rank, last_access, now):
+    """最近一小时内访问的权重为 4，一天内为 2，一周内为 1/2，更早为 1/4"""
+    age = now - last_access
+    if age < HOUR:
+        return rank * 4
+    if age < DAY:
+        return rank * 2
+    if age < WEEK:
+        return rank / 2
+    return rank / 4
+
+
+def _gap_then(token, group):
+    """匹配同一行中后面某处的 token：不含 token 首字符的部分整段跳过
+
+    跳过的部分写成 (?=(?P<g>...))(?P=g)，相当于原子组（Python 3.10 不支持 *+），匹配失败时不会逐字符回溯。
+    """
+    first = re.escape(token[0])
+    if len(token) == 1:
+        skip = "[^\n%s]*" % first
+    else:
+        skip = "[^\n%s]*(?:%s(?!%s)[^\n%s]*)*" % (first, first, re.escape(token[1:]), first)
+    return "(?=(?P<g%d>%s))(?P=g%d)%s" % (group, skip, group, re.escape(token))
+
+
+def query_pattern(query):
+    """把查询转换成正则：以空格分隔的各个片段（不区分大小写）按顺序出现在同一行中"""
+    tokens = query.lower().split()
+    if not tokens:
+        return None
+    return re.compile(re.escape(tokens[0]) + "".join(_gap_then(token, group)
+                                                     for group, token in enumerate(tokens[1:], 1)))
+
+
+def _scan(pattern, text, starts, cap):
+    """返回匹配的行号（按出现顺序，最多 cap 个）以及是否扫描到了文本末尾"""
+    lines = []
+    pos = 0
+    while len(lines) < cap:
+        match = pattern.search(text, pos)
+        if match is None:
+            return lines, True
+        index = bisect.bisect_right(starts, match.start()) - 1
+        lines.append(index)
+        pos = starts[index + 1] if index + 1 < len(starts) else len(text)
+    return lines, False
+
+
+class FrecencyDB:
+    """常用目录数据库
+
+    add(path) 记录一次访问，search(query) 返回 [(路径, 得分)]。
+    on_loaded(entries) 在数据从磁盘读入后于后台线程中调用，entries 为 {路径: (次数, 最后访问时间)}。
+    is_unresponsive(path) 用于在清理时跳过失去响应的挂载点。
+    """
+
+    def __init__(self, db_path=None, max_total=50000, on_loaded=None, is_unresponsive=None):
+        self.db_path = db_path or default_db_path()
+        self.max_total = max_total
+        self.on_loaded = on_loaded
+        self.is_unresponsive = is_unresponsive
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._entries = {}  # 路径 -> [次数, 最后访问时间]
+        self._total = 0.0
+        self._index = None  # (按得分排序的路径, 得分, 小写路径, 以换行连接的小写路径, 每行起始位置)
+        self._last_search = None  # (索引, 小写的查询, 完整的匹配行号)
+        self._index_time = 0.0
+        self._ops = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, path):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                self._entries[path] = [1.0, now]
+            else:
+                entry[0] += 1
+                entry[1] = now
+            self._total += 1
+            self._index = None
+            aging = self._total > self.max_total
+            if aging:
+                self._age_memory()
+        self._ops.put(("add", path, now, aging))
+
+    def remove(self, path):
+        with self._lock:
+            entry = self._entries.pop(path, None)
+            if entry:
+                self._total -= entry[0]
+                self._index = None
+        self._ops.put(("remove", path))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        self._ops.put(None)
+        self._thread.join(timeout=2)
+
+    def search(self, query, limit=50):
+        """模糊搜索，返回按得分排序的 [(路径, 得分)]；查询为空时返回最常用的目录"""
+        index = self._get_index()
+        paths, scores, lowered, text, starts = index
+        if not query.strip():
+            return list(zip(paths[:limit], scores[:limit]))
+        pattern = query_pattern(query)
+        # 文本已按得分排序，前几百个匹配中已包含得分最高的结果，只对它们计算加分
+        cap = limit * 5
+        last = self._last_search
+        if last and last[0] is index and query.lower().startswith(last[1]):
+            # 输入是在上一次查询后面追加字符：结果一定在上一次（完整的）匹配中
+            subset = last[2]
+            sub_starts = []
+            offset = 0
+            for i in subset:
+                sub_starts.append(offset)
+                offset += len(lowered[i]) + 1
+            sub_lowered = [lowered[i] for i in subset]
+            found, complete = _scan(pattern, "\n".join(sub_lowered), sub_starts, cap)
+            found = [subset[i] for i in found]
+        else:
+            found, complete = _scan(pattern, text, starts, cap)
+        self._last_search = (index, query.lower(), found) if complete else None
+
+        last_token = query.lower().split()[-1]
+        candidates = []
+        for i in found:
+            # 最后一个片段出现在目录名中（而不只是上级路径中）的结果优先
+            bonus = 2.0 if last_token in os.path.basename(lowered[i].rstrip("/\\")) else 1.0
+            candidates.append((scores[i] * bonus, paths[i]))
+        candidates.sort(reverse=True)
+        return [(path, score) for score, path in candidates[:limit]]
+
+    def _get_index(self):
+        now = time.time()
+        with self._lock:
+            if self._index is None or now - self._index_time > 60:
+                score = {path: frecency(rank, last, now) for path, (rank, last) in self._entries.items()}
+                paths = sorted(score, key=score.__getitem__, reverse=True)
+                scores = [score[path] for path in paths]
+                lowered = [path.lower() for path in paths]
+                starts = []
+                offset = 0
+                for path in lowered:
+                    starts.append(offset)
+                    offset += len(path) + 1
+                self._index = (paths, scores, lowered, "\n".join(lowered), starts)
+                self._index_time = now
+            return self._index
+
+    def _age_memory(self):
+        """（持有锁时调用）所有记录衰减到 90%，删除低于 MIN_RANK 的记录"""
+        for path in [p for p, entry in self._entries.items() if entry[0] * 0.9 < MIN_RANK]:
+            del self._entries[path]
+        for entry in self._entries.values():
+            entry[0] *= 0.9
+        self._total = sum(entry[0] for entry in self._entries.values())
+
+    def _run(self):
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, rank REAL, last_access REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)")
+            conn.commit()
+            rows = conn.execute("SELECT path, rank, last_access FROM dirs").fetchall()
+        except sqlite3.Error:
+            return
+        with self._lock:
+            # 加载前已记录的访问合并到磁盘数据上
+            merged = {path: [rank, last] for path, rank, last in rows}
+            for path, (rank, last) in self._entries.items():
+                entry = merged.setdefault(path, [0.0, last])
+                entry[0] += rank
+                entry[1] = max(entry[1], last)
+            self._entries = merged
+            self._total = sum(entry[0] for entry in merged.values())
+            self._index = None
+            snapshot = {path: tuple(entry) for path, entry in merged.items()}
+        self.loaded = True
+        if self.on_loaded:
+            self.on_loaded(snapshot)
+
+        last_prune = conn.execute("SELECT value FROM meta WHERE key = 'last_prune'").fetchone()
+        if last_prune is None or time.time() - last_prune[0] > PRUNE_INTERVAL:
+            # 单独的线程：卡住的挂载点不会阻塞写入
+            threading.Thread(target=self._prune, daemon=True).start()
+
+        while True:
+            op = self._ops.get()
+            if op is None:
+                break
+            try:
+                self._apply(conn, op)
+                # 合并连续的写入，一次提交
+                while True:
+                    try:
+                        op = self._ops.get_nowait()
+                    except queue.Empty:
+                        break
+                    if op is None:
+                        conn.commit()
+                        conn.close()
+                        return
+                    self._apply(conn, op)
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+        conn.close()
+
+    def _apply(self, conn, op):
+        kind = op[0]
+        if kind == "add":
+            path, now, aging = op[1:]
+            conn.execute("INSERT INTO dirs (path, rank, last_access) VALUES (?, 1, ?) "
+                         "ON CONFLICT(path) DO UPDATE SET rank = rank + 1, last_access = excluded.last_access",
+                         (path, now))
+            if aging:
+                conn.execute("DELETE FROM dirs WHERE rank * 0.9 < ?", (MIN_RANK,))
+                conn.execute("UPDATE dirs SET rank = rank * 0.9")
+        elif kind == "remove":
+            conn.execute("DELETE FROM dirs WHERE path = ?", (op[1],))
+        elif kind == "pruned":
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_prune', ?)", (op[1],))
+
+    def _prune(self):
+        """删除已不存在的目录；无法访问（而不是不存在）的路径保留"""
+        with self._lock:
+            paths = list(self._entries)
+        for path in paths:
+            if self.is_unresponsive and self.is_unresponsive(path):
+                continue
+            try:
+                os.stat(path)
+            except FileNotFoundError:
+                self.remove(path)
+            except OSError:
+                pass
+        self._ops.put(("pruned", time.time()))
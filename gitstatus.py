@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""文件列表中的 Git 状态列
+
+每个仓库只运行一次 git status --porcelain -z（在后台线程中），结果按目录整理好缓存起来，
+显示目录时只查字典，不访问磁盘也不运行 git；文件夹显示其中是否有修改。
+监控到仓库中的文件变化时缓存失效；在终端里 commit / add 等只改动 .git 的操作
+通过比较 .git/index 和 HEAD 的修改时间发现。
+"""
+import os
+import queue
+import shutil
+import subprocess
+import threading
+
+# 状态的显示文字，按优先级从高到低（文件夹显示其中优先级最高的状态）
+LABELS = ["冲突", "已修改", "已删除", "重命名", "新增", "已暂存", "未跟踪"]
+_RANK = {label: rank for rank, label in enumerate(LABELS)}
+_CONFLICTS = {"DD", "AU", "UD", "UA", "DU", "AA", "UU"}
+
+
+def describe(xy):
+    """把 porcelain 的两位状态码转换为显示文字"""
+    if xy == "??":
+        return "未跟踪"
+    if xy in _CONFLICTS:
+        return "冲突"
+    if xy[1] in "MT":  # 工作区中有未暂存的修改
+        return "已修改"
+    if "D" in xy:
+        return "已删除"
+    if "R" in xy or "C" in xy:
+        return "重命名"
+    if "A" in xy:
+        return "新增"
+    return "已暂存"
+
+
+def parse_porcelain(data):
+    """解析 git status --porcelain -z 的输出，返回 {相对路径: 状态码}
+
+    重命名和复制的记录后面多一个字段（原路径），跳过。未跟踪的文件夹以 / 结尾。
+    """
+    result = {}
+    fields = data.split(b"\0")
+    i = 0
+    while i < len(fields):
+        field = fields[i]
+        i += 1
+        if len(field) < 4:
+            continue
+        xy = field[:2].decode("ascii", "replace")
+        path = field[3:].decode("utf-8", "surrogateescape")
+        result[path] = xy
+        if xy[0] in "RC":
+            i += 1
+    return result
+
+
+def group_by_directory(statuses):
+    """返回 {目录相对路径: {名称: 显示文字}}，根目录为 ""；上级文件夹显示其中优先级最高的状态"""
+    by_dir = {}
+
+    def mark(parent, name, label):
+        names = by_dir.setdefault(parent, {})
+        old = names.get(name)
+        if old is None or _RANK[label] < _RANK[old]:
+            names[name] = label
+            return True
+        return False
+
+    for path, xy in statuses.items():
+        label = describe(xy)
+        parts = path.rstrip("/").split("/")
+        mark("/".join(parts[:-1]), parts[-1], label)
+        # 沿上级文件夹向上标记，遇到已有同等或更高优先级的状态时停止
+        for depth in range(len(parts) - 1, 0, -1):
+            if not mark("/".join(parts[:depth - 1]), parts[depth - 1], label):
+                break
+    return by_dir
+
+
+def find_repo_root(path):
+    """向上查找包含 .git（文件夹，或子模块、工作树中的 .git 文件）的目录，找不到时返回 None"""
+    path = os.path.abspath(path)
+    while True:
+        if os.path.exists(os.path.join(path, ".git")):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def _git_dir(root):
+    git = os.path.join(root, ".git")
+    if os.path.isfile(git):
+        # 子模块和工作树：.git 文件中写着 "gitdir: 路径"
+        with open(git, encoding="utf-8") as f:
+            line = f.readline().strip()
+        if line.startswith("gitdir:"):
+            return os.path.normpath(os.path.join(root, line[len("gitdir:"):].strip()))
+    return git
+
+
+def repo_stamp(root):
+    """.git/index 和 HEAD 的修改时间；在仓库外执行的 commit、add、checkout 会改变它"""
+    git_dir = _git_dir(root)
+    stamp = []
+    for name in ("index", "HEAD"):
+        try:
+            stamp.append(os.stat(os.path.join(git_dir, name)).st_mtime_ns)
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class GitStatusCache:
+    """按仓库缓存 git status 的结果
+
+    lookup(目录) 只读内存，返回 {名称: 状态} 或 None（不在仓库中或还没有结果），同时在后台检查结果是否过期；
+    结果更新后在后台线程中调用 on_updated(仓库根目录)。
+    """
+
+    def __init__(self, on_updated, git=None, timeout=120):
+        self.on_updated = on_updated
+        self.git = git or shutil.which("git")
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._roots = {}  # 目录 -> 仓库根目录（或 None）
+        self._repos = {}  # 仓库根目录 -> {"stamp", "by_dir", "dirty"}
+        self._pending = set()
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+
+    @property
+    def available(self):
+        return self.git is not None
+
+    def lookup(self, directory):
+        if not self.git:
+            return None
+        directory = os.path.normpath(directory)
+        with self._lock:
+            if directory not in self._roots:
+                self._schedule(("root", directory))
+                return None
+            root = self._roots[directory]
+            if root is None:
+                return None
+            repo = self._repos.get(root)
+            self._schedule(("check", root))
+            if repo is None:
+                return None
+            rel = os.path.relpath(directory, root).replace(os.sep, "/")
+            return repo["by_dir"].get("" if rel == "." else rel, {})
+
+    def invalidate(self, path):
+        """监控到 path 有变化：所在仓库的结果在下一次查询时重新计算"""
+        path = os.path.normpath(path)
+        with self._lock:
+            if os.path.basename(path) == ".git":
+                self._roots.clear()  # 新建或删除了仓库
+            for root, repo in self._repos.items():
+                if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                    repo["dirty"] = True
+
+    def stop(self):
+        self._queue.put(None)
+
+    def _schedule(self, job):
+        """（持有锁时调用）同一个任务在队列中只保留一个"""
+        if job in self._pending:
+            return
+        self._pending.add(job)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._queue.put(job)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            with self._lock:
+                self._pending.discard(job)
+            kind, path = job
+            try:
+                if kind == "root":
+                    root = find_repo_root(path)
+                    with self._lock:
+                        self._roots[path] = root
+                        known = root in self._repos
+                        if root is not None:
+                            self._schedule(("check", root))
+                    if known:
+                        self.on_updated(root)  # 已有结果的仓库中的新目录
+                else:
+                    self._check(path)
+            except (OSError, subprocess.SubprocessError):
+                continue
+
+    def _check(self, root):
+        stamp = repo_stamp(root)
+        with self._lock:
+            repo = self._repos.get(root)
+            if repo is not None and not repo["dirty"] and repo["stamp"] == stamp:
+                return
+            if repo is not None:
+                repo["dirty"] = False  # 运行期间的变化会再次置位
+        flags = getattr(subprocess, "CREATE_NO_WINDOW", 0)  # Windows 上不弹出控制台窗口
+        proc = subprocess.run([self.git, "--no-optional-locks", "status", "--porcelain=v1", "-z",
+                               "--untracked-files=normal"],
+                              cwd=root, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                              timeout=self.timeout, creationflags=flags)
+        if proc.returncode != 0:
+            return
+        by_dir = group_by_directory(parse_porcelain(proc.stdout))
+        with self._lock:
+            old = self._repos.get(root)
+            self._repos[root] = {"stamp": stamp, "by_dir": by_dir, "dirty": bool(old and old["dirty"])}
+        self.on_updated(root)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""十六进制查看的辅助函数：按行格式化、字节模式解析和内存映射上的后台搜索"""
+import mmap
+import os
+import string
+import threading
+
+BYTES_PER_ROW = 16
+# 每段搜索的字节数。find 执行期间持有 GIL，分段让界面线程有机会运行，也便于取消
+SEARCH_CHUNK = 8 * 1024 * 1024
+
+_PRINTABLE = frozenset(string.printable.encode("ascii")) - frozenset(b"\t\n\r\x0b\x0c")
+_ASCII_TABLE = bytes(b if b in _PRINTABLE else ord(".") for b in range(256))
+
+
+def is_binary_file(path, sample_size=8192):
+    """根据开头的字节判断是否为二进制文件"""
+    with open(path, "rb") as f:
+        sample = f.read(sample_size)
+    return b"\0" in sample
+
+
+def format_row(buf, offset, width=BYTES_PER_ROW):
+    """格式化一行，返回 (偏移, 十六进制, ASCII) 三段文本"""
+    chunk = buf[offset:offset + width]
+    hex_part = " ".join(f"{b:02X}" for b in chunk)
+    if width > 8 and len(chunk) > 8:
+        # 中间多留一个空格，方便按 8 字节对齐阅读
+        hex_part = hex_part[:23] + " " + hex_part[23:]
+    return f"{offset:010X}", hex_part, chunk.translate(_ASCII_TABLE).decode("ascii")
+
+
+def parse_pattern(text, is_hex):
+    """将搜索框内容转换为字节串
+
+    十六进制模式接受 "DE AD BE EF"、"deadbeef"、"0xDE 0xAD" 等写法。
+    """
+    if is_hex:
+        cleaned = text.replace("0x", "").replace("0X", "").replace(",", " ")
+        return bytes.fromhex("".join(cleaned.split()))
+    return text.encode("utf-8")
+
+
+def find_pattern(buf, pattern, start=0, cancel_event=None, progress=None, wrap=True):
+    """从 start 开始查找字节模式，分段调用 find 以便取消和报告进度
+
+    返回匹配的偏移，未找到或被取消时返回 -1。
+    """
+    size = len(buf)
+    if not pattern or size == 0:
+        return -1
+    overlap = len(pattern) - 1
+    ranges = [(start, size)]
+    if wrap and start > 0:
+        ranges.append((0, min(size, start + overlap)))
+
+    searched = 0
+    for range_start, range_end in ranges:
+        pos = range_start
+        while pos < range_end:
+            if cancel_event is not None and cancel_event.is_set():
+                return -1
+            chunk_end = min(range_end, pos + SEARCH_CHUNK)
+            # 向后多取 len(pattern)-1 个字节，避免漏掉跨段的匹配
+            found = buf.find(pattern, pos, min(size, chunk_end + overlap))
+            if found != -1:
+                return found
+            searched += chunk_end - pos
+            pos = chunk_end
+            if progress:
+                progress(searched, size)
+    return -1
+
+
+class MappedFile:
+    """只读内存映射文件，空文件时 buffer 为空串"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        if self.size:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buffer = b""
+
+    def row_count(self, width=BYTES_PER_ROW):
+        return (self.size + width - 1) // width
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+
+class PatternSearch(threading.Thread):
+    """在后台线程中搜索字节模式，结束后调用 callback(offset)"""
+
+    def __init__(self, buf, pattern, start, callback, progress=None):
+        super().__init__(daemon=True)
+        self.buf = buf
+        self.pattern = pattern
+        self.start_offset = start
+        self.callback = callback
+        self.progress = progress
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            offset = find_pattern(self.buf, self.pattern, self.start_offset,
+                                  self.cancel_event, self.progress)
+        except ValueError:
+            # 映射在搜索过程中被关闭
+            offset = -1
+        if not self.cancel_event.is_set():
+            self.callback(offset)
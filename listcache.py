@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""目录列表的扫描、比较和持久化快照
+
+大型网络目录每次打开都要等待完整扫描。快照把最近访问过的慢目录的列表压缩保存在磁盘上，
+再次打开时先显示快照（标记为过期），同时在后台重新扫描，再把差异应用到列表上。
+
+快照文件格式（按列存储，便于压缩）：
+    头部: 魔数 "WXLS", 版本(B), 扫描时间(d), 路径长度(H) + UTF-8 路径, 项目数(I)
+    zlib 压缩的主体: 名称长度(I) + 以 \\0 分隔的 UTF-8 名称, 每项 1 字节的是否目录,
+                      每项 8 字节的大小(Q), 每项 8 字节的修改时间(d)
+数值使用本机字节序，快照只在本机使用。
+"""
+import hashlib
+import os
+import struct
+import time
+import zlib
+from array import array
+from collections import namedtuple
+
+ListingEntry = namedtuple("ListingEntry", "name is_dir size mtime")
+
+MAGIC = b"WXLS"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sBdH")
+
+
+def scan_listing(path):
+    """列出目录，返回 [ListingEntry]；符号链接按目标判断（与 os.path.isdir 一致）"""
+    entries = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+                st = entry.stat()
+            except OSError:
+                continue
+            entries.append(ListingEntry(entry.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime))
+    return entries
+
+
+def diff_listings(old, new):
+    """按名称比较两个列表，返回 (新增的项目, 删除的名称, 变化的项目)"""
+    old_by_name = {entry.name: entry for entry in old}
+    new_by_name = {entry.name: entry for entry in new}
+    added = [entry for name, entry in new_by_name.items() if name not in old_by_name]
+    removed = [name for name in old_by_name if name not in new_by_name]
+    changed = [entry for name, entry in new_by_name.items()
+               if name in old_by_name and old_by_name[name] != entry]
+    return added, removed, changed
+
+
+def encode_snapshot(path, entries, scanned_at):
+    names = "\0".join(entry.name for entry in entries).encode("utf-8", "surrogateescape")
+    flags = bytes(1 if entry.is_dir else 0 for entry in entries)
+    sizes = array("Q", (entry.size for entry in entries))
+    mtimes = array("d", (entry.mtime for entry in entries))
+    body = struct.pack("<I", len(names)) + names + flags + sizes.tobytes() + mtimes.tobytes()
+    encoded_path = path.encode("utf-8", "surrogateescape")
+    return (HEADER.pack(MAGIC, FORMAT_VERSION, scanned_at, len(encoded_path)) + encoded_path
+            + struct.pack("<I", len(entries)) + zlib.compress(body, 6))
+
+
+def decode_snapshot(data):
+    """返回 (路径, 扫描时间, [ListingEntry])，格式不对时抛出 ValueError"""
+    try:
+        magic, version, scanned_at, path_len = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("不支持的快照格式")
+        offset = HEADER.size
+        path = data[offset:offset + path_len].decode("utf-8", "surrogateescape")
+        offset += path_len
+        (count,) = struct.unpack_from("<I", data, offset)
+        body = zlib.decompress(data[offset + 4:])
+        (names_len,) = struct.unpack_from("<I", body, 0)
+        offset = 4
+        names = body[offset:offset + names_len].decode("utf-8", "surrogateescape").split("\0") if count else []
+        offset += names_len
+        flags = body[offset:offset + count]
+        offset += count
+        sizes = array("Q")
+        sizes.frombytes(body[offset:offset + 8 * count])
+        offset += 8 * count
+        mtimes = array("d")
+        mtimes.frombytes(body[offset:offset + 8 * count])
+    except (struct.error, zlib.error, UnicodeDecodeError) as e:
+        raise ValueError(str(e))
+    if not (len(names) == len(flags) == len(sizes) == len(mtimes) == count):
+        raise ValueError("快照数据不完整")
+    return path, scanned_at, [ListingEntry(n, bool(f), s, m) for n, f, s, m in zip(names, flags, sizes, mtimes)]
+
+
+def default_store_root():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "wx_explorer", "listings")
+
+
+class ListingSnapshotStore:
+    """保存最近访问的目录列表快照，超过 max_files 时删除最久未用的"""
+
+    def __init__(self, root=None, max_files=200):
+        self.root = root or default_store_root()
+        self.max_files = max_files
+        self._saves = 0
+
+    def _file(self, path):
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(path)).encode("utf-8", "surrogateescape")).hexdigest()
+        return os.path.join(self.root, key + ".bin")
+
+    def load(self, path):
+        """返回 (扫描时间, [ListingEntry])，没有快照或快照损坏时返回 None"""
+        file = self._file(path)
+        try:
+            with open(file, "rb") as f:
+                data = f.read()
+            stored_path, scanned_at, entries = decode_snapshot(data)
+            os.utime(file)  # 记录最近使用时间
+        except (OSError, ValueError):
+            return None
+        if stored_path != path:
+            return None
+        return scanned_at, entries
+
+    def save(self, path, entries, scanned_at=None):
+        os.makedirs(self.root, exist_ok=True)
+        file = self._file(path)
+        tmp = f"{file}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(encode_snapshot(path, entries, scanned_at or time.time()))
+        os.replace(tmp, file)
+        self._saves += 1
+        if self._saves % 20 == 1:
+            self.prune()
+
+    def discard(self, path):
+        try:
+            os.remove(self._file(path))
+        except OSError:
+            pass
+
+    def prune(self):
+        try:
+            files = [entry for entry in os.scandir(self.root) if entry.name.endswith(".bin")]
+        except OSError:
+            return
+        if len(files) <= self.max_files:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
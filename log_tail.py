@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""日志跟踪：只读取文件新增的字节区间，按行切分后保存在环形缓冲区中"""
+import os
+from collections import deque
+
+
+class LogTailer:
+    """增量读取不断增长的文本文件
+
+    每次 poll() 只读取上次位置之后追加的字节并切分成行，不完整的末行留到
+    下一次拼接。文件被轮转（设备号/inode 变化）或截断（长度变小）时从头读取。
+    每次读取都重新打开文件，不长期占用句柄，Windows 下不会阻止日志轮转。
+    """
+
+    def __init__(self, path, max_lines=10000, encoding="utf-8", max_read=4 * 1024 * 1024):
+        self.path = path
+        self.encoding = encoding
+        self.max_read = max_read  # 单次最多读取的字节数，超出时只保留末尾部分
+        self.lines = deque(maxlen=max_lines)  # 环形缓冲区，只保留最新的行
+        self.line_count = 0  # 已切分出的总行数（含被丢弃的旧行）
+        self._ident = None
+        self._offset = 0
+        self._partial = b""
+
+    @property
+    def max_lines(self):
+        return self.lines.maxlen
+
+    def open(self, tail_bytes=256 * 1024):
+        """打开文件并加载末尾若干字节，返回加载的行"""
+        st = os.stat(self.path)
+        self._ident = (st.st_dev, st.st_ino)
+        self._partial = b""
+        self._offset = max(0, st.st_size - tail_bytes)
+        return self._read_to(st.st_size, skip_first=self._offset > 0)
+
+    def poll(self):
+        """读取新增内容
+
+        返回 (新行列表, 提示)，提示为 None、"rotated" 或 "truncated"。
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # 轮转过程中旧文件已移走、新文件尚未创建
+            return [], None
+
+        note = None
+        ident = (st.st_dev, st.st_ino)
+        if ident != self._ident:
+            note = "rotated"
+        elif st.st_size < self._offset:
+            note = "truncated"
+        if note:
+            self._ident = ident
+            self._offset = 0
+            self._partial = b""
+
+        if st.st_size == self._offset:
+            return [], note
+        return self._read_to(st.st_size), note
+
+    def _read_to(self, end, skip_first=False):
+        """读取 [offset, end) 区间并切分成行"""
+        start = self._offset
+        if end - start > self.max_read:
+            # 追加得太快：跳过中间部分，反正会被环形缓冲区挤掉
+            start = end - self.max_read
+            skip_first = True
+            self._partial = b""
+
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        self._offset = start + len(data)
+
+        if skip_first:
+            # 从文件中间开始读，第一行不完整
+            newline = data.find(b"\n")
+            data = data[newline + 1:] if newline != -1 else b""
+
+        parts = (self._partial + data).split(b"\n")
+        self._partial = parts.pop()
+        self.line_count += len(parts)
+
+        # 只解码最终会留在缓冲区里的行
+        if len(parts) > self.max_lines:
+            parts = parts[-self.max_lines:]
+        lines = [p.rstrip(b"\r").decode(self.encoding, errors="replace") for p in parts]
+        self.lines.extend(lines)
+        return lines
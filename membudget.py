@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""所有内存缓存共用的内存预算
+
+各缓存通过 MemoryBudget.cache() 取得一个 BudgetedCache，条目存放在缓存自己的 OrderedDict 中，
+同时按 (缓存, 键) 登记在预算的全局 OrderedDict 里；读写都会把条目移到两者的末尾，
+总的估计字节数超过预算时从全局最久未用的条目开始淘汰，不论它属于哪个缓存。
+全部操作在预算的一把锁内完成，淘汰时不回调缓存，调用方持有自己的锁时也可以安全调用。
+
+字节数是估计值：调用方可以直接给出 size（位图按宽×高×4），否则用 approx_size 估算，
+大的容器只抽样一部分元素再按数量外推。
+"""
+import sys
+import threading
+from array import array
+from collections import OrderedDict, deque
+from itertools import islice
+
+DEFAULT_BUDGET = 256 * 1024 * 1024
+ENTRY_OVERHEAD = 100  # 两个 OrderedDict 中的登记项
+SAMPLE = 32
+MAX_DEPTH = 4
+
+_ATOMS = (str, bytes, bytearray, int, float, bool, type(None), array, memoryview)
+
+
+def approx_size(obj, _depth=0):
+    """obj 占用内存的粗略估计（字节）"""
+    size = sys.getsizeof(obj, 64)
+    if isinstance(obj, _ATOMS) or _depth >= MAX_DEPTH:
+        return size
+    if isinstance(obj, dict):
+        items = list(islice(obj.items(), SAMPLE))
+        if items:
+            sampled = sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in items)
+            size += sampled * len(obj) // len(items)
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        items = list(islice(obj, SAMPLE))
+        if items:
+            size += sum(approx_size(item, _depth + 1) for item in items) * len(obj) // len(items)
+    elif hasattr(obj, "__dict__"):
+        size += approx_size(vars(obj), _depth + 1)
+    return size
+
+
+class BudgetedCache:
+    """受预算约束的 LRU 缓存，接口与 OrderedDict 的常用部分相同；线程安全
+
+    max_entries 不为 None 时该缓存自身的条目数也不超过此值；sizeof(值) 用于没有给出 size 的 put()。
+    """
+
+    def __init__(self, budget, name, max_entries=None, sizeof=approx_size):
+        self.budget = budget
+        self.name = name
+        self.max_entries = max_entries
+        self.sizeof = sizeof
+        self.bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # 键 -> (值, 字节数)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """返回值并标记为最近使用"""
+        with self.budget._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            self.budget._lru.move_to_end((self, key))
+            return entry[0]
+
+    def put(self, key, value, size=None):
+        if size is None:
+            size = self.sizeof(value)
+        size += ENTRY_OVERHEAD
+        budget = self.budget
+        with budget._lock:
+            self._remove(key)
+            self._entries[key] = (value, size)
+            budget._lru[(self, key)] = size
+            self.bytes += size
+            budget.used += size
+            if self.max_entries is not None:
+                while len(self._entries) > self.max_entries:
+                    self._evict(next(iter(self._entries)))
+            budget._enforce()
+
+    def pop(self, key, default=None):
+        with self.budget._lock:
+            entry = self._remove(key)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        with self.budget._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def keys(self):
+        with self.budget._lock:
+            return list(self._entries)
+
+    def _remove(self, key):
+        """（持有预算的锁时调用）"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            del self.budget._lru[(self, key)]
+            self.bytes -= entry[1]
+            self.budget.used -= entry[1]
+        return entry
+
+    def _evict(self, key):
+        self._remove(key)
+        self.evictions += 1
+
+
+class MemoryBudget:
+    """所有登记的缓存共用的内存预算；budget 为 None 时不限制总量"""
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+        self.used = 0
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # (缓存, 键) -> 字节数，全局按最近使用排序
+        self._caches = []
+
+    def cache(self, name, max_entries=None, sizeof=approx_size):
+        """登记一个新的缓存并返回它"""
+        cache = BudgetedCache(self, name, max_entries, sizeof)
+        with self._lock:
+            self._caches.append(cache)
+        return cache
+
+    def set_budget(self, budget):
+        """修改预算，超出新预算的条目立即淘汰"""
+        with self._lock:
+            self.budget = budget
+            self._enforce()
+
+    def usage(self):
+        """[(名称, 条目数, 估计字节数, 已淘汰数)]，按字节数从大到小"""
+        with self._lock:
+            rows = [(c.name, len(c), c.bytes, c.evictions) for c in self._caches]
+        rows.sort(key=lambda row: -row[2])
+        return rows
+
+    def _enforce(self):
+        """（持有锁时调用）从全局最久未用的条目开始淘汰，直到不超过预算"""
+        if self.budget is None:
+            return
+        while self.used > self.budget and self._lru:
+            cache, key = next(iter(self._lru))
+            cache._evict(key)
+
+
+def private_cache(max_entries, sizeof=approx_size):
+    """不受全局预算约束、只限制条目数的缓存，供独立使用各模块时作为默认值"""
+    return MemoryBudget(None).cache("", max_entries, sizeof)
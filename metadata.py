@@ -0,0 +1,417 @@
+# -*- coding: utf-8 -*-
+"""附加列的文件元数据：图片尺寸、音视频时长、行数、所有者、权限和 MIME 类型
+
+只读取文件头部（JPEG 和 MP4 按段/盒子的长度跳过，不读取图像和媒体数据）；
+行数需要读完整个文件，只对不超过 LINE_COUNT_LIMIT 的文本文件统计。
+MetadataLoader 在固定数量的工作线程中提取，每个视图只保留最近一次请求的队列（可见的行在前），
+结果按 (设备, inode, 修改时间, 大小) 缓存，文件没有变化时不会再次读取。
+"""
+import mimetypes
+import os
+import stat
+import struct
+import threading
+from collections import OrderedDict, deque
+
+from membudget import private_cache
+
+try:
+    import pwd
+except ImportError:
+    pwd = None
+
+try:
+    import win32security
+except ImportError:
+    win32security = None
+
+COLUMNS = ("dimensions", "duration", "lines", "owner", "mode", "mime")
+HEADER_SIZE = 4096
+LINE_COUNT_LIMIT = 16 * 1024 * 1024
+
+# 没有已知扩展名时按文件头判断类型
+MAGIC = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"BZh", "application/x-bzip2"),
+    (b"\xfd7zXZ\x00", "application/x-xz"),
+    (b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (b"\x7fELF", "application/x-executable"),
+    (b"MZ", "application/x-msdownload"),
+    (b"fLaC", "audio/flac"),
+    (b"ID3", "audio/mpeg"),
+    (b"OggS", "audio/ogg"),
+    (b"SQLite format 3\x00", "application/vnd.sqlite3"),
+]
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+# ---- 图片尺寸 ----
+def image_size(f, head):
+    """返回 (宽, 高)，不是支持的图片格式时返回 None"""
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR" and len(head) >= 24:
+        return struct.unpack(">II", head[16:24])
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        return struct.unpack("<HH", head[6:10])
+    if head.startswith(b"BM") and len(head) >= 26:
+        (header_size,) = struct.unpack("<I", head[14:18])
+        if header_size == 12:
+            return struct.unpack("<HH", head[18:22])
+        width, height = struct.unpack("<ii", head[18:26])
+        return width, abs(height)
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return _webp_size(head)
+    if head.startswith(b"\xff\xd8"):
+        return _jpeg_size(f)
+    return None
+
+
+def _webp_size(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30:
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(head) >= 25:
+        bits = int.from_bytes(head[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(head) >= 30:
+        return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    return None
+
+
+def _jpeg_size(f):
+    """逐段读取标记，直到帧头（SOFn）"""
+    f.seek(2)
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        if code == 0xFF:
+            f.seek(-1, os.SEEK_CUR)  # 填充字节
+            continue
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue  # 没有长度的标记
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        (length,) = struct.unpack(">H", length_bytes)
+        if length < 2:
+            return None  # 损坏的段长度
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            data = f.read(5)
+            if len(data) < 5:
+                return None
+            height, width = struct.unpack(">HH", data[1:5])
+            return width, height
+        if code == 0xDA:
+            return None  # 扫描数据开始仍没有帧头
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+# ---- 时长 ----
+def media_duration(f, head, size):
+    """返回秒数，不是支持的格式时返回 None"""
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return _wav_duration(f)
+    if head.startswith(b"fLaC"):
+        return _flac_duration(head)
+    if head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide"):
+        return _mp4_duration(f, size)
+    if head.startswith(b"ID3") or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return _mp3_duration(f, head, size)
+    return None
+
+
+def _wav_duration(f):
+    f.seek(12)
+    byte_rate = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk, length = struct.unpack("<4sI", header)
+        if chunk == b"fmt ":
+            fmt = f.read(length)
+            byte_rate = struct.unpack("<I", fmt[8:12])[0] if len(fmt) >= 12 else None
+            f.seek(length % 2, os.SEEK_CUR)
+        elif chunk == b"data":
+            return length / byte_rate if byte_rate else None
+        else:
+            f.seek(length + length % 2, os.SEEK_CUR)
+
+
+def _flac_duration(head):
+    # 第一个元数据块必须是 STREAMINFO：4 字节块头之后第 10 字节起是采样率(20 位)和总采样数(36 位)
+    info = head[8:42]
+    if len(info) < 18:
+        return None
+    sample_rate = int.from_bytes(info[10:13], "big") >> 4
+    total = int.from_bytes(info[13:18], "big") & ((1 << 36) - 1)
+    return total / sample_rate if sample_rate and total else None
+
+
+def _boxes(f, start, end):
+    """遍历 MP4 盒子，返回 (类型, 内容起点, 内容终点)"""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        length, kind = struct.unpack(">I4s", header)
+        body = pos + 8
+        if length == 1:
+            (length,) = struct.unpack(">Q", f.read(8))
+            body += 8
+        elif length == 0:
+            length = end - pos
+        if length < body - pos:
+            return
+        yield kind, body, pos + length
+        pos += length
+
+
+def _mp4_duration(f, size):
+    for kind, body, end in _boxes(f, 0, size):
+        if kind != b"moov":
+            continue
+        for inner, inner_body, inner_end in _boxes(f, body, end):
+            if inner == b"mvhd":
+                f.seek(inner_body)
+                data = f.read(32)
+                if data[:1] == b"\x01":
+                    timescale, duration = struct.unpack(">IQ", data[20:32])
+                else:
+                    timescale, duration = struct.unpack(">II", data[12:20])
+                return duration / timescale if timescale else None
+        return None
+    return None
+
+
+_MP3_BITRATES = {
+    1: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],  # MPEG-1 Layer III
+    2: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],  # MPEG-2/2.5 Layer III
+}
+_MP3_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _mp3_duration(f, head, size):
+    start = 0
+    if head.startswith(b"ID3") and len(head) >= 10:
+        start = 10 + ((head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9])
+    f.seek(start)
+    data = f.read(HEADER_SIZE)
+    pos = data.find(b"\xff")
+    while 0 <= pos < len(data) - 4:
+        b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+        version = (b1 >> 3) & 3
+        if b1 & 0xE0 == 0xE0 and version != 1 and (b1 >> 1) & 3 == 1 and b2 >> 4 not in (0, 15) \
+                and (b2 >> 2) & 3 != 3:
+            break
+        pos = data.find(b"\xff", pos + 1)
+    else:
+        return None
+    bitrate = _MP3_BITRATES[1 if version == 3 else 2][b2 >> 4] * 1000
+    sample_rate = _MP3_RATES[version][(b2 >> 2) & 3]
+    samples = 1152 if version == 3 else 576
+    mono = b3 >> 6 == 3
+    # VBR 文件的第一帧中有 Xing/Info 头，记录总帧数
+    side = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    xing = data[pos + 4 + side:pos + 4 + side + 12]
+    if xing[:4] in (b"Xing", b"Info") and struct.unpack(">I", xing[4:8])[0] & 1:
+        return struct.unpack(">I", xing[8:12])[0] * samples / sample_rate
+    return (size - start - pos) * 8 / bitrate
+
+
+# ---- 其他 ----
+def count_lines(f, head, size):
+    if size > LINE_COUNT_LIMIT or b"\0" in head:
+        return None
+    f.seek(0)
+    lines = 0
+    last = b"\n"
+    while True:
+        chunk = f.read(1024 * 1024)
+        if not chunk:
+            break
+        lines += chunk.count(b"\n")
+        last = chunk[-1:]
+    return lines + (0 if last == b"\n" else 1)
+
+
+def sniff_mime(name, head):
+    mime = mimetypes.guess_type(name)[0]
+    if mime:
+        return mime
+    for magic, mime in MAGIC:
+        if head.startswith(magic):
+            return mime
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"RIFF") and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head[4:8] == b"ftyp":
+        return "video/mp4"
+    if b"\0" not in head:
+        return "text/plain"
+    return "application/octet-stream"
+
+
+_owner_cache = {}
+
+
+def file_owner(path, st):
+    if pwd is not None:
+        name = _owner_cache.get(st.st_uid)
+        if name is None:
+            try:
+                name = pwd.getpwuid(st.st_uid).pw_name
+            except KeyError:
+                name = str(st.st_uid)
+            _owner_cache[st.st_uid] = name
+        return name
+    if win32security is not None:
+        try:
+            sd = win32security.GetFileSecurity(path, win32security.OWNER_SECURITY_INFORMATION)
+            sid = sd.GetSecurityDescriptorOwner()
+            key = win32security.ConvertSidToStringSid(sid)
+            name = _owner_cache.get(key)
+            if name is None:
+                account, domain, kind = win32security.LookupAccountSid(None, sid)
+                name = _owner_cache[key] = f"{domain}\\{account}" if domain else account
+            return name
+        except win32security.error:
+            return ""
+    return ""
+
+
+def extract(path, name, columns, st):
+    """提取 columns 中各列的显示文字，返回 {列: 文字}（没有的值为空字符串）"""
+    values = dict.fromkeys(columns, "")
+    if "owner" in columns:
+        values["owner"] = file_owner(path, st)
+    if "mode" in columns:
+        values["mode"] = stat.filemode(st.st_mode)
+    if stat.S_ISDIR(st.st_mode):
+        if "mime" in columns:
+            values["mime"] = "inode/directory"
+        return values
+    content = [c for c in ("dimensions", "duration", "lines", "mime") if c in columns]
+    if not content or not stat.S_ISREG(st.st_mode):
+        return values
+    with open(path, "rb") as f:
+        head = f.read(HEADER_SIZE)
+        if "mime" in columns:
+            values["mime"] = sniff_mime(name, head)
+        if "dimensions" in columns:
+            try:
+                size = image_size(f, head)
+            except (struct.error, ValueError, IndexError):
+                size = None  # 截断或损坏的文件头
+            if size:
+                values["dimensions"] = f"{size[0]} × {size[1]}"
+        if "duration" in columns:
+            try:
+                seconds = media_duration(f, head, st.st_size)
+            except (struct.error, KeyError, IndexError, ZeroDivisionError):
+                seconds = None
+            if seconds:
+                values["duration"] = format_duration(seconds)
+        if "lines" in columns:
+            lines = count_lines(f, head, st.st_size)
+            if lines is not None:
+                values["lines"] = str(lines)
+    return values
+
+
+class MetadataLoader:
+    """元数据后台提取池
+
+    与 ThumbnailLoader 相同：每个视图(owner)只保留最近一次 request() 的队列，各视图轮流处理，
+    同时进行的读取数不超过工作线程数。callback(owner, path, values) 在工作线程中调用。
+    """
+
+    def __init__(self, workers=4, max_cached=100000, cache=None):
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # owner -> (deque[(path, columns)], callback)
+        # (设备, inode, 修改时间, 大小) -> {列: 文字}；cache 为 membudget 的缓存
+        self._cache = cache if cache is not None else private_cache(max_cached)
+        self._stopped = False
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def request(self, owner, jobs, callback):
+        """jobs 为按优先级排列的 [(路径, 需要的列)]，替换该视图之前未处理的请求"""
+        with self._cond:
+            if jobs:
+                self._queues[owner] = (deque(jobs), callback)
+            else:
+                self._queues.pop(owner, None)
+            self._cond.notify_all()
+
+    def cancel(self, owner):
+        with self._cond:
+            self._queues.pop(owner, None)
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._queues.clear()
+            self._cond.notify_all()
+
+    def _next_job(self):
+        with self._cond:
+            while not self._stopped:
+                for owner, (jobs, callback) in list(self._queues.items()):
+                    if jobs:
+                        path, columns = jobs.popleft()
+                        self._queues.move_to_end(owner)
+                        return owner, path, columns, callback
+                    del self._queues[owner]
+                self._cond.wait()
+            return None
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            owner, path, columns, callback = job
+            try:
+                values = self._load(path, columns)
+            except Exception:
+                # 任何文件都不能让工作线程退出，否则之后的列再也不会填充
+                values = dict.fromkeys(columns, "")
+            callback(owner, path, values)
+
+    def _load(self, path, columns):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return dict.fromkeys(columns, "")
+        key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+        cached = self._cache.get(key, {})
+        missing = [c for c in columns if c not in cached]
+        if missing:
+            try:
+                found = extract(path, os.path.basename(path), missing, st)
+            except Exception:
+                found = dict.fromkeys(missing, "")
+            # 替换而不是原地修改，缓存登记的字节数与内容一致
+            cached = dict(self._cache.get(key, {}))
+            cached.update(found)
+            self._cache.put(key, cached)
+        return {c: cached.get(c, "") for c in columns}
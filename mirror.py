@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""单向镜像同步：只复制新增或变化的文件，大文件只改写不同的数据块"""
+import hashlib
+import os
+import queue
+import shutil
+import threading
+import time
+import zlib
+
+from dircompare import DirectoryComparer, RIGHT_ONLY, CHANGED, TYPE_MISMATCH, SCAN_ERROR
+
+COPY_CHUNK = 1024 * 1024
+
+
+class MirrorCancelled(Exception):
+    pass
+
+
+class Throttle:
+    """令牌桶限速，rate 为每秒字节数，0 表示不限速"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self._allowance = rate
+        self._last = time.monotonic()
+
+    def consume(self, nbytes):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+        self._last = now
+        self._allowance -= nbytes
+        if self._allowance < 0:
+            time.sleep(-self._allowance / self.rate)
+
+
+class MirrorStats:
+    def __init__(self):
+        self.files_copied = 0
+        self.files_updated = 0
+        self.files_deleted = 0
+        self.dirs_created = 0
+        self.blocks_total = 0
+        self.blocks_changed = 0
+        self.bytes_written = 0
+        self.bytes_full = 0  # 全量复制需要写入的字节数
+        self.errors = []
+
+    @property
+    def bytes_saved(self):
+        return max(0, self.bytes_full - self.bytes_written)
+
+
+class Mirror:
+    """把 source 目录单向同步到 target
+
+    dry_run 只统计不写入；delete_extraneous 删除目标中源目录不存在的项目；
+    bandwidth_limit 限制每秒写入的字节数。大于 delta_threshold 的已变化文件按
+    block_size 分块，用 Adler-32 弱校验加 BLAKE2b 强校验找出不同的块并原地改写。
+    remove(path) 用于删除多余的项目，默认直接删除。
+    """
+
+    def __init__(self, source, target, dry_run=False, delete_extraneous=False, bandwidth_limit=0,
+                 block_size=1024 * 1024, delta_threshold=8 * 1024 * 1024, remove=None, progress=None):
+        self.source = source
+        self.target = target
+        self.dry_run = dry_run
+        self.delete_extraneous = delete_extraneous
+        self.block_size = block_size
+        self.delta_threshold = delta_threshold
+        self.remove = remove or self._remove
+        self.progress = progress
+        self.throttle = Throttle(bandwidth_limit)
+        self.stats = MirrorStats()
+        self.cancel_event = threading.Event()
+        self._last_progress = 0
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        """执行同步（阻塞），返回 MirrorStats"""
+        diffs = queue.SimpleQueue()
+        comparer = DirectoryComparer(self.source, self.target, diffs.put)
+        comparer.start()
+        try:
+            while True:
+                finished = comparer.finished
+                try:
+                    batch = diffs.get(timeout=0.1)
+                except queue.Empty:
+                    if finished:
+                        break
+                    continue
+                for diff in batch:
+                    self._check_cancel()
+                    try:
+                        self._apply(diff)
+                    except MirrorCancelled:
+                        raise
+                    except OSError as e:
+                        self.stats.errors.append(f"{diff.relpath}: {str(e)}")
+        except MirrorCancelled:
+            comparer.cancel()
+        return self.stats
+
+    def _check_cancel(self):
+        if self.cancel_event.is_set():
+            raise MirrorCancelled()
+
+    def _report(self, path, force=False):
+        now = time.monotonic()
+        if self.progress and (force or now - self._last_progress > 0.2):
+            self._last_progress = now
+            self.progress(self.stats, path)
+
+    def _apply(self, diff):
+        src = os.path.join(self.source, diff.relpath)
+        dst = os.path.join(self.target, diff.relpath)
+        if diff.status == SCAN_ERROR:
+            # 不知道另一侧的真实内容，既不复制也不删除
+            self.stats.errors.append(f"{diff.relpath or '.'}: 无法读取，已跳过")
+            return
+        if diff.status == RIGHT_ONLY:
+            if self.delete_extraneous:
+                if not self.dry_run:
+                    self.remove(dst)
+                self.stats.files_deleted += 1
+            return
+        if diff.status == TYPE_MISMATCH:
+            if not self.delete_extraneous:
+                self.stats.errors.append(f"{diff.relpath}: 类型不同，需要启用删除多余项目")
+                return
+            if not self.dry_run:
+                self.remove(dst)
+            self.stats.files_deleted += 1
+        if os.path.isdir(src):
+            self._copy_tree(src, dst)
+        elif diff.status == CHANGED and os.path.getsize(src) >= self.delta_threshold:
+            self._delta_copy(src, dst)
+        else:
+            self._copy_file(src, dst, diff.status == CHANGED)
+
+    def _copy_tree(self, src, dst):
+        """复制整个文件夹；单个项目出错时记录错误并继续复制其余项目"""
+        if not self.dry_run:
+            os.makedirs(dst, exist_ok=True)
+        self.stats.dirs_created += 1
+        with os.scandir(src) as entries:
+            for entry in entries:
+                self._check_cancel()
+                target = os.path.join(dst, entry.name)
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        self._copy_tree(entry.path, target)
+                    else:
+                        self._copy_file(entry.path, target, False)
+                except OSError as e:
+                    self.stats.errors.append(f"{os.path.relpath(entry.path, self.source)}: {str(e)}")
+        if not self.dry_run:
+            shutil.copystat(src, dst)
+
+    def _copy_file(self, src, dst, existed):
+        """整体复制，先写临时文件再替换，取消时不会留下半个文件"""
+        size = os.path.getsize(src)
+        self.stats.bytes_full += size
+        if existed:
+            self.stats.files_updated += 1
+        else:
+            self.stats.files_copied += 1
+        if self.dry_run:
+            self.stats.bytes_written += size
+            return
+
+        partial = dst + ".partial"
+        try:
+            with open(src, "rb") as fsrc, open(partial, "wb") as fdst:
+                while True:
+                    self._check_cancel()
+                    chunk = fsrc.read(COPY_CHUNK)
+                    if not chunk:
+                        break
+                    self.throttle.consume(len(chunk))
+                    fdst.write(chunk)
+                    self.stats.bytes_written += len(chunk)
+                    self._report(src)
+            shutil.copystat(src, partial)
+            os.replace(partial, dst)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+
+    def _delta_copy(self, src, dst):
+        """按块比较并只改写不同的块（原地修改目标文件）
+
+        块在原位置比较，插入或删除数据后其后的块都会改写：两侧都在本地，移位的数据
+        也必须写到新位置，按滚动校验查找移位的块并不能减少写入量。
+        修改时间在全部写完后才设为源文件的时间，中途取消或出错时目标文件的时间已改变，
+        下次比较仍会视为已变化并重新同步。
+        """
+        size = os.path.getsize(src)
+        self.stats.bytes_full += size
+        self.stats.files_updated += 1
+
+        signatures = self._block_signatures(dst)
+        mode = "rb" if self.dry_run else "r+b"
+        with open(src, "rb") as fsrc, open(dst, mode) as fdst:
+            index = 0
+            while True:
+                self._check_cancel()
+                block = fsrc.read(self.block_size)
+                if not block:
+                    break
+                self.stats.blocks_total += 1
+                if index >= len(signatures) or signatures[index] != self._signature(block, signatures[index][0]):
+                    self.stats.blocks_changed += 1
+                    self.stats.bytes_written += len(block)
+                    if not self.dry_run:
+                        self.throttle.consume(len(block))
+                        fdst.seek(index * self.block_size)
+                        fdst.write(block)
+                index += 1
+                self._report(src)
+            if not self.dry_run:
+                fdst.truncate(size)
+        if not self.dry_run:
+            shutil.copystat(src, dst)
+
+    def _block_signatures(self, path):
+        """计算目标文件每个块的 (弱校验, 强校验)"""
+        signatures = []
+        with open(path, "rb") as f:
+            while True:
+                self._check_cancel()
+                block = f.read(self.block_size)
+                if not block:
+                    break
+                signatures.append((zlib.adler32(block), hashlib.blake2b(block, digest_size=16).digest()))
+        return signatures
+
+    @staticmethod
+    def _signature(block, expected_weak):
+        """先比较弱校验，相同时才计算强校验"""
+        weak = zlib.adler32(block)
+        if weak != expected_weak:
+            return (weak, None)
+        return (weak, hashlib.blake2b(block, digest_size=16).digest())
+
+    @staticmethod
+    def _remove(path):
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
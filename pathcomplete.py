@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""地址栏自动补全
+
+候选项来自两处：访问过的路径组成的前缀树，以及在后台列出并缓存的父目录中的子文件夹。
+查询只读内存中的数据，不会访问磁盘；缓存中没有的目录在后台列出（经由 PathProber，
+失去响应的挂载点会直接失败），结果在下一次按键时出现。
+所有方法都是线程安全的（Windows 上的补全在后台线程中调用）。
+"""
+import os
+import threading
+import time
+
+
+def _fold(name):
+    """Windows 路径不区分大小写"""
+    return name.lower() if os.name == "nt" else name
+
+
+def split_path(path):
+    """拆分为 [根, 组件...]，如 ["C:\\\\", "Users", "me"] 或 ["/", "usr", "lib"]"""
+    drive, rest = os.path.splitdrive(path)
+    root = drive + os.sep if rest.startswith(("/", "\\")) else drive
+    parts = [p for p in rest.replace("\\", "/").split("/") if p] if os.name == "nt" else [p for p in rest.split("/") if p]
+    return ([root] if root else []) + parts
+
+
+class _Node:
+    __slots__ = ("children", "name", "visits")
+
+    def __init__(self, name):
+        self.children = {}  # 折叠大小写后的组件 -> _Node
+        self.name = name  # 原始大小写
+        self.visits = 0
+
+
+class PathTrie:
+    """以路径组件为单位的前缀树，节点数与访问过的目录数成正比"""
+
+    def __init__(self):
+        self._root = _Node("")
+        self._lock = threading.Lock()
+        self.size = 0
+
+    def add(self, path, visits=1):
+        parts = split_path(os.path.normpath(path))
+        with self._lock:
+            node = self._root
+            for part in parts:
+                child = node.children.get(_fold(part))
+                if child is None:
+                    child = node.children[_fold(part)] = _Node(part)
+                node = child
+            if not node.visits:
+                self.size += 1
+            node.visits += visits
+
+    def complete(self, text, limit=20):
+        """返回以 text 开头的已访问路径，按访问次数从多到少，优先返回较浅的路径"""
+        ends_with_sep = text.endswith(("/", "\\"))
+        parts = split_path(text)
+        if not parts:
+            return []
+        whole, partial = (parts, "") if ends_with_sep else (parts[:-1], parts[-1])
+
+        with self._lock:
+            node = self._root
+            prefix = []
+            for part in whole:
+                node = node.children.get(_fold(part))
+                if node is None:
+                    return []
+                prefix.append(node.name)
+            folded = _fold(partial)
+            level = [(prefix + [child.name], child) for key, child in node.children.items()
+                     if key.startswith(folded)]
+            # 逐层展开，每层按访问次数排序，收集到 limit 个为止
+            result = []
+            while level and len(result) < limit:
+                level.sort(key=lambda item: -item[1].visits)
+                next_level = []
+                for names, child in level:
+                    if child.visits:
+                        result.append(os.path.join(*names))
+                        if len(result) >= limit:
+                            break
+                    next_level.extend((names + [c.name], c) for c in child.children.values())
+                level = next_level
+        return result
+
+
+def list_subdirs(path):
+    with os.scandir(path) as entries:
+        return sorted(entry.name for entry in entries if entry.is_dir())
+
+
+class SubdirCache:
+    """父目录中子文件夹名称的缓存，缺失或过期时在后台通过 prober 重新列出"""
+
+    def __init__(self, prober, ttl=10.0, max_dirs=256):
+        self.prober = prober
+        self.ttl = ttl
+        self.max_dirs = max_dirs
+        self._lock = threading.Lock()
+        self._cache = {}  # 目录 -> (时间, [名称])
+        self._pending = set()
+
+    def get(self, directory, on_loaded=None):
+        """返回缓存的子文件夹名称（可能为 None），过期时在后台刷新，完成后调用 on_loaded(directory)"""
+        key = _fold(os.path.normpath(directory))
+        with self._lock:
+            cached = self._cache.get(key)
+            fresh = cached is not None and time.monotonic() - cached[0] < self.ttl
+            if fresh or key in self._pending:
+                return cached[1] if cached else None
+            self._pending.add(key)
+
+        def loaded(path, result):
+            with self._lock:
+                self._pending.discard(key)
+                if isinstance(result, list):
+                    self._cache[key] = (time.monotonic(), result)
+                    if len(self._cache) > self.max_dirs:
+                        oldest = min(self._cache, key=lambda k: self._cache[k][0])
+                        del self._cache[oldest]
+            if on_loaded and isinstance(result, list):
+                on_loaded(directory)
+
+        self.prober.run(directory, list_subdirs, loaded, timeout=2.0)
+        return cached[1] if cached else None
+
+    def invalidate(self, directory):
+        with self._lock:
+            self._cache.pop(_fold(os.path.normpath(directory)), None)
+
+
+class PathCompletions:
+    """合并前缀树和子文件夹缓存的候选项"""
+
+    def __init__(self, prober, limit=50):
+        self.trie = PathTrie()
+        self.subdirs = SubdirCache(prober)
+        self.limit = limit
+
+    def add_visited(self, path, visits=1):
+        self.trie.add(path, visits)
+
+    def complete(self, text, on_loaded=None):
+        text = os.path.expanduser(text)
+        if not text or not os.path.isabs(text):
+            return []
+        if text.endswith(("/", "\\")):
+            directory, partial = text, ""
+        else:
+            directory, partial = os.path.split(text)
+
+        result = self.trie.complete(text, self.limit)
+        names = self.subdirs.get(directory, on_loaded)
+        if names:
+            folded = _fold(partial)
+            seen = {_fold(p) for p in result}
+            for name in names:
+                if _fold(name).startswith(folded):
+                    candidate = os.path.join(directory, name)
+                    if _fold(candidate) not in seen:
+                        result.append(candidate)
+                        if len(result) >= self.limit:
+                            break
+        return result
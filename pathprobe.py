@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""在后台线程中探测路径，避免失去响应的网络挂载点卡住界面
+
+卡住的系统调用无法中断，因此每次探测使用独立的线程并设置超时：超时后立即回调，
+线程则留在后台直到系统调用返回。发生超时的挂载点在一段时间内被标记为无响应，
+之后对它的探测直接失败，不会继续堆积被阻塞的线程。
+"""
+import os
+import stat
+import threading
+import time
+from collections import namedtuple
+
+ProbeResult = namedtuple("ProbeResult", "exists is_dir readable error")
+ProbeResult.__doc__ = """探测结果；error 为 None、OSError、TIMEOUT 或 UNRESPONSIVE"""
+
+TIMEOUT = "timeout"  # 本次探测超时
+UNRESPONSIVE = "unresponsive"  # 挂载点最近超时过，未实际探测
+
+MOUNTS_TTL = 30.0
+
+
+class _Mounts:
+    """缓存的挂载点列表（只做字符串匹配，不访问被探测的路径）"""
+
+    def __init__(self):
+        self._points = []
+        self._loaded = 0.0
+        self._lock = threading.Lock()
+
+    def mount_point(self, path):
+        scheme, sep, rest = path.partition("://")
+        if sep and scheme.isalpha() and len(scheme) > 1:
+            return f"{scheme}://{rest.split('/', 1)[0]}"  # sftp:// 等远程位置按主机区分
+        path = os.path.abspath(path)
+        if os.name == "nt":
+            # 盘符或 \\server\share
+            return os.path.splitdrive(path)[0].upper() or path
+        with self._lock:
+            if time.monotonic() - self._loaded > MOUNTS_TTL:
+                self._points = self._read()
+                self._loaded = time.monotonic()
+            points = self._points
+        for point in points:
+            if path == point or path.startswith(point.rstrip("/") + "/"):
+                return point
+        return "/"
+
+    @staticmethod
+    def _read():
+        try:
+            with open("/proc/mounts", encoding="utf-8") as f:
+                points = [line.split()[1].replace("\\040", " ") for line in f]
+        except OSError:
+            points = []
+        return sorted(set(points), key=len, reverse=True)
+
+
+class ProbeRequest:
+    """一次探测；cancel() 后不再回调"""
+
+    def __init__(self, path, callback, mount):
+        self.path = path
+        self.callback = callback
+        self.mount = mount
+        self.cancelled = False
+        self.timed_out = False
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self.cancelled = True
+
+    @property
+    def pending(self):
+        return not self._finished and not self.cancelled
+
+    def _finish(self, timed_out=False):
+        """标记完成，只有第一次调用返回 True"""
+        with self._lock:
+            if self._finished:
+                return False
+            self._finished = True
+            self.timed_out = timed_out
+            return True
+
+    def _deliver(self, result):
+        if not self.cancelled:
+            self.callback(self.path, result)
+
+
+class PathProber:
+    """异步探测路径
+
+    probe(path, callback) 立即返回 ProbeRequest，callback(path, ProbeResult) 在后台线程中调用。
+    timeout 秒内没有返回的挂载点在 unresponsive_ttl 秒内直接返回 UNRESPONSIVE。
+    blocked_threads 为仍被卡住的线程数。
+    """
+
+    def __init__(self, timeout=3.0, unresponsive_ttl=30.0):
+        self.timeout = timeout
+        self.unresponsive_ttl = unresponsive_ttl
+        self._mounts = _Mounts()
+        self._lock = threading.Lock()
+        self._unresponsive = {}  # 挂载点 -> 到期时间
+        self.blocked_threads = 0
+
+    def is_unresponsive(self, path):
+        mount = self._mounts.mount_point(path)
+        with self._lock:
+            expires = self._unresponsive.get(mount)
+            return expires is not None and expires > time.monotonic()
+
+    def probe(self, path, callback, timeout=None):
+        """检查 path 是否存在、是否为目录、是否可读"""
+        return self.run(path, probe_path, callback, timeout)
+
+    def run(self, path, func, callback, timeout=None):
+        """在后台执行 func(path)（如打开文件），同样受超时和无响应缓存的保护
+
+        callback(path, result) 收到 func 的返回值，超时、无响应或 OSError 时收到 ProbeResult。
+        """
+        request = ProbeRequest(path, callback, self._mounts.mount_point(path))
+        if self.is_unresponsive(path):
+            request._finish()
+            threading.Thread(target=request._deliver, args=(ProbeResult(False, False, False, UNRESPONSIVE),),
+                             daemon=True).start()
+            return request
+        threading.Thread(target=self._run, args=(request, func), daemon=True).start()
+        timer = threading.Timer(timeout or self.timeout, self._on_timeout, args=(request,))
+        timer.daemon = True
+        timer.start()
+        return request
+
+    def _run(self, request, func):
+        try:
+            result = func(request.path)
+        except OSError as e:
+            result = ProbeResult(False, False, False, e)
+        finished = request._finish()
+        with self._lock:
+            if request.timed_out:
+                self.blocked_threads -= 1
+            # 调用返回说明挂载点已恢复响应
+            self._unresponsive.pop(request.mount, None)
+        if finished:
+            request._deliver(result)
+
+    def _on_timeout(self, request):
+        if not request._finish(timed_out=True):
+            return
+        with self._lock:
+            self._unresponsive[request.mount] = time.monotonic() + self.unresponsive_ttl
+            self.blocked_threads += 1
+        request._deliver(ProbeResult(False, False, False, TIMEOUT))
+
+
+def probe_path(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return ProbeResult(False, False, False, None)
+    return ProbeResult(True, stat.S_ISDIR(st.st_mode), os.access(path, os.R_OK), None)
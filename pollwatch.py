@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""网络和 FUSE 文件系统上的轮询监控
+
+NFS、SMB、FUSE 等文件系统收不到 inotify / ReadDirectoryChangesW 通知，
+此时改为定期轮询：每次先只 stat 目录本身，目录的修改时间变化（新建、删除、重命名）
+时才重新列出目录并与上次的快照比较；文件内容的修改不会改变目录的修改时间，
+因此每隔若干次轮询再做一次完整比较。
+
+轮询间隔根据变化频率自动调整：发现变化时缩短，没有变化时逐渐延长；
+目录越大、列目录越慢，最短间隔越长，使轮询占用的时间保持在很小的比例。
+"""
+import ctypes
+import os
+import threading
+import time
+
+REMOTE_FS_TYPES = {"nfs", "nfs4", "cifs", "smb3", "smbfs", "ncpfs", "afs", "9p", "ceph", "glusterfs",
+                   "lustre", "davfs", "sshfs", "virtiofs", "vboxsf", "prl_fs"}
+DRIVE_REMOTE = 4
+
+
+def filesystem_type(path):
+    """返回 path 所在文件系统的类型（Linux 读取 /proc/mounts），未知时返回 None"""
+    try:
+        with open("/proc/mounts", encoding="utf-8") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best, fs_type = "", None
+    for mount_point, mount_type in mounts:
+        mount_point = mount_point.replace("\\040", " ")
+        if (path == mount_point or path.startswith(mount_point.rstrip("/") + "/")) and len(mount_point) > len(best):
+            best, fs_type = mount_point, mount_type
+    return fs_type
+
+
+def needs_polling(path):
+    """path 是否位于收不到变更通知的文件系统上"""
+    if os.name == "nt":
+        if path.startswith("\\\\"):
+            return True
+        drive = os.path.splitdrive(os.path.abspath(path))[0]
+        return ctypes.windll.kernel32.GetDriveTypeW(drive + "\\") == DRIVE_REMOTE
+    fs_type = filesystem_type(path)
+    return bool(fs_type) and (fs_type in REMOTE_FS_TYPES or fs_type.startswith("fuse"))
+
+
+def take_snapshot(path):
+    """列出目录，返回 ({名称: (是否目录, 大小, 修改时间)}, I/O 次数)"""
+    snapshot = {}
+    ops = 1
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            ops += 1
+            snapshot[entry.name] = (entry.is_dir(follow_symlinks=False), st.st_size, st.st_mtime_ns)
+    return snapshot, ops
+
+
+def diff_snapshots(old, new):
+    """返回 [(类型, 名称)]，类型为 created、deleted 或 modified"""
+    events = [("deleted", name) for name in old.keys() - new.keys()]
+    events += [("created", name) for name in new.keys() - old.keys()]
+    events += [("modified", name) for name in old.keys() & new.keys() if old[name] != new[name]]
+    return events
+
+
+class WatchedDir:
+    """一个被轮询的目录及其开销统计"""
+
+    def __init__(self, path, callback):
+        self.path = path
+        self.callbacks = [callback]
+        self.snapshot = None
+        self.dir_stamp = None
+        self.interval = None
+        self.next_due = 0.0
+        self.quiet_polls = 0
+        self.polls = 0
+        self.scans = 0
+        self.changes = 0
+        self.io_ops = 0
+        self.cpu_time = 0.0
+        self.last_scan_time = 0.0
+        self.error = None
+
+
+class PollingWatcher:
+    """在一个后台线程中轮询多个目录
+
+    callback(path, events) 在轮询线程中调用，events 为 diff_snapshots 的结果，
+    目录无法访问时 events 为 [("error", 异常说明)]。
+    """
+
+    def __init__(self, min_interval=1.0, max_interval=30.0, full_scan_every=10, max_overhead=0.01):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.full_scan_every = full_scan_every
+        self.max_overhead = max_overhead  # 列目录时间占轮询间隔的最大比例
+        self._watches = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def watch(self, path, callback):
+        """开始轮询 path，返回句柄；同一目录的多个回调共用一次轮询"""
+        with self._cond:
+            watched = self._watches.get(path)
+            if watched is None:
+                watched = self._watches[path] = WatchedDir(path, callback)
+                watched.interval = self.min_interval
+            else:
+                watched.callbacks.append(callback)
+            self._cond.notify()
+        return (path, callback)
+
+    def unwatch(self, handle):
+        path, callback = handle
+        with self._cond:
+            watched = self._watches.get(path)
+            if watched and callback in watched.callbacks:
+                watched.callbacks.remove(callback)
+                if not watched.callbacks:
+                    del self._watches[path]
+
+    def stats(self):
+        """返回各目录的统计 [(路径, 间隔, 轮询次数, 列目录次数, 变化次数, I/O 次数, CPU 秒, 错误)]"""
+        with self._cond:
+            return [(w.path, w.interval, w.polls, w.scans, w.changes, w.io_ops, w.cpu_time, w.error)
+                    for w in self._watches.values()]
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = time.monotonic()
+                    due = [w for w in self._watches.values() if w.next_due <= now]
+                    if due:
+                        break
+                    wait = min((w.next_due for w in self._watches.values()), default=now + 60) - now
+                    self._cond.wait(max(0.05, wait))
+                if self._stopped:
+                    return
+            for watched in due:
+                self._poll(watched)
+
+    def _poll(self, watched):
+        cpu_start = time.thread_time()
+        events = []
+        try:
+            st = os.stat(watched.path)
+            watched.io_ops += 1
+            stamp = (st.st_mtime_ns, st.st_size)
+            watched.polls += 1
+            full = watched.polls % self.full_scan_every == 0
+            if watched.snapshot is None or stamp != watched.dir_stamp or full:
+                start = time.monotonic()
+                snapshot, ops = take_snapshot(watched.path)
+                watched.last_scan_time = time.monotonic() - start
+                watched.io_ops += ops
+                watched.scans += 1
+                if watched.snapshot is not None:
+                    events = diff_snapshots(watched.snapshot, snapshot)
+                watched.snapshot = snapshot
+            watched.dir_stamp = stamp
+            watched.error = None
+        except OSError as e:
+            if watched.error is None:
+                events = [("error", str(e))]
+            watched.error = str(e)
+        watched.cpu_time += time.thread_time() - cpu_start
+        self._adapt(watched, bool(events))
+
+        if events:
+            watched.changes += 1
+            with self._cond:
+                callbacks = list(watched.callbacks)
+            for callback in callbacks:
+                callback(watched.path, events)
+
+    def _adapt(self, watched, changed):
+        """发现变化时间隔减半，连续无变化时逐渐延长；大目录的最短间隔更长"""
+        floor = self.min_interval
+        if watched.snapshot:
+            floor *= 1 + len(watched.snapshot) / 2000
+        floor = max(floor, watched.last_scan_time / self.max_overhead)
+        if changed:
+            watched.quiet_polls = 0
+            interval = watched.interval / 2
+        else:
+            watched.quiet_polls += 1
+            interval = watched.interval * 1.5 if watched.quiet_polls >= 3 else watched.interval
+        watched.interval = min(self.max_interval, max(floor, interval))
+        watched.next_due = time.monotonic() + watched.interval
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""预览窗格的后台加载器：当前项优先、相邻项预读，选择变化后取消过期的加载"""
+import os
+import threading
+from collections import deque
+
+from membudget import private_cache
+
+
+class PreviewLoader:
+    """在工作线程中加载预览内容
+
+    load(path, cancel_event) 在工作线程中调用，应在读取过程中检查 cancel_event，
+    返回任意结果对象；callback(path, result) 也在工作线程中调用，只对当前选中项触发。
+    结果按 (修改时间, 大小) 缓存，再次选中时先显示缓存，工作线程确认文件未变化后不再重复回调。
+    cache 为 membudget 的缓存，不给出时使用只保留 cache_size 个结果的独立缓存。
+    """
+
+    def __init__(self, load, workers=2, cache_size=16, cache=None):
+        self.load = load
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._wanted = set()
+        self._inflight = {}  # path -> 取消标志
+        self._cache = cache if cache is not None else private_cache(cache_size)  # path -> (stamp, result)
+        self._current = None
+        self._callback = None
+        self._shown = None  # 最近一次回调的 (path, stamp)
+        self._stopped = False
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def request(self, path, readahead=(), callback=None):
+        """选中项变化：加载 path，并预读 readahead 中的路径
+
+        不在新请求范围内的排队任务被丢弃，正在加载的任务被取消。
+        返回缓存中的结果（可能已过期，工作线程会重新校验），没有缓存时返回 None。
+        """
+        with self._cond:
+            self._current = path
+            self._callback = callback
+            wanted = [path] + [p for p in readahead if p and p != path]
+            self._wanted = set(wanted)
+            for inflight_path, cancel in self._inflight.items():
+                if inflight_path not in self._wanted:
+                    cancel.set()
+            # 已被取消但仍在执行的任务不会回调，需要重新排队
+            self._pending = deque(p for p in wanted
+                                  if p not in self._inflight or self._inflight[p].is_set())
+            self._cond.notify_all()
+
+            cached = self._cache.get(path)
+            if cached is None:
+                self._shown = None
+                return None
+            self._shown = (path, cached[0])
+            return cached[1]
+
+    def cancel(self):
+        """取消所有排队和正在进行的加载"""
+        with self._cond:
+            self._current = None
+            self._wanted = set()
+            self._pending.clear()
+            for cancel in self._inflight.values():
+                cancel.set()
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            for cancel in self._inflight.values():
+                cancel.set()
+            self._cond.notify_all()
+
+    def _next_job(self):
+        with self._cond:
+            while not self._stopped:
+                if self._pending:
+                    path = self._pending.popleft()
+                    cancel = threading.Event()
+                    self._inflight[path] = cancel
+                    return path, cancel
+                self._cond.wait()
+            return None
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            path, cancel = job
+            try:
+                try:
+                    st = os.stat(path)
+                    stamp = (st.st_mtime_ns, st.st_size)
+                    with self._cond:
+                        cached = self._cache.get(path)
+                    if cached is not None and cached[0] == stamp:
+                        result = cached[1]
+                    else:
+                        result = self.load(path, cancel)
+                except Exception as e:
+                    stamp, result = None, e
+                if cancel.is_set():
+                    continue
+                with self._cond:
+                    if stamp is not None:
+                        self._cache.put(path, (stamp, result))
+                    if path != self._current or self._shown == (path, stamp):
+                        continue
+                    self._shown = (path, stamp)
+                    callback = self._callback
+                if callback:
+                    callback(path, result)
+            finally:
+                with self._cond:
+                    if self._inflight.get(path) is cancel:
+                        del self._inflight[path]
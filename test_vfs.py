@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""vfs 的测试：通过 VFS 操作挂载的 MemoryFileSystem，以及内存与本地之间的复制"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from vfs import VFS, MemoryFileSystem
+
+
+class VFSMemoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vfs = VFS()
+        self.mem = MemoryFileSystem()
+        self.vfs.mount("mem://t", self.mem)
+        self.local = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.local, True)
+        self.addCleanup(self.vfs.close)
+
+    def write(self, path, data):
+        with self.vfs.open(path, "wb") as f:
+            f.write(data)
+
+    def read(self, path):
+        with self.vfs.open(path, "rb") as f:
+            return f.read()
+
+    def names(self, path):
+        return sorted(entry.name for entry in self.vfs.list_dir(path))
+
+    def test_list_and_stat(self):
+        self.vfs.mkdir("mem://t/docs")
+        self.write("mem://t/a.txt", b"hello")
+        entries = {entry.name: entry for entry in self.vfs.list_dir("mem://t/")}
+        self.assertEqual(sorted(entries), ["a.txt", "docs"])
+        self.assertTrue(entries["docs"].is_dir)
+        self.assertEqual(entries["a.txt"].size, 5)
+        st = self.vfs.stat("mem://t/a.txt")
+        self.assertFalse(st.is_dir)
+        self.assertEqual(st.size, 5)
+        self.assertTrue(self.vfs.stat("mem://t/docs").is_dir)
+        with self.assertRaises(FileNotFoundError):
+            self.vfs.stat("mem://t/missing")
+        with self.assertRaises(NotADirectoryError):
+            self.vfs.list_dir("mem://t/a.txt")
+
+    def test_probe(self):
+        self.vfs.mkdir("mem://t/docs")
+        result = self.vfs.probe("mem://t/docs")
+        self.assertTrue(result.exists)
+        self.assertTrue(result.is_dir)
+        self.assertFalse(self.vfs.probe("mem://t/missing").exists)
+
+    def test_open(self):
+        self.write("mem://t/a.bin", b"0123456789")
+        with self.vfs.open("mem://t/a.bin", "rb") as f:
+            self.assertEqual(f.read(4), b"0123")
+            self.assertEqual(f.read(), b"456789")
+            self.assertEqual(f.read(), b"")
+        with self.assertRaises(FileExistsError):
+            self.vfs.open("mem://t/a.bin", "xb")
+        with self.assertRaises(FileNotFoundError):
+            self.vfs.open("mem://t/missing", "rb")
+        self.vfs.mkdir("mem://t/docs")
+        with self.assertRaises(IsADirectoryError):
+            self.vfs.open("mem://t/docs", "rb")
+
+    def test_mkdir(self):
+        self.vfs.mkdir("mem://t/a/b/c")
+        self.vfs.mkdir("mem://t/a/b")  # 已存在时不报错
+        self.assertEqual(self.names("mem://t/a"), ["b"])
+        self.assertEqual(self.names("mem://t/a/b"), ["c"])
+        self.write("mem://t/file", b"")
+        with self.assertRaises(FileExistsError):
+            self.vfs.mkdir("mem://t/file/sub")
+
+    def test_rename(self):
+        self.vfs.mkdir("mem://t/a/b")
+        self.write("mem://t/a/b/f.txt", b"data")
+        self.vfs.rename("mem://t/a/b/f.txt", "mem://t/a/g.txt")
+        self.assertEqual(self.names("mem://t/a"), ["b", "g.txt"])
+        self.assertEqual(self.read("mem://t/a/g.txt"), b"data")
+        self.vfs.rename("mem://t/a", "mem://t/z")
+        self.assertEqual(self.names("mem://t/"), ["z"])
+        with self.assertRaises(FileNotFoundError):
+            self.vfs.rename("mem://t/missing", "mem://t/x")
+
+    def test_rename_into_itself(self):
+        self.vfs.mkdir("mem://t/a/b/c")
+        with self.assertRaises(OSError):
+            self.vfs.rename("mem://t/a", "mem://t/a/b/c/d")
+        self.assertEqual(self.names("mem://t/a/b"), ["c"])
+
+    def test_rename_across_filesystems(self):
+        self.write("mem://t/a.txt", b"x")
+        with self.assertRaises(OSError):
+            self.vfs.rename("mem://t/a.txt", os.path.join(self.local, "a.txt"))
+
+    def test_copy_memory_to_local(self):
+        self.vfs.mkdir("mem://t/src/sub")
+        self.write("mem://t/src/a.txt", b"alpha")
+        self.write("mem://t/src/sub/b.bin", b"\x00\x01" * 1000)
+        self.mem.set_mtime("/src/a.txt", 1000000000)
+        dest = self.vfs.copy("mem://t/src", self.local)
+        self.assertEqual(dest, os.path.join(self.local, "src"))
+        with open(os.path.join(dest, "a.txt"), "rb") as f:
+            self.assertEqual(f.read(), b"alpha")
+        with open(os.path.join(dest, "sub", "b.bin"), "rb") as f:
+            self.assertEqual(f.read(), b"\x00\x01" * 1000)
+        self.assertEqual(os.path.getmtime(os.path.join(dest, "a.txt")), 1000000000)
+        self.assertTrue(self.vfs.stat("mem://t/src").is_dir)  # 复制不影响源
+
+    def test_copy_local_to_memory(self):
+        folder = os.path.join(self.local, "docs")
+        os.makedirs(os.path.join(folder, "sub"))
+        with open(os.path.join(folder, "sub", "c.txt"), "wb") as f:
+            f.write(b"gamma")
+        self.vfs.mkdir("mem://t/in")
+        dest = self.vfs.copy(folder, "mem://t/in")
+        self.assertEqual(dest, "mem://t/in/docs")
+        self.assertEqual(self.read("mem://t/in/docs/sub/c.txt"), b"gamma")
+
+    def test_copy_does_not_overwrite(self):
+        self.write("mem://t/a.txt", b"new")
+        with open(os.path.join(self.local, "a.txt"), "wb") as f:
+            f.write(b"old")
+        with self.assertRaises(FileExistsError):
+            self.vfs.copy("mem://t/a.txt", self.local)
+        with open(os.path.join(self.local, "a.txt"), "rb") as f:
+            self.assertEqual(f.read(), b"old")
+
+    def test_move_memory_to_local(self):
+        self.write("mem://t/a.txt", b"alpha")
+        self.vfs.copy("mem://t/a.txt", self.local, move=True)
+        self.assertTrue(os.path.isfile(os.path.join(self.local, "a.txt")))
+        self.assertEqual(self.names("mem://t/"), [])
+
+    def test_move_within_memory(self):
+        self.vfs.mkdir("mem://t/a")
+        self.vfs.mkdir("mem://t/b")
+        self.write("mem://t/a/f", b"1")
+        self.assertEqual(self.vfs.copy("mem://t/a/f", "mem://t/b", move=True), "mem://t/b/f")
+        self.assertEqual(self.names("mem://t/a"), [])
+        self.assertEqual(self.read("mem://t/b/f"), b"1")
+
+    def test_trash_without_recycle_bin_deletes(self):
+        self.vfs.mkdir("mem://t/d/e")
+        self.write("mem://t/d/e/f", b"1")
+        self.write("mem://t/g", b"2")
+        self.assertFalse(self.vfs.supports_trash("mem://t/d"))
+        self.vfs.trash("mem://t/d")
+        self.vfs.remove("mem://t/g")
+        self.assertEqual(self.names("mem://t/"), [])
+        with self.assertRaises(FileNotFoundError):
+            self.vfs.trash("mem://t/d")
+        with self.assertRaises(PermissionError):
+            self.vfs.remove("mem://t/")
+
+    def test_unknown_scheme(self):
+        with self.assertRaises(FileNotFoundError):
+            self.vfs.stat("mem://other/a")
+
+
+class VFSPathTest(unittest.TestCase):
+
+    def test_url_paths(self):
+        self.assertEqual(VFS.join("mem://t/", "a", "b"), "mem://t/a/b")
+        self.assertEqual(VFS.dirname("mem://t/a/b"), "mem://t/a")
+        self.assertEqual(VFS.dirname("mem://t/a"), "mem://t/")
+        self.assertEqual(VFS.basename("mem://t/a/b"), "b")
+        self.assertEqual(VFS.normpath("mem://t/a/../b/"), "mem://t/b")
+        self.assertEqual(VFS.normpath("mem://t//"), "mem://t/")
+        self.assertFalse(VFS.is_local("sftp://user@host:22/home"))
+        self.assertTrue(VFS.isabs("mem://t/a"))
+
+    def test_local_paths(self):
+        path = os.path.join("a", "b")
+        self.assertTrue(VFS.is_local(path))
+        self.assertEqual(VFS.join("a", "b"), path)
+        self.assertEqual(VFS.basename(path), "b")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""缩略图磁盘缓存与后台加载
+
+缓存目录遵循 freedesktop 缩略图规范：文件名为源文件 URI 的 MD5，
+PNG 中的 Thumb::URI / Thumb::MTime / Thumb::Size 文本块用于校验缓存是否过期。
+"""
+import hashlib
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict, deque
+from pathlib import Path
+
+IMAGE_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".jpe", ".gif", ".bmp", ".ico",
+    ".tif", ".tiff", ".pcx", ".pnm", ".tga", ".xpm", ".webp",
+}
+
+# 规范定义的两种尺寸
+FLAVORS = {"normal": 128, "large": 256}
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def is_image_file(path):
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def fit_size(width, height, max_width, max_height):
+    """等比缩放到不超过指定尺寸，不放大"""
+    if width <= 0 or height <= 0:
+        return width, height
+    scale = min(max_width / width, max_height / height, 1.0)
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def default_cache_root():
+    """缩略图根目录：$XDG_CACHE_HOME/thumbnails 或 ~/.cache/thumbnails"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "thumbnails")
+
+
+def path_to_uri(path):
+    return Path(os.path.abspath(path)).as_uri()
+
+
+def read_png_text(path):
+    """读取 PNG 文件中的 tEXt 文本块，遇到图像数据即停止"""
+    texts = {}
+    with open(path, "rb") as f:
+        if f.read(8) != PNG_SIGNATURE:
+            return texts
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, chunk_type = struct.unpack(">I4s", header)
+            if chunk_type in (b"IDAT", b"IEND"):
+                break
+            data = f.read(length)
+            f.seek(4, os.SEEK_CUR)  # CRC
+            if chunk_type == b"tEXt" and b"\0" in data:
+                key, value = data.split(b"\0", 1)
+                texts[key.decode("latin-1")] = value.decode("latin-1")
+    return texts
+
+
+def add_png_text(png_bytes, texts):
+    """在 IHDR 之后插入 tEXt 文本块"""
+    if not png_bytes.startswith(PNG_SIGNATURE):
+        raise ValueError("不是 PNG 数据")
+    ihdr_end = 8 + 8 + struct.unpack(">I", png_bytes[8:12])[0] + 4
+    chunks = []
+    for key, value in texts.items():
+        data = key.encode("latin-1") + b"\0" + str(value).encode("latin-1")
+        chunk_type = b"tEXt"
+        crc = zlib.crc32(chunk_type + data) & 0xFFFFFFFF
+        chunks.append(struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc))
+    return png_bytes[:ihdr_end] + b"".join(chunks) + png_bytes[ihdr_end:]
+
+
+class ThumbnailCache:
+    """按 freedesktop 规范布局的磁盘缩略图缓存"""
+
+    def __init__(self, root=None, flavor="normal"):
+        self.root = root or default_cache_root()
+        self.flavor = flavor
+        self.size = FLAVORS[flavor]
+        self.directory = os.path.join(self.root, flavor)
+
+    def thumbnail_path(self, path):
+        uri = path_to_uri(path)
+        return os.path.join(self.directory, hashlib.md5(uri.encode("utf-8")).hexdigest() + ".png")
+
+    def lookup(self, path, st):
+        """返回有效的缓存缩略图路径，缓存不存在或已过期时返回 None"""
+        thumb = self.thumbnail_path(path)
+        try:
+            texts = read_png_text(thumb)
+        except OSError:
+            return None
+        if texts.get("Thumb::MTime") != str(int(st.st_mtime)):
+            return None
+        if "Thumb::Size" in texts and texts["Thumb::Size"] != str(st.st_size):
+            return None
+        return thumb
+
+    def store(self, path, st, png_bytes):
+        """写入缩略图，先写临时文件再替换，避免其他进程读到半个文件"""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        thumb = self.thumbnail_path(path)
+        data = add_png_text(png_bytes, {
+            "Thumb::URI": path_to_uri(path),
+            "Thumb::MTime": int(st.st_mtime),
+            "Thumb::Size": st.st_size,
+            "Software": "wx_explorer",
+        })
+        tmp = f"{thumb}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, thumb)
+        return thumb
+
+
+class ThumbnailLoader:
+    """缩略图后台加载池
+
+    每个视图(owner)有自己的待处理队列，request() 会整体替换该视图的队列，
+    滚动后不再可见的请求随之作废；已经开始处理的请求在解码前也会检查是否仍需要。
+    render(path, size) 在工作线程中调用，返回 PNG 数据；
+    callback(path, thumb_path) 在工作线程中调用，thumb_path 为 None 表示失败。
+    """
+
+    def __init__(self, render, cache=None, workers=4):
+        self.render = render
+        self.cache = cache or ThumbnailCache()
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # owner -> (deque[path], callback)
+        self._wanted = {}  # owner -> set(path)
+        self._failed = set()
+        self._stopped = False
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def request(self, owner, paths, callback):
+        """按优先级顺序提交路径，替换该视图之前未处理的请求"""
+        with self._cond:
+            paths = [p for p in paths if p not in self._failed]
+            self._queues[owner] = (deque(paths), callback)
+            self._wanted[owner] = set(paths)
+            self._cond.notify_all()
+
+    def cancel(self, owner):
+        with self._cond:
+            self._queues.pop(owner, None)
+            self._wanted.pop(owner, None)
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._queues.clear()
+            self._cond.notify_all()
+
+    def _next_job(self):
+        """轮流从各视图的队列中取任务"""
+        with self._cond:
+            while not self._stopped:
+                for owner, (queue, callback) in list(self._queues.items()):
+                    if queue:
+                        path = queue.popleft()
+                        self._queues.move_to_end(owner)
+                        return owner, path, callback
+                    del self._queues[owner]
+                self._cond.wait()
+            return None
+
+    def _still_wanted(self, owner, path):
+        with self._cond:
+            return path in self._wanted.get(owner, ())
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            owner, path, callback = job
+            try:
+                st = os.stat(path)
+                thumb = self.cache.lookup(path, st)
+                if thumb is None:
+                    if not self._still_wanted(owner, path):
+                        continue
+                    thumb = self.cache.store(path, st, self.render(path, self.cache.size))
+            except Exception:
+                with self._cond:
+                    self._failed.add(path)
+                thumb = None
+            callback(path, thumb)
@@ -0,0 +1,724 @@
+# -*- coding: utf-8 -*-
+"""可替换的文件系统层：本地、内存（测试用）和 SFTP
+
+本地路径仍是普通的操作系统路径；其他文件系统的路径写成 URL，如 sftp://user@host:22/home/user
+或 mem://test/dir。VFS.resolve() 把路径分派给对应的 FileSystem，各后端内部只处理自己的路径
+（本地为操作系统路径，其他为以 / 开头的 POSIX 路径）。
+
+SFTP 后端（需要可选依赖 paramiko）在一个 SSH 连接上保持若干个 SFTP 通道组成的连接池，
+多个线程可以同时列目录和传输文件：
+- 列目录使用 READDIR，服务器每次返回一批名称和属性，不需要逐个 stat；
+- 只有符号链接需要再 stat 目标，这些请求一次全部发出再依次收取响应（流水线），
+  N 个链接只需要约一次往返的时间，而不是 N 次；
+- 下载使用 paramiko 的预读（prefetch），上传使用流水线写入。
+"""
+import os
+import posixpath
+import shutil
+import stat
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+from listcache import ListingEntry, scan_listing
+from pathprobe import ProbeResult
+
+try:
+    import send2trash
+except ImportError:
+    send2trash = None
+
+try:
+    import paramiko
+except ImportError:
+    paramiko = None
+
+COPY_CHUNK = 1024 * 1024
+
+FileStat = namedtuple("FileStat", "is_dir size mtime")
+
+
+def split_url(path):
+    """把 "scheme://netloc/inner" 拆成 ("scheme://netloc", "/inner")；本地路径返回 (None, path)"""
+    scheme, sep, rest = path.partition("://")
+    if not sep or not scheme.isalpha() or len(scheme) < 2:  # Windows 盘符 C:\ 不是 URL
+        return None, path
+    netloc, slash, inner = rest.partition("/")
+    return f"{scheme}://{netloc}", "/" + inner
+
+
+class FileSystem:
+    """文件系统后端的接口；path 均为后端内部的路径
+
+    supports_trash 为 False 时 trash() 会永久删除，调用方应提醒用户。
+    """
+    supports_trash = False
+    pathmod = posixpath
+
+    def list_dir(self, path):
+        """返回 [ListingEntry]；符号链接按目标判断"""
+        raise NotImplementedError
+
+    def stat(self, path):
+        """返回 FileStat，不存在时抛出 FileNotFoundError"""
+        raise NotImplementedError
+
+    def stat_many(self, paths):
+        """批量 stat，返回与 paths 对应的 FileStat 或 OSError"""
+        results = []
+        for path in paths:
+            try:
+                results.append(self.stat(path))
+            except OSError as e:
+                results.append(e)
+        return results
+
+    def open(self, path, mode="rb"):
+        raise NotImplementedError
+
+    def mkdir(self, path):
+        """创建文件夹（包括不存在的上级），已存在时不报错"""
+        raise NotImplementedError
+
+    def rename(self, src, dst):
+        raise NotImplementedError
+
+    def remove(self, path):
+        """永久删除文件或整个文件夹"""
+        raise NotImplementedError
+
+    def trash(self, path):
+        self.remove(path)
+
+    def set_mtime(self, path, mtime):
+        pass
+
+    def probe(self, path):
+        """导航前的检查，与 pathprobe.probe_path 的结果相同"""
+        try:
+            st = self.stat(path)
+        except FileNotFoundError:
+            return ProbeResult(False, False, False, None)
+        return ProbeResult(True, st.is_dir, True, None)
+
+    def close(self):
+        pass
+
+
+class LocalFileSystem(FileSystem):
+    """本地文件系统：os / shutil / send2trash"""
+    supports_trash = send2trash is not None
+    pathmod = os.path
+
+    def list_dir(self, path):
+        return scan_listing(path)
+
+    def stat(self, path):
+        st = os.stat(path)
+        is_dir = stat.S_ISDIR(st.st_mode)
+        return FileStat(is_dir, 0 if is_dir else st.st_size, st.st_mtime)
+
+    def open(self, path, mode="rb"):
+        return open(path, mode)
+
+    def mkdir(self, path):
+        os.makedirs(path, exist_ok=True)
+
+    def rename(self, src, dst):
+        os.rename(src, dst)
+
+    def remove(self, path):
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+    def trash(self, path):
+        if send2trash is None:
+            raise OSError("未安装 send2trash，无法移动到回收站")
+        send2trash.send2trash(path)
+
+    def set_mtime(self, path, mtime):
+        os.utime(path, (mtime, mtime))
+
+    def copy_local(self, src, dst):
+        """同一文件系统中的复制，保留修改时间等元数据"""
+        if os.path.isdir(src):
+            shutil.copytree(src, dst)
+        else:
+            shutil.copy2(src, dst)
+
+
+class MemoryFileSystem(FileSystem):
+    """内存中的文件系统，用于测试和演示；节点为 {"dir": {名称: 节点}} 或 {"data": bytearray}"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._root = {"dir": {}, "mtime": time.time()}
+
+    def _node(self, path):
+        """返回 (上级节点, 名称, 节点或 None)；根目录的上级为 None"""
+        node = self._root
+        parts = [part for part in path.split("/") if part]
+        for part in parts[:-1]:
+            node = node["dir"].get(part)
+            if node is None:
+                raise FileNotFoundError(path)
+            if "dir" not in node:
+                raise NotADirectoryError(path)
+        if not parts:
+            return None, "", node
+        return node, parts[-1], node["dir"].get(parts[-1])
+
+    def _get(self, path):
+        parent, name, node = self._node(path)
+        if node is None:
+            raise FileNotFoundError(path)
+        return node
+
+    def list_dir(self, path):
+        with self._lock:
+            node = self._get(path)
+            if "dir" not in node:
+                raise NotADirectoryError(path)
+            return [ListingEntry(name, "dir" in child, 0 if "dir" in child else len(child["data"]), child["mtime"])
+                    for name, child in node["dir"].items()]
+
+    def stat(self, path):
+        with self._lock:
+            node = self._get(path)
+            is_dir = "dir" in node
+            return FileStat(is_dir, 0 if is_dir else len(node["data"]), node["mtime"])
+
+    def open(self, path, mode="rb"):
+        with self._lock:
+            if "r" in mode:
+                node = self._get(path)
+                if "dir" in node:
+                    raise IsADirectoryError(path)
+                return _MemoryReader(bytes(node["data"]))
+            parent, name, node = self._node(path)
+            if parent is None or "dir" not in parent:
+                raise IsADirectoryError(path)
+            if node is not None and "dir" in node:
+                raise IsADirectoryError(path)
+            if node is not None and "x" in mode:
+                raise FileExistsError(path)
+            node = parent["dir"][name] = {"data": bytearray(), "mtime": time.time()}
+            return _MemoryWriter(self._lock, node)
+
+    def mkdir(self, path):
+        with self._lock:
+            node = self._root
+            for part in [part for part in path.split("/") if part]:
+                child = node["dir"].get(part)
+                if child is None:
+                    child = node["dir"][part] = {"dir": {}, "mtime": time.time()}
+                elif "dir" not in child:
+                    raise FileExistsError(path)
+                node = child
+
+    def rename(self, src, dst):
+        with self._lock:
+            src_parent, src_name, node = self._node(src)
+            if node is None:
+                raise FileNotFoundError(src)
+            dst_parent, dst_name, existing = self._node(dst)
+            if src_parent is None or dst_parent is None:
+                raise PermissionError("不能移动根目录")
+            src_parts = [part for part in src.split("/") if part]
+            dst_parts = [part for part in dst.split("/") if part]
+            if len(dst_parts) > len(src_parts) and dst_parts[:len(src_parts)] == src_parts:
+                raise OSError(f"不能把文件夹移动到它自身之中: {dst}")
+            if existing is not None and "dir" in existing:
+                raise IsADirectoryError(dst)
+            dst_parent["dir"][dst_name] = src_parent["dir"].pop(src_name)
+
+    def remove(self, path):
+        with self._lock:
+            parent, name, node = self._node(path)
+            if node is None:
+                raise FileNotFoundError(path)
+            if parent is None:
+                raise PermissionError("不能删除根目录")
+            del parent["dir"][name]
+
+    def set_mtime(self, path, mtime):
+        with self._lock:
+            self._get(path)["mtime"] = mtime
+
+
+class _MemoryReader:
+    def __init__(self, data):
+        self._data = data
+        self._pos = 0
+
+    def read(self, size=-1):
+        end = len(self._data) if size is None or size < 0 else self._pos + size
+        chunk = self._data[self._pos:end]
+        self._pos += len(chunk)
+        return chunk
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _MemoryWriter:
+    def __init__(self, lock, node):
+        self._lock = lock
+        self._node = node
+
+    def write(self, data):
+        with self._lock:
+            self._node["data"] += data
+            self._node["mtime"] = time.time()
+        return len(data)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _StatCollector:
+    """流水线 stat 的响应收集器：paramiko 把编号对应的响应交给请求时登记的对象"""
+
+    def __init__(self):
+        self.responses = {}
+
+    def _async_response(self, t, msg, num):
+        self.responses[num] = (t, msg)
+
+
+class SFTPFileSystem(FileSystem):
+    """SFTP 文件系统；通过 ssh-agent 或默认的密钥文件登录（也可以传入 password）
+
+    一个 SSH 连接上最多打开 pool_size 个 SFTP 通道，空闲的通道留在池中复用；
+    连接断开后下一次请求时自动重新连接。每次连接编号（_generation）加一，
+    旧连接上的通道归还时直接关闭，不进入新连接的池，也不计入新连接的通道数。
+    """
+
+    def __init__(self, host, port=22, username=None, password=None, pool_size=4, timeout=15.0,
+                 pipeline_depth=64):
+        if paramiko is None:
+            raise OSError("SFTP 需要安装 paramiko")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.pipeline_depth = pipeline_depth
+        self._client = None
+        self._generation = 0
+        self._idle = []
+        self._open = 0
+        self._cond = threading.Condition()
+
+    # ---- 连接池 ----
+    def _connect(self):
+        """（持有锁时调用）建立 SSH 连接；返回旧连接上空闲的通道，由调用方在锁外关闭"""
+        client = paramiko.SSHClient()
+        client.load_system_host_keys()
+        client.set_missing_host_key_policy(paramiko.RejectPolicy())
+        client.connect(self.host, self.port, self.username, self.password, timeout=self.timeout,
+                       banner_timeout=self.timeout, auth_timeout=self.timeout)
+        stale, self._idle = self._idle, []
+        self._client = client
+        self._generation += 1
+        self._open = 0
+        return stale
+
+    @contextmanager
+    def _sftp(self):
+        """从池中取出一个 SFTP 通道；通道出错时丢弃，其他错误原样抛出"""
+        stale = []
+        with self._cond:
+            while not self._idle and self._open >= self.pool_size:
+                self._cond.wait()
+            if self._idle:
+                sftp = self._idle.pop()
+            else:
+                transport = self._client.get_transport() if self._client else None
+                if transport is None or not transport.is_active():
+                    try:
+                        stale = self._connect()
+                    except (paramiko.SSHException, OSError) as e:
+                        raise ConnectionError(f"无法连接 {self.host}: {e}") from e
+                sftp = None
+                self._open += 1
+            client, generation = self._client, self._generation
+        for channel in stale:
+            self._close_channel(channel)
+        try:
+            if sftp is None:
+                sftp = client.open_sftp()
+                sftp.get_channel().settimeout(self.timeout)
+            yield sftp
+        except (paramiko.SSHException, EOFError, ConnectionError, TimeoutError) as e:
+            self._discard(sftp, generation)
+            raise ConnectionError(f"与 {self.host} 的连接中断: {e}") from e
+        except BaseException:
+            self._release(sftp, generation)  # 文件不存在等错误不影响通道
+            raise
+        self._release(sftp, generation)
+
+    def _release(self, sftp, generation):
+        with self._cond:
+            if sftp is not None and generation == self._generation:
+                self._idle.append(sftp)
+                self._cond.notify()
+                return
+        self._discard(sftp, generation)
+
+    def _discard(self, sftp, generation):
+        with self._cond:
+            if generation == self._generation:
+                self._open -= 1
+                self._cond.notify()
+        self._close_channel(sftp)
+
+    @staticmethod
+    def _close_channel(sftp):
+        if sftp is not None:
+            try:
+                sftp.close()
+            except (paramiko.SSHException, OSError, EOFError):
+                pass
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            client, self._client = self._client, None
+            self._generation += 1
+            self._open = 0
+            self._cond.notify_all()
+        for sftp in idle:
+            self._close_channel(sftp)
+        if client:
+            client.close()
+
+    # ---- 操作 ----
+    @staticmethod
+    def _to_stat(attr):
+        is_dir = stat.S_ISDIR(attr.st_mode or 0)
+        return FileStat(is_dir, 0 if is_dir else attr.st_size or 0, attr.st_mtime or 0)
+
+    def list_dir(self, path):
+        with self._sftp() as sftp:
+            attrs = sftp.listdir_attr(path)  # READDIR 按批返回名称和属性
+            links = [attr for attr in attrs if stat.S_ISLNK(attr.st_mode or 0)]
+            targets = self._pipelined_stat(sftp, [posixpath.join(path, attr.filename) for attr in links])
+        resolved = {attr.filename: target for attr, target in zip(links, targets)}
+        entries = []
+        for attr in attrs:
+            st = resolved.get(attr.filename, attr)
+            if isinstance(st, OSError):
+                st = attr  # 目标不存在的链接按链接本身显示
+            entries.append(ListingEntry(attr.filename, *self._to_stat(st)))
+        return entries
+
+    def _pipelined_stat(self, sftp, paths):
+        """一次发出最多 pipeline_depth 个 STAT 请求再依次收取响应，返回 SFTPAttributes 或 OSError
+
+        使用 paramiko 预读文件时同样的内部接口（_async_request / _read_response）；
+        paramiko 版本不支持时退回逐个请求。
+        """
+        if not paths:
+            return []
+        if not hasattr(sftp, "_async_request"):
+            results = []
+            for path in paths:
+                try:
+                    results.append(sftp.stat(path))
+                except OSError as e:
+                    results.append(e)
+            return results
+        from paramiko.sftp import CMD_ATTRS, CMD_STAT, CMD_STATUS
+        results = []
+        for start in range(0, len(paths), self.pipeline_depth):
+            batch = paths[start:start + self.pipeline_depth]
+            collector = _StatCollector()
+            nums = [sftp._async_request(collector, CMD_STAT, path) for path in batch]
+            while len(collector.responses) < len(nums):
+                sftp._read_response()
+            for path, num in zip(batch, nums):
+                t, msg = collector.responses[num]
+                if t == CMD_ATTRS:
+                    results.append(paramiko.SFTPAttributes._from_msg(msg))
+                elif t == CMD_STATUS:
+                    try:
+                        sftp._convert_status(msg)
+                        results.append(FileNotFoundError(path))
+                    except OSError as e:
+                        results.append(e)
+                else:
+                    results.append(OSError(f"意外的响应: {t}"))
+        return results
+
+    def stat(self, path):
+        with self._sftp() as sftp:
+            return self._to_stat(sftp.stat(path))
+
+    def stat_many(self, paths):
+        with self._sftp() as sftp:
+            return [r if isinstance(r, OSError) else self._to_stat(r) for r in self._pipelined_stat(sftp, paths)]
+
+    def open(self, path, mode="rb"):
+        """返回的文件关闭时才把通道还给连接池"""
+        manager = self._sftp()
+        sftp = manager.__enter__()
+        try:
+            if "x" in mode:
+                try:
+                    sftp.stat(path)
+                    raise FileExistsError(path)
+                except FileNotFoundError:
+                    pass
+            f = sftp.open(path, mode.replace("x", "w").replace("b", ""))
+            if "r" in mode:
+                f.prefetch()
+            else:
+                f.set_pipelined(True)
+        except BaseException as e:
+            manager.__exit__(type(e), e, e.__traceback__)
+            raise
+        return _PooledFile(f, manager)
+
+    def mkdir(self, path):
+        with self._sftp() as sftp:
+            missing = []
+            current = path.rstrip("/") or "/"
+            while current != "/":
+                try:
+                    if stat.S_ISDIR(sftp.stat(current).st_mode):
+                        break
+                    raise FileExistsError(current)
+                except FileNotFoundError:
+                    missing.append(current)
+                    current = posixpath.dirname(current)
+            for directory in reversed(missing):
+                sftp.mkdir(directory)
+
+    def rename(self, src, dst):
+        with self._sftp() as sftp:
+            sftp.rename(src, dst)
+
+    def remove(self, path):
+        with self._sftp() as sftp:
+            self._remove(sftp, path)
+
+    def _remove(self, sftp, path):
+        if stat.S_ISDIR(sftp.lstat(path).st_mode):
+            for attr in sftp.listdir_attr(path):
+                child = posixpath.join(path, attr.filename)
+                if stat.S_ISDIR(attr.st_mode or 0):
+                    self._remove(sftp, child)
+                else:
+                    sftp.remove(child)
+            sftp.rmdir(path)
+        else:
+            sftp.remove(path)
+
+    def set_mtime(self, path, mtime):
+        with self._sftp() as sftp:
+            sftp.utime(path, (mtime, mtime))
+
+    def probe(self, path):
+        try:
+            return super().probe(path)
+        except ConnectionError as e:
+            return ProbeResult(False, False, False, e)
+
+
+class _PooledFile:
+    """包装 SFTPFile，关闭时把通道还给连接池"""
+
+    def __init__(self, f, manager):
+        self._f = f
+        self._manager = manager
+
+    def read(self, size=-1):
+        return self._f.read(size if size is not None and size >= 0 else None)
+
+    def write(self, data):
+        self._f.write(data)
+        return len(data)
+
+    def close(self):
+        if self._manager is not None:
+            manager, self._manager = self._manager, None
+            try:
+                self._f.close()
+            finally:
+                manager.__exit__(None, None, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class VFS:
+    """按路径分派到各个文件系统；本地路径由 LocalFileSystem 处理
+
+    未挂载的 sftp:// 路径在第一次使用时自动创建 SFTPFileSystem（user@host:port）。
+    """
+
+    def __init__(self):
+        self.local = LocalFileSystem()
+        self._mounts = {}
+        self._lock = threading.Lock()
+
+    def mount(self, base, fs):
+        """base 形如 "mem://test"，之后以它开头的路径都交给 fs"""
+        with self._lock:
+            self._mounts[base] = fs
+
+    def close(self):
+        with self._lock:
+            mounts, self._mounts = self._mounts, {}
+        for fs in mounts.values():
+            fs.close()
+
+    def resolve(self, path):
+        """返回 (文件系统, 内部路径)"""
+        base, inner = split_url(path)
+        if base is None:
+            return self.local, path
+        with self._lock:
+            fs = self._mounts.get(base)
+            if fs is None:
+                fs = self._mounts[base] = self._create(base)
+        return fs, inner
+
+    @staticmethod
+    def _create(base):
+        scheme, netloc = base.split("://", 1)
+        if scheme != "sftp":
+            raise FileNotFoundError(f"不支持的位置: {base}")
+        userinfo, _, hostport = netloc.rpartition("@")
+        host, _, port = hostport.partition(":")
+        return SFTPFileSystem(host, int(port or 22), userinfo or None)
+
+    # ---- 路径（只做字符串处理，可在界面线程调用）----
+    @staticmethod
+    def is_local(path):
+        return split_url(path)[0] is None
+
+    @staticmethod
+    def isabs(path):
+        return split_url(path)[0] is not None or os.path.isabs(path)
+
+    @staticmethod
+    def join(path, *names):
+        base, inner = split_url(path)
+        if base is None:
+            return os.path.join(path, *names)
+        return base + posixpath.join(inner, *names)
+
+    @staticmethod
+    def dirname(path):
+        base, inner = split_url(path)
+        if base is None:
+            return os.path.dirname(path)
+        return base + posixpath.dirname(inner)
+
+    @staticmethod
+    def basename(path):
+        base, inner = split_url(path)
+        return os.path.basename(path) if base is None else posixpath.basename(inner)
+
+    @staticmethod
+    def normpath(path):
+        base, inner = split_url(path)
+        if base is None:
+            return os.path.normpath(path)
+        inner = posixpath.normpath(inner)
+        return base + ("/" if inner == "//" else inner)
+
+    # ---- 操作 ----
+    def list_dir(self, path):
+        fs, inner = self.resolve(path)
+        return fs.list_dir(inner)
+
+    def stat(self, path):
+        fs, inner = self.resolve(path)
+        return fs.stat(inner)
+
+    def probe(self, path):
+        fs, inner = self.resolve(path)
+        return fs.probe(inner)
+
+    def open(self, path, mode="rb"):
+        fs, inner = self.resolve(path)
+        return fs.open(inner, mode)
+
+    def mkdir(self, path):
+        fs, inner = self.resolve(path)
+        fs.mkdir(inner)
+
+    def rename(self, src, dst):
+        src_fs, src_inner = self.resolve(src)
+        dst_fs, dst_inner = self.resolve(dst)
+        if src_fs is not dst_fs:
+            raise OSError("不能在不同的位置之间重命名")
+        src_fs.rename(src_inner, dst_inner)
+
+    def remove(self, path):
+        fs, inner = self.resolve(path)
+        fs.remove(inner)
+
+    def supports_trash(self, path):
+        return self.resolve(path)[0].supports_trash
+
+    def trash(self, path):
+        fs, inner = self.resolve(path)
+        fs.trash(inner)
+
+    def copy(self, src, dest_dir, move=False):
+        """把 src（文件或文件夹）复制或移动到 dest_dir 中；不同文件系统之间按块流式传输"""
+        dest = self.join(dest_dir, self.basename(src))
+        src_fs, src_inner = self.resolve(src)
+        dst_fs, dst_inner = self.resolve(dest)
+        if src_fs is dst_fs is self.local:
+            if move:
+                shutil.move(src_inner, dest_dir)
+            else:
+                self.local.copy_local(src_inner, dst_inner)
+            return dest
+        if move and src_fs is dst_fs:
+            src_fs.rename(src_inner, dst_inner)
+            return dest
+        self._copy_tree(src_fs, src_inner, dst_fs, dst_inner, src_fs.stat(src_inner))
+        if move:
+            src_fs.remove(src_inner)
+        return dest
+
+    def _copy_tree(self, src_fs, src, dst_fs, dst, st):
+        if st.is_dir:
+            dst_fs.mkdir(dst)
+            for entry in src_fs.list_dir(src):
+                self._copy_tree(src_fs, src_fs.pathmod.join(src, entry.name),
+                                dst_fs, dst_fs.pathmod.join(dst, entry.name),
+                                FileStat(entry.is_dir, entry.size, entry.mtime))
+            return
+        with src_fs.open(src, "rb") as reader, dst_fs.open(dst, "xb") as writer:
+            while True:
+                chunk = reader.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                writer.write(chunk)
+        dst_fs.set_mtime(dst, st.mtime)
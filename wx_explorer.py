@@ -2,43 +2,1528 @@
 import wx
 import wx.adv
 import os
-import send2trash
 import win32api
 import win32con
 import win32gui
 import win32com.client
 import win32com.shell.shell as shell
 import win32com.shell.shellcon as shellcon
+import io
+import bisect
 import time
-import shutil
-from collections import deque
+import tarfile
+import tempfile
+import threading
+import queue
+import zipfile
+from collections import OrderedDict, deque, namedtuple
 from datetime import datetime
 import pythoncom
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+from log_tail import LogTailer
+from hexdump import BYTES_PER_ROW, MappedFile, PatternSearch, format_row, is_binary_file, parse_pattern
+from thumbnails import ThumbnailLoader, fit_size, is_image_file
+from preview import PreviewLoader
+from dircompare import DirectoryComparer, LEFT_ONLY, RIGHT_ONLY, CHANGED, TYPE_MISMATCH, SCAN_ERROR
+from mirror import Mirror
+from dupfinder import DuplicateFinder, replace_with_hardlink
+from checksums import ALGORITHMS, ChecksumCache, ChecksumJob, write_manifest
+from diskusage import DiskUsageScanner, squarify
+from pollwatch import PollingWatcher, needs_polling
+from pathprobe import PathProber, ProbeResult, TIMEOUT, UNRESPONSIVE
+from listcache import ListingSnapshotStore, diff_listings
+from pathcomplete import PathCompletions
+from frecency import FrecencyDB
+from archives import ArchiveCache, ExtractJob, is_archive_name
+from compress import FORMATS, ArchiveJob, available_formats
+from batchrename import BatchRename, RenameJournal, RenameRule, order_renames
+from gitstatus import GitStatusCache
+from metadata import COLUMNS as METADATA_COLUMNS, MetadataLoader
+from flatlist import FlatListing
+from vfs import VFS
+from export import FIELDS as EXPORT_FIELDS, ExportJob, directory_rows, flat_rows, make_row, tree_rows
+from activity import ActivityLog, KIND_LABELS, describe, sparkline
+from membudget import MemoryBudget, approx_size
 
 # 版本信息
 VERSION = "0.2"
 APP_NAME = "多标签文件浏览器"
 
+ID_THUMBNAIL_VIEW = wx.NewIdRef()
+
+# 扫描超过该时间或项目数超过该值的目录保存列表快照
+SNAPSHOT_MIN_SCAN_TIME = 0.5
+SNAPSHOT_MIN_ENTRIES = 5000
+
+# 可以在列标题上右键打开的附加列：键 -> (标题, 宽度)，排在名称、大小、修改日期之后
+BASE_COLUMN_COUNT = 4
+EXTRA_COLUMNS = OrderedDict([
+    ("git", ("Git 状态", 80)),
+    ("dimensions", ("尺寸", 90)),
+    ("duration", ("时长", 70)),
+    ("lines", ("行数", 70)),
+    ("owner", ("所有者", 100)),
+    ("mode", ("权限", 90)),
+    ("mime", ("类型", 140)),
+])
+# 元数据列只计算可见的行，再向下预取这么多行
+METADATA_PREFETCH = 50
+
+# 收到文件变化后等待这么久（毫秒）再刷新，期间的变化合并为一次刷新
+ACTIVITY_COALESCE_MS = 250
+
+# 关闭的标签页只保留恢复所需的状态，不引用已销毁的控件和目录列表
+ClosedTab = namedtuple("ClosedTab", "path history columns")
+
+# 目录比较结果的高亮颜色
+COMPARE_COLOURS = {
+    LEFT_ONLY: wx.Colour(200, 240, 200),
+    RIGHT_ONLY: wx.Colour(200, 220, 255),
+    CHANGED: wx.Colour(255, 230, 170),
+    TYPE_MISMATCH: wx.Colour(255, 200, 200),
+    SCAN_ERROR: wx.Colour(210, 210, 210),
+}
+
 pythoncom.CoInitialize()  # 添加在模块初始化处
 class FileChangeHandler(FileSystemEventHandler):
-    def __init__(self, callback):
+    """把监控目录的事件记录到活动日志，在监控线程中调用，不直接操作界面"""
+    def __init__(self, root, activity):
         super().__init__()
-        self.callback = callback
+        self.root = root
+        self.activity = activity
         
     def on_created(self, event):
-        wx.CallAfter(self.callback, "创建: " + event.src_path)
+        self.activity.record(self.root, "created", event.src_path)
         
     def on_deleted(self, event):
-        wx.CallAfter(self.callback, "删除: " + event.src_path)
+        self.activity.record(self.root, "deleted", event.src_path)
         
     def on_modified(self, event):
         if not event.is_directory:
-            wx.CallAfter(self.callback, "修改: " + event.src_path)
+            self.activity.record(self.root, "modified", event.src_path)
             
     def on_moved(self, event):
-        wx.CallAfter(self.callback, f"移动: {event.src_path} -> {event.dest_path}")
+        self.activity.record(self.root, "moved", event.src_path, event.dest_path)
+
+
+class FileTailHandler(FileSystemEventHandler):
+    """只关注被跟踪文件的事件，由界面定时器负责读取"""
+    def __init__(self, path, callback):
+        super().__init__()
+        self.path = os.path.normcase(os.path.abspath(path))
+        self.callback = callback
+
+    def on_any_event(self, event):
+        # 在监控线程中调用，回调只能置位标志，不能操作界面
+        for p in (event.src_path, getattr(event, "dest_path", "")):
+            if p and os.path.normcase(p) == self.path:
+                self.callback()
+                return
+
+
+class TextPreviewFrame(wx.Frame):
+    """文本预览窗口，支持跟随文件末尾"""
+    POLL_INTERVAL = 250  # 定时器间隔(ms)
+    FALLBACK_TICKS = 8  # 没有收到事件时每隔多少个周期主动检查一次
+
+    def __init__(self, explorer, path, follow=False, max_lines=10000):
+        super().__init__(explorer, title="文本预览 - " + os.path.basename(path), size=(800, 600))
+        self.explorer = explorer
+        self.path = path
+        self.tailer = None
+        self.watch = None
+        self.handler = None
+        self._dirty = False
+        self._idle_ticks = 0
+        self._shown_lines = 0
+        self.max_lines = max_lines
+
+        panel = wx.Panel(self)
+        self.follow_check = wx.CheckBox(panel, label="跟随文件末尾")
+        self.info_text = wx.StaticText(panel)
+        self.text_ctrl = wx.TextCtrl(panel, style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_RICH2 | wx.HSCROLL)
+
+        top_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        top_sizer.Add(self.follow_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 10)
+        top_sizer.Add(self.info_text, 1, wx.ALIGN_CENTER_VERTICAL)
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(top_sizer, 0, wx.EXPAND | wx.ALL, 5)
+        sizer.Add(self.text_ctrl, 1, wx.EXPAND)
+        panel.SetSizer(sizer)
+
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+        self.follow_check.Bind(wx.EVT_CHECKBOX, self.on_toggle_follow)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+        if follow:
+            self.follow_check.SetValue(True)
+            try:
+                self.start_follow()
+            except OSError as e:
+                # 文件不可读或已被删除：窗口照常打开，在窗口中显示原因
+                self.stop_follow()
+                self.follow_check.SetValue(False)
+                self.info_text.SetLabel(f"无法跟踪文件: {str(e)}")
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.text_ctrl.SetValue(f.read())
+
+    def start_follow(self):
+        """开始跟随：加载末尾内容并监控文件变化"""
+        self.tailer = LogTailer(self.path, max_lines=self.max_lines)
+        self.tailer.open()
+        self.show_all_lines()
+
+        self.handler = FileTailHandler(self.path, self.mark_dirty)
+        self.watch = self.explorer.add_watch(os.path.dirname(os.path.abspath(self.path)), self.handler)
+        self.timer.Start(self.POLL_INTERVAL)
+
+    def stop_follow(self):
+        """停止跟随"""
+        self.timer.Stop()
+        if self.watch:
+            self.explorer.remove_watch(self.watch, self.handler)
+            self.watch = None
+            self.handler = None
+        self.tailer = None
+
+    def mark_dirty(self):
+        """监控线程回调：标记文件有变化"""
+        self._dirty = True
+
+    def on_timer(self, event):
+        """合并一个周期内的所有事件，只读取一次"""
+        self._idle_ticks += 1
+        if not self._dirty and self._idle_ticks < self.FALLBACK_TICKS:
+            return
+        self._dirty = False
+        self._idle_ticks = 0
+
+        try:
+            lines, note = self.tailer.poll()
+        except OSError as e:
+            self.info_text.SetLabel(f"读取失败: {str(e)}")
+            return
+
+        if lines:
+            self.append_lines(lines)
+        if note == "rotated":
+            self.info_text.SetLabel("文件已轮转，从新文件开头继续")
+        elif note == "truncated":
+            self.info_text.SetLabel("文件被截断，从头开始读取")
+
+    def append_lines(self, lines):
+        """追加新行，超出上限较多时按环形缓冲区整体重绘"""
+        self._shown_lines += len(lines)
+        if self._shown_lines > self.max_lines * 2:
+            self.show_all_lines()
+            return
+        text = "\n".join(lines)
+        if self.text_ctrl.GetLastPosition() > 0:
+            text = "\n" + text
+        self.text_ctrl.AppendText(text)
+        self.update_info()
+
+    def show_all_lines(self):
+        """用环形缓冲区中的行重绘文本框"""
+        self.text_ctrl.SetValue("\n".join(self.tailer.lines))
+        self.text_ctrl.ShowPosition(self.text_ctrl.GetLastPosition())
+        self._shown_lines = len(self.tailer.lines)
+        self.update_info()
+
+    def update_info(self):
+        """显示已读取和保留的行数"""
+        self.info_text.SetLabel(f"已读取 {self.tailer.line_count} 行，显示最近 {len(self.tailer.lines)} 行")
+
+    def on_toggle_follow(self, event):
+        if self.follow_check.GetValue():
+            try:
+                self.start_follow()
+            except OSError as e:
+                self.stop_follow()
+                self.follow_check.SetValue(False)
+                wx.MessageBox(f"无法跟踪文件: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+        else:
+            self.stop_follow()
+
+    def on_close(self, event):
+        self.stop_follow()
+        event.Skip()
+
+
+class HexView(wx.VListBox):
+    """十六进制列表，只格式化和绘制可见的行"""
+    HEX_COLUMN = 12  # 偏移列宽(10) + 两个空格
+    ASCII_COLUMN = 63  # 十六进制区宽(49) + 两个空格
+
+    def __init__(self, parent, mapped):
+        super().__init__(parent)
+        self.mapped = mapped
+        self.highlight = None  # (起始偏移, 长度)
+        self.SetFont(wx.Font(10, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        dc = wx.ClientDC(self)
+        dc.SetFont(self.GetFont())
+        self.char_width, self.line_height = dc.GetTextExtent("0")
+        self.SetItemCount(mapped.row_count())
+
+    def OnMeasureItem(self, n):
+        return self.line_height + 2
+
+    def OnDrawItem(self, dc, rect, n):
+        offset = n * BYTES_PER_ROW
+        offset_text, hex_text, ascii_text = format_row(self.mapped.buffer, offset)
+        x = rect.x + 4
+
+        # 高亮搜索命中的字节
+        if self.highlight:
+            start, length = self.highlight
+            first = max(start, offset) - offset
+            last = min(start + length, offset + BYTES_PER_ROW) - offset
+            if first < last:
+                dc.SetBrush(wx.Brush(wx.Colour(255, 220, 100)))
+                dc.SetPen(wx.TRANSPARENT_PEN)
+                for i in range(first, last):
+                    hex_col = self.HEX_COLUMN + i * 3 + (1 if i >= 8 else 0)
+                    dc.DrawRectangle(x + hex_col * self.char_width, rect.y, 2 * self.char_width, rect.height)
+                    dc.DrawRectangle(x + (self.ASCII_COLUMN + i) * self.char_width, rect.y, self.char_width, rect.height)
+
+        if self.IsSelected(n):
+            dc.SetTextForeground(wx.SystemSettings.GetColour(wx.SYS_COLOUR_HIGHLIGHTTEXT))
+        else:
+            dc.SetTextForeground(self.GetForegroundColour())
+        dc.SetFont(self.GetFont())
+        dc.DrawText(f"{offset_text}  {hex_text:<49}  {ascii_text}", x, rect.y + 1)
+
+    def show_offset(self, offset, length=0):
+        """滚动到指定偏移并选中所在行"""
+        row = offset // BYTES_PER_ROW
+        self.highlight = (offset, length) if length else None
+        self.SetSelection(row)
+        self.ScrollToRow(max(0, row - 3))
+        self.RefreshAll()
+
+
+class HexViewFrame(wx.Frame):
+    """十六进制查看窗口，文件以内存映射方式打开"""
+    def __init__(self, parent, path):
+        super().__init__(parent, title="十六进制查看 - " + os.path.basename(path), size=(820, 600))
+        self.mapped = MappedFile(path)
+        self.search = None
+        self.match = None  # 最近一次命中的 (偏移, 长度)
+
+        panel = wx.Panel(self)
+        self.search_ctrl = wx.TextCtrl(panel, style=wx.TE_PROCESS_ENTER)
+        self.hex_check = wx.CheckBox(panel, label="十六进制")
+        self.hex_check.SetValue(True)
+        self.find_button = wx.Button(panel, label="查找下一个")
+        self.cancel_button = wx.Button(panel, label="取消")
+        self.cancel_button.Disable()
+        self.goto_ctrl = wx.TextCtrl(panel, style=wx.TE_PROCESS_ENTER, size=(120, -1))
+        self.goto_ctrl.SetHint("跳转到偏移")
+        self.view = HexView(panel, self.mapped)
+        self.status_bar = self.CreateStatusBar(1)
+
+        top_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        top_sizer.Add(self.search_ctrl, 1, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        top_sizer.Add(self.hex_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        top_sizer.Add(self.find_button, 0, wx.RIGHT, 5)
+        top_sizer.Add(self.cancel_button, 0, wx.RIGHT, 15)
+        top_sizer.Add(self.goto_ctrl, 0, wx.ALIGN_CENTER_VERTICAL)
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(top_sizer, 0, wx.EXPAND | wx.ALL, 5)
+        sizer.Add(self.view, 1, wx.EXPAND)
+        panel.SetSizer(sizer)
+
+        self.search_ctrl.Bind(wx.EVT_TEXT_ENTER, self.on_find)
+        self.find_button.Bind(wx.EVT_BUTTON, self.on_find)
+        self.cancel_button.Bind(wx.EVT_BUTTON, lambda evt: self.cancel_search())
+        self.goto_ctrl.Bind(wx.EVT_TEXT_ENTER, self.on_goto)
+        self.view.Bind(wx.EVT_LISTBOX, self.on_row_selected)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+        self.status_bar.SetStatusText(f"大小: {self.mapped.size:,} 字节")
+
+    def on_find(self, event):
+        """在后台线程中查找下一个匹配"""
+        try:
+            pattern = parse_pattern(self.search_ctrl.GetValue(), self.hex_check.GetValue())
+        except ValueError:
+            self.status_bar.SetStatusText("无效的十六进制字节序列")
+            return
+        if not pattern:
+            return
+
+        if self.match:
+            start = self.match[0] + 1
+        else:
+            row = self.view.GetSelection()
+            start = row * BYTES_PER_ROW if row != wx.NOT_FOUND else 0
+
+        self.cancel_search()
+        self.search = PatternSearch(self.mapped.buffer, pattern, start,
+                                    lambda offset: wx.CallAfter(self.on_search_done, offset, len(pattern)),
+                                    lambda done, total: wx.CallAfter(self.on_search_progress, done, total))
+        self.find_button.Disable()
+        self.cancel_button.Enable()
+        self.search.start()
+
+    def on_search_progress(self, done, total):
+        if self and self.search:
+            self.status_bar.SetStatusText(f"正在查找... {done * 100 // max(total, 1)}%")
+
+    def on_search_done(self, offset, length):
+        if not self:
+            return
+        self.search = None
+        self.find_button.Enable()
+        self.cancel_button.Disable()
+        if offset == -1:
+            self.match = None
+            self.status_bar.SetStatusText("未找到")
+            return
+        self.match = (offset, length)
+        self.view.show_offset(offset, length)
+        self.status_bar.SetStatusText(f"找到: 0x{offset:X} ({offset:,})")
+
+    def cancel_search(self):
+        if self.search:
+            self.search.cancel()
+            self.search = None
+            self.find_button.Enable()
+            self.cancel_button.Disable()
+            self.status_bar.SetStatusText("已取消")
+
+    def on_goto(self, event):
+        text = self.goto_ctrl.GetValue().strip()
+        try:
+            offset = int(text, 0)
+        except ValueError:
+            self.status_bar.SetStatusText("无效的偏移")
+            return
+        if 0 <= offset < self.mapped.size:
+            self.match = None
+            self.view.show_offset(offset)
+
+    def on_row_selected(self, event):
+        offset = event.GetSelection() * BYTES_PER_ROW
+        self.status_bar.SetStatusText(f"偏移: 0x{offset:X} ({offset:,}) / {self.mapped.size:,} 字节")
+        # 手动选择后从新位置重新开始查找
+        self.match = None
+
+    def on_close(self, event):
+        self.cancel_search()
+        self.mapped.close()
+        event.Skip()
+
+
+PREVIEW_TEXT_BYTES = 64 * 1024  # 文本预览读取的最大字节数
+PREVIEW_IMAGE_SIZE = 1024  # 预览图片解码后缩小到的最大边长
+
+
+def bitmap_size(bitmap):
+    """位图（或 wx.Image）占用内存的估计字节数"""
+    return bitmap.GetWidth() * bitmap.GetHeight() * 4
+
+
+def preview_size(cached):
+    """预览缓存条目 (stamp, (类型, 内容)) 的估计字节数"""
+    kind, content = cached[1]
+    if kind == "image":
+        return bitmap_size(content)
+    return approx_size(content)
+
+
+def load_preview(path, cancel):
+    """在工作线程中读取预览内容，返回 (类型, 内容)"""
+    if is_image_file(path):
+        no_log = wx.LogNull()
+        img = wx.Image()
+        loaded = img.LoadFile(path, wx.BITMAP_TYPE_ANY)
+        del no_log
+        if loaded:
+            width, height = fit_size(img.GetWidth(), img.GetHeight(), PREVIEW_IMAGE_SIZE, PREVIEW_IMAGE_SIZE)
+            if (width, height) != (img.GetWidth(), img.GetHeight()):
+                img = img.Scale(width, height, wx.IMAGE_QUALITY_HIGH)
+            return "image", img
+
+    chunks = []
+    with open(path, "rb") as f:
+        remaining = PREVIEW_TEXT_BYTES
+        while remaining > 0 and not cancel.is_set():
+            chunk = f.read(min(16 * 1024, remaining))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+    data = b"".join(chunks)
+
+    if b"\0" in data[:8192]:
+        rows = ["  ".join(format_row(data, offset)) for offset in range(0, min(len(data), 4096), BYTES_PER_ROW)]
+        return "hex", "\n".join(rows)
+    return "text", data.decode("utf-8", errors="replace")
+
+
+class PreviewPane(wx.Panel):
+    """停靠在主窗口右侧的预览窗格"""
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.image = None
+        self._scaled = None  # 按当前尺寸缩放后的位图
+
+        self.title = wx.StaticText(self, style=wx.ST_ELLIPSIZE_MIDDLE)
+        self.text_ctrl = wx.TextCtrl(self, style=wx.TE_MULTILINE | wx.TE_READONLY | wx.TE_RICH2 | wx.HSCROLL)
+        self.text_ctrl.SetFont(wx.Font(9, wx.FONTFAMILY_TELETYPE, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        self.image_panel = wx.Panel(self)
+        self.image_panel.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+        self.image_panel.Hide()
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(self.title, 0, wx.EXPAND | wx.ALL, 5)
+        sizer.Add(self.text_ctrl, 1, wx.EXPAND)
+        sizer.Add(self.image_panel, 1, wx.EXPAND)
+        self.SetSizer(sizer)
+
+        self.image_panel.Bind(wx.EVT_PAINT, self.on_paint_image)
+        self.image_panel.Bind(wx.EVT_SIZE, self.on_size_image)
+
+    def show_message(self, path, message):
+        """显示提示文字（加载中、文件夹等）"""
+        self.title.SetLabel(os.path.basename(path) if path else "")
+        self.show_text(message)
+
+    def show_result(self, path, result):
+        """显示后台加载的结果"""
+        self.title.SetLabel(os.path.basename(path))
+        if isinstance(result, Exception):
+            self.show_text(f"无法预览: {str(result)}")
+            return
+        kind, content = result
+        if kind == "image":
+            self.image = content
+            self._scaled = None
+            self.text_ctrl.Hide()
+            self.image_panel.Show()
+            self.Layout()
+            self.image_panel.Refresh()
+        else:
+            self.show_text(content)
+
+    def show_text(self, text):
+        self.image = None
+        self._scaled = None
+        self.image_panel.Hide()
+        self.text_ctrl.Show()
+        self.text_ctrl.SetValue(text)
+        self.text_ctrl.ShowPosition(0)
+        self.Layout()
+
+    def on_size_image(self, event):
+        self._scaled = None
+        self.image_panel.Refresh()
+        event.Skip()
+
+    def on_paint_image(self, event):
+        dc = wx.AutoBufferedPaintDC(self.image_panel)
+        dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+        dc.Clear()
+        if self.image is None:
+            return
+        size = self.image_panel.GetClientSize()
+        if self._scaled is None:
+            width, height = fit_size(self.image.GetWidth(), self.image.GetHeight(), size.width, size.height)
+            if width > 0 and height > 0:
+                self._scaled = wx.Bitmap(self.image.Scale(width, height, wx.IMAGE_QUALITY_NORMAL))
+        if self._scaled:
+            dc.DrawBitmap(self._scaled, (size.width - self._scaled.GetWidth()) // 2,
+                          (size.height - self._scaled.GetHeight()) // 2)
+
+
+def render_thumbnail(path, size):
+    """在工作线程中解码图片并生成 PNG 缩略图数据"""
+    no_log = wx.LogNull()  # 损坏的图片不弹出错误对话框
+    img = wx.Image()
+    if not img.LoadFile(path, wx.BITMAP_TYPE_ANY):
+        raise ValueError(f"无法解码图片: {path}")
+    width, height = fit_size(img.GetWidth(), img.GetHeight(), size, size)
+    img = img.Scale(width, height, wx.IMAGE_QUALITY_HIGH)
+    buf = io.BytesIO()
+    img.SaveFile(buf, wx.BITMAP_TYPE_PNG)
+    del no_log
+    return buf.getvalue()
+
+
+class ThumbnailGrid(wx.ScrolledWindow):
+    """缩略图网格视图，只绘制和请求可见的单元格"""
+    CELL_WIDTH = 150
+    CELL_HEIGHT = 170
+    PREFETCH_ROWS = 2  # 可见区域下方预取的行数
+
+    def __init__(self, parent, explorer, tab):
+        super().__init__(parent, style=wx.VSCROLL | wx.WANTS_CHARS)
+        self.explorer = explorer
+        self.tab = tab
+        self.items = []
+        self.selected = -1
+        self.bitmaps = explorer.thumbnail_bitmaps  # path -> wx.Bitmap，所有缩略图视图共用，受内存预算约束
+        self._requested_range = None
+
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+        self.SetScrollRate(0, 20)
+
+        self.Bind(wx.EVT_PAINT, self.on_paint)
+        self.Bind(wx.EVT_SIZE, self.on_size)
+        self.Bind(wx.EVT_LEFT_DOWN, self.on_left_down)
+        self.Bind(wx.EVT_LEFT_DCLICK, self.on_left_dclick)
+        self.Bind(wx.EVT_RIGHT_DOWN, self.on_right_down)
+        self.Bind(wx.EVT_KEY_DOWN, self.on_key_down)
+        self.Bind(wx.EVT_WINDOW_DESTROY, self.on_destroy)
+
+    def set_items(self, items):
+        """设置要显示的项目，尽量保留原来的选中项"""
+        selected_path = self.items[self.selected][4] if 0 <= self.selected < len(self.items) else None
+        self.items = items
+        self.selected = next((i for i, item in enumerate(items) if item[4] == selected_path), -1)
+        self._requested_range = None
+        self.update_virtual_size()
+        self.Refresh()
+
+    def columns(self):
+        return max(1, self.GetClientSize().width // self.CELL_WIDTH)
+
+    def update_virtual_size(self):
+        cols = self.columns()
+        rows = (len(self.items) + cols - 1) // cols
+        self.SetVirtualSize((cols * self.CELL_WIDTH, rows * self.CELL_HEIGHT))
+
+    def visible_range(self, extra_rows=0):
+        """返回可见项目的索引范围 [first, last)"""
+        cols = self.columns()
+        top = self.GetViewStart()[1] * self.GetScrollPixelsPerUnit()[1]
+        first_row = top // self.CELL_HEIGHT
+        last_row = (top + self.GetClientSize().height) // self.CELL_HEIGHT + 1 + extra_rows
+        return first_row * cols, min(len(self.items), last_row * cols)
+
+    def cell_rect(self, index):
+        cols = self.columns()
+        row, col = divmod(index, cols)
+        return wx.Rect(col * self.CELL_WIDTH, row * self.CELL_HEIGHT, self.CELL_WIDTH, self.CELL_HEIGHT)
+
+    def hit_test(self, pos):
+        x, y = self.CalcUnscrolledPosition(pos)
+        col = x // self.CELL_WIDTH
+        cols = self.columns()
+        if col >= cols:
+            return -1
+        index = (y // self.CELL_HEIGHT) * cols + col
+        return index if 0 <= index < len(self.items) else -1
+
+    def on_paint(self, event):
+        dc = wx.AutoBufferedPaintDC(self)
+        self.DoPrepareDC(dc)
+        dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+        dc.Clear()
+        dc.SetFont(self.GetFont())
+
+        first, last = self.visible_range()
+        for index in range(first, last):
+            self.draw_cell(dc, index)
+
+        # 可见区域变化（滚动、缩放）后重新提交请求，旧请求随之作废
+        if (first, last) != self._requested_range:
+            self._requested_range = (first, last)
+            wx.CallAfter(self.request_thumbnails)
+
+    def draw_cell(self, dc, index):
+        name, is_dir, size, modified, full_path = self.items[index]
+        rect = self.cell_rect(index)
+
+        if index == self.selected:
+            dc.SetBrush(wx.Brush(wx.SystemSettings.GetColour(wx.SYS_COLOUR_HIGHLIGHT)))
+            dc.SetPen(wx.TRANSPARENT_PEN)
+            dc.DrawRectangle(rect.Deflate(2, 2))
+            dc.SetTextForeground(wx.SystemSettings.GetColour(wx.SYS_COLOUR_HIGHLIGHTTEXT))
+        else:
+            dc.SetTextForeground(self.GetForegroundColour())
+
+        bitmap = self.bitmaps.get(full_path)  # 同时标记为最近使用
+        if bitmap is None:
+            if name == "..":
+                bitmap = wx.ArtProvider.GetBitmap(wx.ART_GO_UP, wx.ART_OTHER, (32, 32))
+            elif is_dir:
+                bitmap = wx.ArtProvider.GetBitmap(wx.ART_FOLDER, wx.ART_OTHER, (32, 32))
+            else:
+                bitmap = wx.ArtProvider.GetBitmap(wx.ART_NORMAL_FILE, wx.ART_OTHER, (32, 32))
+
+        image_area = self.CELL_HEIGHT - 30
+        x = rect.x + (rect.width - bitmap.GetWidth()) // 2
+        y = rect.y + 6 + (image_area - bitmap.GetHeight()) // 2
+        dc.DrawBitmap(bitmap, x, y, True)
+
+        label = wx.Control.Ellipsize(name, dc, wx.ELLIPSIZE_END, rect.width - 8)
+        text_width = dc.GetTextExtent(label).width
+        dc.DrawText(label, rect.x + (rect.width - text_width) // 2, rect.y + image_area + 8)
+
+    def request_thumbnails(self):
+        """按可见优先的顺序请求缩略图，再预取下方几行"""
+        if not self:
+            return
+        first, last = self.visible_range(extra_rows=self.PREFETCH_ROWS)
+        paths = [item[4] for item in self.items[first:last]
+                 if not item[1] and item[4] not in self.bitmaps and is_image_file(item[4])]
+        self.explorer.thumbnail_loader.request(self, paths, self.on_thumbnail_loaded)
+
+    def on_thumbnail_loaded(self, path, thumb):
+        """工作线程回调"""
+        if thumb:
+            wx.CallAfter(self.show_thumbnail, path, thumb)
+
+    def show_thumbnail(self, path, thumb):
+        if not self:
+            return
+        try:
+            bitmap = wx.Bitmap(wx.Image(thumb, wx.BITMAP_TYPE_PNG))
+        except Exception:
+            return
+        self.bitmaps.put(path, bitmap)
+
+        first, last = self.visible_range()
+        for index in range(first, last):
+            if self.items[index][4] == path:
+                rect = self.cell_rect(index)
+                rect.SetPosition(self.CalcScrolledPosition(rect.GetPosition()))
+                self.RefreshRect(rect)
+                break
+
+    def on_size(self, event):
+        self.update_virtual_size()
+        self.Refresh()
+        event.Skip()
+
+    def select(self, index):
+        """选中项目，并同步到隐藏的列表控件，便于复用现有的文件操作"""
+        if index == self.selected:
+            return
+        self.selected = index
+        list_ctrl = self.tab['list']
+        if 0 <= index < list_ctrl.GetItemCount():
+            list_ctrl.SetItemState(index, wx.LIST_STATE_SELECTED | wx.LIST_STATE_FOCUSED,
+                                   wx.LIST_STATE_SELECTED | wx.LIST_STATE_FOCUSED)
+        self.Refresh()
+
+    def ensure_visible(self, index):
+        rect = self.cell_rect(index)
+        unit = self.GetScrollPixelsPerUnit()[1]
+        top = self.GetViewStart()[1] * unit
+        height = self.GetClientSize().height
+        if rect.y < top:
+            self.Scroll(-1, rect.y // unit)
+        elif rect.bottom > top + height:
+            self.Scroll(-1, (rect.bottom - height) // unit + 1)
+
+    def on_left_down(self, event):
+        self.SetFocus()
+        index = self.hit_test(event.GetPosition())
+        if index != -1:
+            self.select(index)
+        event.Skip()
+
+    def on_left_dclick(self, event):
+        index = self.hit_test(event.GetPosition())
+        if index != -1:
+            self.select(index)
+            self.explorer.on_item_activated(event)
+
+    def on_right_down(self, event):
+        self.SetFocus()
+        index = self.hit_test(event.GetPosition())
+        if index != -1:
+            self.select(index)
+        self.explorer.on_item_right_click(event)
+
+    def on_key_down(self, event):
+        key = event.GetKeyCode()
+        cols = self.columns()
+        steps = {wx.WXK_LEFT: -1, wx.WXK_RIGHT: 1, wx.WXK_UP: -cols, wx.WXK_DOWN: cols}
+        if key in steps and self.items:
+            index = min(max(0, self.selected + steps[key]), len(self.items) - 1)
+            self.select(index)
+            self.ensure_visible(index)
+        elif key in (wx.WXK_RETURN, wx.WXK_NUMPAD_ENTER) and self.selected != -1:
+            self.explorer.on_item_activated(event)
+        else:
+            event.Skip()
+
+    def on_destroy(self, event):
+        if event.GetEventObject() is self:
+            self.explorer.thumbnail_loader.cancel(self)
+        event.Skip()
+
+
+class MirrorDialog(wx.Dialog):
+    """镜像同步选项对话框"""
+    def __init__(self, parent, source, target):
+        super().__init__(parent, title="镜像同步")
+        self.dry_run_check = wx.CheckBox(self, label="仅预览，不写入(&N)")
+        self.delete_check = wx.CheckBox(self, label="删除目标中多余的文件(&D)")
+        self.limit_ctrl = wx.SpinCtrl(self, min=0, max=10 * 1024 * 1024, initial=0)
+
+        grid = wx.FlexGridSizer(2, 5, 10)
+        grid.Add(wx.StaticText(self, label="源:"))
+        grid.Add(wx.StaticText(self, label=source))
+        grid.Add(wx.StaticText(self, label="目标:"))
+        grid.Add(wx.StaticText(self, label=target))
+        grid.Add(wx.StaticText(self, label="限速(KB/s):"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.limit_ctrl)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(grid, 0, wx.ALL, 10)
+        sizer.Add(wx.StaticText(self, label="0 表示不限速"), 0, wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(self.dry_run_check, 0, wx.ALL, 10)
+        sizer.Add(self.delete_check, 0, wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        sizer.Add(self.CreateStdDialogButtonSizer(wx.OK | wx.CANCEL), 0, wx.EXPAND | wx.ALL, 10)
+        self.SetSizerAndFit(sizer)
+
+    def get_options(self):
+        return {
+            "dry_run": self.dry_run_check.GetValue(),
+            "delete_extraneous": self.delete_check.GetValue(),
+            "bandwidth_limit": self.limit_ctrl.GetValue() * 1024,
+        }
+
+
+class CompressDialog(wx.Dialog):
+    """压缩选项对话框：归档名称、格式和保存位置"""
+    def __init__(self, parent, name, folder):
+        super().__init__(parent, title="压缩")
+        self.formats = available_formats()
+        self.name_ctrl = wx.TextCtrl(self, value=name + FORMATS[self.formats[0]], size=(320, -1))
+        self.format_choice = wx.Choice(self, choices=self.formats)
+        self.format_choice.SetSelection(0)
+        self.folder_ctrl = wx.TextCtrl(self, value=folder, size=(320, -1))
+        self.format_choice.Bind(wx.EVT_CHOICE, self.on_format_changed)
+
+        grid = wx.FlexGridSizer(2, 5, 10)
+        grid.Add(wx.StaticText(self, label="名称:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.name_ctrl)
+        grid.Add(wx.StaticText(self, label="格式:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.format_choice)
+        grid.Add(wx.StaticText(self, label="保存到:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.folder_ctrl)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(grid, 0, wx.ALL, 10)
+        if "tar.zst" not in self.formats:
+            sizer.Add(wx.StaticText(self, label="安装 zstandard 后可创建 tar.zst"), 0, wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(self.CreateStdDialogButtonSizer(wx.OK | wx.CANCEL), 0, wx.EXPAND | wx.ALL, 10)
+        self.SetSizerAndFit(sizer)
+
+    def on_format_changed(self, event):
+        """切换格式时替换名称中的扩展名"""
+        name = self.name_ctrl.GetValue()
+        for suffix in sorted(FORMATS.values(), key=len, reverse=True):
+            if name.lower().endswith(suffix):
+                name = name[:-len(suffix)]
+                break
+        self.name_ctrl.SetValue(name + FORMATS[self.get_options()["format"]])
+
+    def get_options(self):
+        return {
+            "format": self.formats[self.format_choice.GetSelection()],
+            "dest": os.path.join(self.folder_ctrl.GetValue(), self.name_ctrl.GetValue()),
+        }
+
+
+class RenamePreviewList(wx.ListCtrl):
+    """批量重命名预览，虚拟列表只为可见的行计算新名称"""
+    def __init__(self, parent, renamer):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL)
+        self.renamer = renamer
+        self.problems = {}
+        self.InsertColumn(0, "原名称", width=280)
+        self.InsertColumn(1, "新名称", width=280)
+        self.InsertColumn(2, "问题", width=160)
+        self.changed_attr = wx.ItemAttr()
+        self.changed_attr.SetTextColour(wx.Colour(0, 90, 200))
+        self.problem_attr = wx.ItemAttr()
+        self.problem_attr.SetTextColour(wx.Colour(200, 0, 0))
+        self.SetItemCount(len(renamer))
+
+    def OnGetItemText(self, item, column):
+        if column == 0:
+            return self.renamer.names[item]
+        new, problem = self.renamer.preview(item)
+        if column == 1:
+            return new
+        return problem or self.problems.get(item, "")
+
+    def OnGetItemAttr(self, item):
+        new, problem = self.renamer.preview(item)
+        if problem or item in self.problems:
+            return self.problem_attr
+        if new != self.renamer.names[item]:
+            return self.changed_attr
+        return None
+
+
+class BatchRenameDialog(wx.Dialog):
+    """批量重命名：正则表达式、序号、日期和大小写转换，输入时即时预览"""
+    CASE_LABELS = [("keep", "不变"), ("lower", "小写"), ("upper", "大写"), ("title", "首字母大写")]
+    TARGET_LABELS = [("name", "完整名称"), ("stem", "仅文件名"), ("ext", "仅扩展名")]
+
+    def __init__(self, parent, renamer):
+        super().__init__(parent, title=f"批量重命名 - {len(renamer)} 个项目", size=(780, 560),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.renamer = renamer
+        self.check_generation = 0
+        self.check_timer = None
+        self.ready = False
+
+        self.find_ctrl = wx.TextCtrl(self, size=(300, -1))
+        self.replace_ctrl = wx.TextCtrl(self, size=(300, -1))
+        self.regex_check = wx.CheckBox(self, label="正则表达式(&R)")
+        self.case_sensitive_check = wx.CheckBox(self, label="区分大小写(&S)")
+        self.target_choice = wx.Choice(self, choices=[label for key, label in self.TARGET_LABELS])
+        self.target_choice.SetSelection(0)
+        self.case_choice = wx.Choice(self, choices=[label for key, label in self.CASE_LABELS])
+        self.case_choice.SetSelection(0)
+        self.start_ctrl = wx.SpinCtrl(self, min=0, max=10 ** 9, initial=1)
+        self.step_ctrl = wx.SpinCtrl(self, min=1, max=10 ** 6, initial=1)
+        self.width_ctrl = wx.SpinCtrl(self, min=0, max=12, initial=0)
+
+        grid = wx.FlexGridSizer(2, 5, 10)
+        grid.Add(wx.StaticText(self, label="查找:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.find_ctrl)
+        grid.Add(wx.StaticText(self, label="替换为:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(self.replace_ctrl)
+        grid.Add(wx.StaticText(self, label="应用于:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        options = wx.BoxSizer(wx.HORIZONTAL)
+        options.Add(self.target_choice, 0, wx.RIGHT, 10)
+        options.Add(wx.StaticText(self, label="大小写:"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        options.Add(self.case_choice, 0, wx.RIGHT, 10)
+        options.Add(self.regex_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 10)
+        options.Add(self.case_sensitive_check, 0, wx.ALIGN_CENTER_VERTICAL)
+        grid.Add(options)
+        grid.Add(wx.StaticText(self, label="序号:"), 0, wx.ALIGN_CENTER_VERTICAL)
+        counter = wx.BoxSizer(wx.HORIZONTAL)
+        for label, ctrl in (("起始", self.start_ctrl), ("步长", self.step_ctrl), ("位数", self.width_ctrl)):
+            counter.Add(wx.StaticText(self, label=label), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+            counter.Add(ctrl, 0, wx.RIGHT, 10)
+        grid.Add(counter)
+
+        self.preview_list = RenamePreviewList(self, renamer)
+        self.status_text = wx.StaticText(self, label="")
+        self.buttons = self.CreateStdDialogButtonSizer(wx.OK | wx.CANCEL)
+        self.FindWindow(wx.ID_OK).Disable()
+        self.status_text.SetLabel("输入规则后即时预览，红色的项目有问题")
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(grid, 0, wx.ALL, 10)
+        sizer.Add(wx.StaticText(self, label="标记: {name} 文件名  {ext} 扩展名  {n} 序号（{n:3} 补零到 3 位）  "
+                                            "{date} 修改日期（{date:%Y%m%d} 自定义格式）；正则表达式可用 \\1 引用分组"),
+                  0, wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(self.preview_list, 1, wx.EXPAND | wx.ALL, 10)
+        sizer.Add(self.status_text, 0, wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(self.buttons, 0, wx.EXPAND | wx.ALL, 10)
+        self.SetSizer(sizer)
+
+        for ctrl in (self.find_ctrl, self.replace_ctrl):
+            ctrl.Bind(wx.EVT_TEXT, self.on_rule_changed)
+        for ctrl in (self.regex_check, self.case_sensitive_check):
+            ctrl.Bind(wx.EVT_CHECKBOX, self.on_rule_changed)
+        for ctrl in (self.target_choice, self.case_choice):
+            ctrl.Bind(wx.EVT_CHOICE, self.on_rule_changed)
+        for ctrl in (self.start_ctrl, self.step_ctrl, self.width_ctrl):
+            ctrl.Bind(wx.EVT_SPINCTRL, self.on_rule_changed)
+        self.Bind(wx.EVT_BUTTON, self.on_ok, id=wx.ID_OK)
+        self.find_ctrl.SetFocus()
+
+    def on_rule_changed(self, event):
+        self.ready = False
+        self.FindWindow(wx.ID_OK).Disable()
+        self.check_generation += 1
+        try:
+            rule = RenameRule(self.find_ctrl.GetValue(), self.replace_ctrl.GetValue(),
+                              regex=self.regex_check.GetValue(),
+                              case_sensitive=self.case_sensitive_check.GetValue(),
+                              case=self.CASE_LABELS[self.case_choice.GetSelection()][0],
+                              target=self.TARGET_LABELS[self.target_choice.GetSelection()][0],
+                              start=self.start_ctrl.GetValue(), step=self.step_ctrl.GetValue(),
+                              width=self.width_ctrl.GetValue())
+        except ValueError as e:
+            self.status_text.SetLabel(str(e))
+            return
+        self.renamer.set_rule(rule)
+        self.preview_list.problems = {}
+        self.preview_list.Refresh()
+        self.status_text.SetLabel("正在检查...")
+        # 停止输入后再检查全部名称是否冲突
+        if self.check_timer:
+            self.check_timer.Stop()
+        self.check_timer = wx.CallLater(300, self.start_check)
+
+    def start_check(self):
+        generation = self.check_generation
+
+        def worker():
+            result = self.renamer.check(cancelled=lambda: generation != self.check_generation)
+            if result is not None:
+                wx.CallAfter(self.on_checked, generation, result)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_checked(self, generation, result):
+        if not self or generation != self.check_generation:
+            return
+        rule, problems, changed = result
+        self.preview_list.problems = problems
+        self.preview_list.Refresh()
+        if problems:
+            self.status_text.SetLabel(f"{len(problems)} 个项目有问题，无法重命名")
+        else:
+            self.status_text.SetLabel(f"将重命名 {changed} 个项目")
+        self.ready = changed > 0 and not problems
+        self.FindWindow(wx.ID_OK).Enable(self.ready)
+
+    def on_ok(self, event):
+        if self.ready:
+            event.Skip()
+
+    def Destroy(self):
+        self.check_generation += 1  # 结束后台检查
+        if self.check_timer:
+            self.check_timer.Stop()
+        return super().Destroy()
+
+
+class ActivityEventList(wx.ListCtrl):
+    """活动监视器中的事件列表（虚拟列表，事件多时也不逐行插入）"""
+    def __init__(self, parent):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL)
+        self.InsertColumn(0, "时间", width=90)
+        self.InsertColumn(1, "操作", width=70)
+        self.InsertColumn(2, "路径", width=520)
+        self.events = []
+
+    def set_events(self, events):
+        self.events = events
+        self.SetItemCount(len(events))
+        self.Refresh()
+
+    def OnGetItemText(self, item, column):
+        when, _, kind, path, dest = self.events[item]
+        if column == 0:
+            return datetime.fromtimestamp(when).strftime('%H:%M:%S')
+        if column == 1:
+            return KIND_LABELS[kind]
+        return f"{path} -> {dest}" if dest else path
+
+
+class ActivityDialog(wx.Dialog):
+    """文件活动监视器：各监控目录的事件速率、变化最多的文件和最近的事件"""
+    REFRESH_INTERVAL = 1000
+
+    def __init__(self, parent, activity):
+        super().__init__(parent, title="文件活动", size=(820, 620),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.activity = activity
+        self.roots = []
+
+        self.info_text = wx.StaticText(self)
+        self.pause_check = wx.CheckBox(self, label="暂停刷新")
+        clear_button = wx.Button(self, label="清空")
+        top_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        top_sizer.Add(self.info_text, 1, wx.ALIGN_CENTER_VERTICAL)
+        top_sizer.Add(self.pause_check, 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 10)
+        top_sizer.Add(clear_button)
+
+        self.root_list = wx.ListCtrl(self, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
+        self.root_list.InsertColumn(0, "监控目录", width=300)
+        self.root_list.InsertColumn(1, "事件/秒", width=70)
+        self.root_list.InsertColumn(2, f"最近 {activity.window} 秒", width=300)
+        self.root_list.InsertColumn(3, "总计", width=80)
+        self.top_list = wx.ListCtrl(self, style=wx.LC_REPORT)
+        self.top_list.InsertColumn(0, "变化最多的文件", width=620)
+        self.top_list.InsertColumn(1, "次数", width=80)
+        self.event_list = ActivityEventList(self)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(top_sizer, 0, wx.EXPAND | wx.ALL, 10)
+        sizer.Add(self.root_list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(self.top_list, 1, wx.EXPAND | wx.ALL, 10)
+        sizer.Add(self.event_list, 2, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        self.SetSizer(sizer)
+
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda evt: self.refresh(), self.timer)
+        self.root_list.Bind(wx.EVT_LIST_ITEM_SELECTED, lambda evt: self.refresh())
+        self.root_list.Bind(wx.EVT_LIST_ITEM_DESELECTED, lambda evt: self.refresh())
+        clear_button.Bind(wx.EVT_BUTTON, self.on_clear)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+        self.refresh()
+        self.timer.Start(self.REFRESH_INTERVAL)
+
+    def selected_root(self):
+        index = self.root_list.GetFirstSelected()
+        return self.roots[index] if 0 <= index < len(self.roots) else None
+
+    def refresh(self):
+        """按当前的记录重绘；选中监控目录时只显示该目录的文件和事件"""
+        if self.pause_check.GetValue():
+            return
+        activity = self.activity
+        selected = self.selected_root()
+        stats = activity.stats()
+        self.roots = [row[0] for row in stats]
+        self.root_list.Freeze()
+        self.root_list.DeleteAllItems()
+        for index, (root, rate, series, total) in enumerate(stats):
+            self.root_list.InsertItem(index, root)
+            self.root_list.SetItem(index, 1, f"{rate:.1f}")
+            self.root_list.SetItem(index, 2, sparkline(series))
+            self.root_list.SetItem(index, 3, str(total))
+            if root == selected:
+                self.root_list.Select(index)
+        self.root_list.Thaw()
+        if selected not in self.roots:
+            selected = None
+
+        self.top_list.Freeze()
+        self.top_list.DeleteAllItems()
+        for index, (path, count) in enumerate(activity.top_files(root=selected)):
+            self.top_list.InsertItem(index, path)
+            self.top_list.SetItem(index, 1, str(count))
+        self.top_list.Thaw()
+        self.event_list.set_events(activity.recent(selected))
+
+        info = f"共 {activity.total} 个事件，保留最近 {len(activity.events)} 个"
+        if activity.dropped:
+            info += f"（已丢弃 {activity.dropped} 个较早的事件）"
+        self.info_text.SetLabel(info)
+
+    def on_clear(self, event):
+        self.activity.clear()
+        self.refresh()
+
+    def on_close(self, event):
+        self.timer.Stop()
+        self.GetParent().activity_dialog = None
+        self.Destroy()
+
+
+class MemoryDialog(wx.Dialog):
+    """各缓存的内存占用和全局内存预算"""
+    REFRESH_INTERVAL = 1000
+
+    def __init__(self, parent, memory):
+        super().__init__(parent, title="内存", size=(560, 400),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.memory = memory
+        self.format_size = parent.format_size
+
+        self.info_text = wx.StaticText(self)
+        self.budget_ctrl = wx.SpinCtrl(self, min=16, max=64 * 1024,
+                                       initial=(memory.budget or 0) // (1024 * 1024))
+        apply_button = wx.Button(self, label="应用")
+        budget_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        budget_sizer.Add(wx.StaticText(self, label="缓存预算 (MB):"), 0, wx.ALIGN_CENTER_VERTICAL | wx.RIGHT, 5)
+        budget_sizer.Add(self.budget_ctrl, 0, wx.RIGHT, 5)
+        budget_sizer.Add(apply_button)
+
+        self.list_ctrl = wx.ListCtrl(self, style=wx.LC_REPORT)
+        self.list_ctrl.InsertColumn(0, "缓存", width=160)
+        self.list_ctrl.InsertColumn(1, "条目", width=90)
+        self.list_ctrl.InsertColumn(2, "估计占用", width=120)
+        self.list_ctrl.InsertColumn(3, "已淘汰", width=90)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(budget_sizer, 0, wx.EXPAND | wx.ALL, 10)
+        sizer.Add(self.info_text, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(self.list_ctrl, 1, wx.EXPAND | wx.ALL, 10)
+        self.SetSizer(sizer)
+
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, lambda evt: self.refresh(), self.timer)
+        apply_button.Bind(wx.EVT_BUTTON, self.on_apply)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+        self.refresh()
+        self.timer.Start(self.REFRESH_INTERVAL)
+
+    def refresh(self):
+        memory = self.memory
+        self.info_text.SetLabel(f"已使用 {self.format_size(memory.used)} / {self.format_size(memory.budget)}")
+        self.list_ctrl.Freeze()
+        self.list_ctrl.DeleteAllItems()
+        for index, (name, entries, used, evictions) in enumerate(memory.usage()):
+            self.list_ctrl.InsertItem(index, name)
+            self.list_ctrl.SetItem(index, 1, str(entries))
+            self.list_ctrl.SetItem(index, 2, self.format_size(used))
+            self.list_ctrl.SetItem(index, 3, str(evictions))
+        self.list_ctrl.Thaw()
+
+    def on_apply(self, event):
+        """修改预算，超出部分立即按最近使用淘汰"""
+        self.memory.set_budget(self.budget_ctrl.GetValue() * 1024 * 1024)
+        self.refresh()
+
+    def on_close(self, event):
+        self.timer.Stop()
+        self.GetParent().memory_dialog = None
+        self.Destroy()
+
+
+class ChecksumDialog(wx.Dialog):
+    """计算选中文件的校验和，可导出为 .sha256 清单"""
+    def __init__(self, parent, paths, base_dir, cache):
+        super().__init__(parent, title="校验和", size=(760, 480),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.paths = paths
+        self.base_dir = base_dir
+        self.cache = cache
+        self.job = None
+        self.results = []  # [(path, 摘要字典或异常)]
+        self.result_queue = queue.SimpleQueue()
+
+        self.algorithm_checks = {}
+        algo_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        for name in ALGORITHMS:
+            check = wx.CheckBox(self, label=name)
+            check.SetValue(name in ("MD5", "SHA-1", "SHA-256"))
+            algo_sizer.Add(check, 0, wx.RIGHT, 10)
+            self.algorithm_checks[name] = check
+
+        self.compute_button = wx.Button(self, label="计算")
+        self.cancel_button = wx.Button(self, label="取消")
+        self.export_button = wx.Button(self, label="导出 .sha256...")
+        self.cancel_button.Disable()
+        self.export_button.Disable()
+        algo_sizer.AddStretchSpacer()
+        algo_sizer.Add(self.compute_button, 0, wx.RIGHT, 5)
+        algo_sizer.Add(self.cancel_button, 0, wx.RIGHT, 5)
+        algo_sizer.Add(self.export_button)
+
+        self.gauge = wx.Gauge(self, range=1000)
+        self.info_text = wx.StaticText(self)
+        self.list_ctrl = wx.ListCtrl(self, style=wx.LC_REPORT)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(algo_sizer, 0, wx.EXPAND | wx.ALL, 10)
+        sizer.Add(self.gauge, 0, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(self.info_text, 0, wx.EXPAND | wx.ALL, 10)
+        sizer.Add(self.list_ctrl, 1, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        self.SetSizer(sizer)
+
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+        self.compute_button.Bind(wx.EVT_BUTTON, lambda evt: self.start())
+        self.cancel_button.Bind(wx.EVT_BUTTON, lambda evt: self.job and self.job.cancel())
+        self.export_button.Bind(wx.EVT_BUTTON, self.on_export)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+        self.start()
+
+    def selected_algorithms(self):
+        return [name for name, check in self.algorithm_checks.items() if check.GetValue()]
+
+    def start(self):
+        """开始计算，已缓存的结果会立即返回"""
+        algorithms = self.selected_algorithms()
+        if not algorithms:
+            return
+        self.list_ctrl.ClearAll()
+        self.list_ctrl.InsertColumn(0, "文件", width=200)
+        for index, name in enumerate(algorithms, 1):
+            self.list_ctrl.InsertColumn(index, name, width=260)
+        self.results = []
+        self.result_queue = queue.SimpleQueue()
+        self.gauge.SetValue(0)
+
+        self.job = ChecksumJob(self.paths, algorithms, self.cache,
+                               lambda path, result: self.result_queue.put((path, result)))
+        self.job.start()
+        self.compute_button.Disable()
+        self.cancel_button.Enable()
+        self.export_button.Disable()
+        self.timer.Start(200)
+
+    def on_timer(self, event):
+        """取出工作线程的结果，更新列表和进度"""
+        job = self.job
+        algorithms = job.algorithms
+        while True:
+            try:
+                path, result = self.result_queue.get_nowait()
+            except queue.Empty:
+                break
+            self.results.append((path, result))
+            index = self.list_ctrl.GetItemCount()
+            self.list_ctrl.InsertItem(index, os.path.relpath(path, self.base_dir))
+            if isinstance(result, Exception):
+                self.list_ctrl.SetItem(index, 1, f"错误: {str(result)}")
+                continue
+            for column, name in enumerate(algorithms, 1):
+                self.list_ctrl.SetItem(index, column, result[name])
+
+        if job.bytes_total:
+            self.gauge.SetValue(int(job.bytes_done * 1000 / job.bytes_total))
+        self.info_text.SetLabel(f"{job.files_done}/{job.files_total} 个文件, "
+                                f"{job.bytes_done:,}/{job.bytes_total:,} 字节")
+
+        # 选中项中没有文件或部分文件无法读取时 files_done 达不到 files_total，以任务结束为准
+        if job.finished and self.result_queue.empty():
+            self.timer.Stop()
+            self.compute_button.Enable()
+            self.cancel_button.Disable()
+            self.export_button.Enable("SHA-256" in algorithms and bool(self.results))
+            if job.cancelled:
+                self.info_text.SetLabel(self.info_text.GetLabel() + "（已取消）")
+
+    def on_export(self, event):
+        """导出 sha256sum 兼容的清单"""
+        dlg = wx.FileDialog(self, "导出校验和", defaultDir=self.base_dir, defaultFile="checksums.sha256",
+                            wildcard="SHA-256 清单 (*.sha256)|*.sha256|所有文件 (*.*)|*.*",
+                            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+        if dlg.ShowModal() == wx.ID_OK:
+            try:
+                results = sorted(self.results, key=lambda r: r[0])
+                write_manifest(dlg.GetPath(), results, os.path.dirname(dlg.GetPath()))
+            except OSError as e:
+                wx.MessageBox(f"导出失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+        dlg.Destroy()
+
+    def on_close(self, event):
+        if self.job:
+            self.job.cancel()
+        self.timer.Stop()
+        self.Destroy()
+
+
+class FlatListCtrl(wx.ListCtrl):
+    """扁平列表标签页的虚拟列表：只读取可见的行，行号经排列映射到 FlatListing 中的文件"""
+    # 列 -> 排序方式
+    SORT_COLUMNS = {1: "path", 2: "size", 3: "mtime"}
+
+    def __init__(self, parent, format_size):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL)
+        self.format_size = format_size
+        self.listing = None
+        self.order = None
+
+    def set_view(self, listing, order, count):
+        self.listing = listing
+        self.order = order
+        self.SetItemCount(count)
+        self.Refresh()
+
+    def entry(self, item):
+        return self.order[item] if self.order is not None else item
+
+    def OnGetItemText(self, item, column):
+        index = self.entry(item)
+        if column == 1:
+            return self.listing.relpath(index)
+        if column == 2:
+            return self.format_size(self.listing.sizes[index])
+        if column == 3:
+            return datetime.fromtimestamp(self.listing.mtimes[index]).strftime('%Y-%m-%d %H:%M:%S')
+        return ""
+
+    def OnGetItemImage(self, item):
+        return -1
+
+
+class TreemapView(wx.Panel):
+    """磁盘占用树图：显示一个目录下各级子目录和大文件所占的面积"""
+    MAX_DEPTH = 3
+    MIN_SIDE = 4  # 小于该像素的块不再绘制
+    HEADER = 16  # 目录块顶部标题栏的高度
+    PALETTE = [(231, 111, 81), (42, 157, 143), (233, 196, 106), (69, 123, 157), (155, 93, 229),
+               (244, 162, 97), (106, 153, 78), (214, 40, 57), (0, 150, 199), (188, 108, 37)]
+
+    def __init__(self, parent, on_select, on_open):
+        super().__init__(parent, style=wx.FULL_REPAINT_ON_RESIZE)
+        self.SetBackgroundStyle(wx.BG_STYLE_PAINT)
+        self.SetMinSize((-1, 150))
+        self.on_select = on_select
+        self.on_open = on_open
+        self.scanner = None
+        self.node = None
+        self.blocks = []  # [(wx.Rect, 路径, 大小, 是否目录, 深度, 颜色)]，先父后子
+        self.selected = None
+        
+        self.Bind(wx.EVT_PAINT, self.on_paint)
+        self.Bind(wx.EVT_SIZE, lambda evt: self.update())
+        self.Bind(wx.EVT_LEFT_DOWN, self.on_left_down)
+        self.Bind(wx.EVT_LEFT_DCLICK, self.on_left_dclick)
+        self.Bind(wx.EVT_MOTION, self.on_motion)
+
+    def set_node(self, scanner, node):
+        self.scanner = scanner
+        self.node = node
+        self.selected = None
+        self.update()
+
+    def update(self):
+        """按当前合计重新布局（扫描过程中逐步细化）"""
+        self.blocks = []
+        if self.node is not None:
+            width, height = self.GetClientSize()
+            self.layout(self.node, wx.Rect(0, 0, width, height), 1, None)
+        self.Refresh()
+
+    def layout(self, node, rect, depth, colour):
+        entries = [(child.total, child.path, True, child) for child in self.scanner.sorted_children(node)]
+        entries.extend((size, os.path.join(node.path, name), False, None) for size, name in node.large_files)
+        other = node.other_size
+        if other > 0:
+            entries.append((other, None, False, None))
+        entries = [e for e in entries if e[0] > 0]
+        entries.sort(key=lambda e: e[0], reverse=True)
+        
+        rects = squarify([e[0] for e in entries], rect.x, rect.y, rect.width, rect.height)
+        for index, ((size, path, is_dir, child), (x, y, w, h)) in enumerate(zip(entries, rects)):
+            if w < self.MIN_SIDE or h < self.MIN_SIDE:
+                continue
+            block_colour = colour or self.PALETTE[index % len(self.PALETTE)]
+            block = wx.Rect(int(x), int(y), int(x + w) - int(x), int(y + h) - int(y))
+            self.blocks.append((block, path, size, is_dir, depth, block_colour))
+            if child is not None and depth < self.MAX_DEPTH and block.width > 40 and block.height > 2 * self.HEADER:
+                inner = wx.Rect(block.x + 2, block.y + self.HEADER, block.width - 4, block.height - self.HEADER - 2)
+                self.layout(child, inner, depth + 1, block_colour)
+
+    def on_paint(self, event):
+        dc = wx.AutoBufferedPaintDC(self)
+        dc.SetBackground(wx.Brush(self.GetBackgroundColour()))
+        dc.Clear()
+        dc.SetFont(wx.Font(8, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_NORMAL))
+        for rect, path, size, is_dir, depth, (r, g, b) in self.blocks:
+            # 越深的层级颜色越浅，未单独列出的文件用灰色
+            lighten = min(0.6, 0.2 * (depth - 1))
+            colour = wx.Colour(int(r + (255 - r) * lighten), int(g + (255 - g) * lighten), int(b + (255 - b) * lighten))
+            if path is None:
+                colour = wx.Colour(200, 200, 200)
+            dc.SetBrush(wx.Brush(colour))
+            dc.SetPen(wx.Pen(wx.BLACK, 2) if path and path == self.selected else wx.Pen(wx.Colour(60, 60, 60)))
+            dc.DrawRectangle(rect)
+            if rect.width > 40 and rect.height > 14:
+                label = os.path.basename(path) if path else "其他文件"
+                dc.SetClippingRegion(rect)
+                dc.DrawText(label, rect.x + 3, rect.y + 1)
+                dc.DestroyClippingRegion()
+
+    def hit_test(self, pos):
+        """返回该位置最深一层的块"""
+        for block in reversed(self.blocks):
+            if block[0].Contains(pos):
+                return block
+        return None
+
+    def on_left_down(self, event):
+        block = self.hit_test(event.GetPosition())
+        if block and block[1]:
+            self.selected = block[1]
+            self.Refresh()
+            self.on_select(block[1])
+        self.SetFocus()
+
+    def on_left_dclick(self, event):
+        block = self.hit_test(event.GetPosition())
+        if block and block[1] and block[3]:
+            self.on_open(block[1])
+
+    def on_motion(self, event):
+        block = self.hit_test(event.GetPosition())
+        tip = ""
+        if block:
+            rect, path, size, is_dir, depth, colour = block
+            tip = f"{path or '其他文件'}\n{wx.GetTopLevelParent(self).format_size(size)}"
+        if self.GetToolTipText() != tip:
+            self.SetToolTip(tip)
+
+
+def open_file(path):
+    """用关联的程序打开文件（在后台线程中调用），成功时返回 None"""
+    try:
+        os.startfile(path)
+    except Exception as e:
+        # 尝试使用默认应用打开
+        try:
+            import subprocess
+            subprocess.run(['start', '', path], shell=True, check=True)
+        except Exception as sub_e:
+            raise OSError(f"{str(e)}\n{str(sub_e)}")
+    return None
+
+
+class PathCompleter(wx.TextCompleterSimple):
+    """地址栏补全：只查询内存中的前缀树和目录缓存，不在调用线程中访问磁盘"""
+    def __init__(self, completions):
+        super().__init__()
+        self.completions = completions
+
+    def GetCompletions(self, prefix):
+        return self.completions.complete(prefix)
+
+
+class QuickJumpDialog(wx.Dialog):
+    """按常用度快速跳转到访问过的目录，输入以空格分隔的路径片段进行筛选"""
+    def __init__(self, parent, frecency):
+        super().__init__(parent, title="快速跳转", size=(640, 420),
+                         style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.frecency = frecency
+        self.path = None
+        self.results = []
+
+        self.query_ctrl = wx.TextCtrl(self, style=wx.TE_PROCESS_ENTER)
+        self.query_ctrl.SetHint("输入路径片段，如 proj src")
+        self.result_list = wx.ListBox(self, style=wx.LB_SINGLE)
+        self.info_text = wx.StaticText(self)
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(self.query_ctrl, 0, wx.EXPAND | wx.ALL, 10)
+        sizer.Add(self.result_list, 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 10)
+        sizer.Add(self.info_text, 0, wx.EXPAND | wx.ALL, 10)
+        sizer.Add(self.CreateButtonSizer(wx.OK | wx.CANCEL), 0, wx.EXPAND | wx.LEFT | wx.RIGHT | wx.BOTTOM, 10)
+        self.SetSizer(sizer)
+
+        self.query_ctrl.Bind(wx.EVT_TEXT, lambda evt: self.update_results())
+        self.query_ctrl.Bind(wx.EVT_TEXT_ENTER, lambda evt: self.accept())
+        self.query_ctrl.Bind(wx.EVT_KEY_DOWN, self.on_key_down)
+        self.result_list.Bind(wx.EVT_LISTBOX_DCLICK, lambda evt: self.accept())
+        self.Bind(wx.EVT_BUTTON, lambda evt: self.accept(), id=wx.ID_OK)
+
+        self.update_results()
+        self.query_ctrl.SetFocus()
+
+    def update_results(self):
+        start = time.perf_counter()
+        self.results = self.frecency.search(self.query_ctrl.GetValue())
+        elapsed = (time.perf_counter() - start) * 1000
+        self.result_list.Set([path for path, score in self.results])
+        if self.results:
+            self.result_list.SetSelection(0)
+        loading = "" if self.frecency.loaded else "，正在加载..."
+        self.info_text.SetLabel(f"{len(self.results)} 个结果（共 {len(self.frecency)} 个目录，{elapsed:.1f} 毫秒{loading}）")
+
+    def on_key_down(self, event):
+        """在输入框中用上下键选择结果"""
+        key = event.GetKeyCode()
+        count = self.result_list.GetCount()
+        if key in (wx.WXK_UP, wx.WXK_DOWN) and count:
+            selection = self.result_list.GetSelection()
+            selection += -1 if key == wx.WXK_UP else 1
+            self.result_list.SetSelection(max(0, min(count - 1, selection)))
+            return
+        event.Skip()
+
+    def accept(self):
+        selection = self.result_list.GetSelection()
+        if selection == wx.NOT_FOUND:
+            return
+        self.path = self.results[selection][0]
+        self.EndModal(wx.ID_OK)
 
 
 class FileExplorerFrame(wx.Frame):
@@ -50,8 +1535,55 @@ class FileExplorerFrame(wx.Frame):
         self.history = deque(maxlen=10)
         self.clipboard = {"type": None, "paths": []}
         self.observer = Observer()
-        self.closed_tabs = {"left": deque(maxlen=10), "right": deque(maxlen=10)}
-        self._icon_cache = {}
+        self.closed_tabs = {"left": deque(maxlen=10), "right": deque(maxlen=10)}  # [ClosedTab]
+        # 各缓存共用的内存预算，超出时跨缓存淘汰最久未用的条目
+        self.memory = MemoryBudget()
+        self._icon_cache = self.memory.cache("文件图标", sizeof=bitmap_size)
+        self.thumbnail_bitmaps = self.memory.cache("缩略图", sizeof=bitmap_size)
+        self.watch_dog = None
+        self.watch_handler = None
+        self._watch_refs = {}  # 同一路径的监控可能被多个功能共享，按引用计数注销
+        self.poll_watcher = PollingWatcher()  # 网络和 FUSE 文件系统收不到变更通知，改为轮询
+        self.poll_watch = None
+        self.watch_request = None  # 正在判断是否需要轮询的请求
+        self.force_polling = False
+        # 监控线程只记录事件，界面合并一段时间内的事件后刷新一次
+        self.activity = ActivityLog(on_pending=lambda: wx.CallAfter(self.on_activity_pending))
+        self.activity_dialog = None
+        self.memory_dialog = None
+        self.prober = PathProber()
+        self.count_request = None  # 正在统计选中文件夹项目数的请求
+        self.listing_store = ListingSnapshotStore()
+        self.listing_cache_enabled = True
+        self.path_completions = PathCompletions(self.prober)
+        self.frecency = FrecencyDB(on_loaded=self.on_frecency_loaded, is_unresponsive=self.prober.is_unresponsive)
+        self.archives = ArchiveCache(cache=self.memory.cache("归档索引", max_entries=8))  # zip / tar 归档作为只读的虚拟文件夹打开
+        self.vfs = VFS()  # 本地路径以外的 sftp:// 等位置
+        self.rename_journal = RenameJournal()
+        self.undoing_journals = set()  # 正在后台撤销的批量重命名日志
+        self.git_status = GitStatusCache(lambda root: wx.CallAfter(self.on_git_status_updated, root))
+        self.default_columns = []  # 新标签页显示的附加列
+        self.watched_path = None
+        self.metadata_loader = MetadataLoader(cache=self.memory.cache("元数据"))
+        self.metadata_results = queue.SimpleQueue()
+        self.metadata_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_metadata_timer, self.metadata_timer)
+        wx.CallAfter(self.recover_rename_journals)
+        self.thumbnail_loader = ThumbnailLoader(render_thumbnail)
+        self.preview_loader = PreviewLoader(load_preview, cache=self.memory.cache("预览", max_entries=16, sizeof=preview_size))
+        self._preview_path = None
+        self.comparer = None
+        self.compare_tabs = ()
+        self.compare_queue = queue.SimpleQueue()
+        self.compare_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_compare_timer, self.compare_timer)
+        self.mirror = None
+        self.dup_finder = None
+        self.checksum_cache = ChecksumCache(cache=self.memory.cache("校验和"))
+        self.disk_usage_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_disk_usage_timer, self.disk_usage_timer)
+        self.flat_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_flat_timer, self.flat_timer)
         self.splitter_ratio = 0.5  # 保存分割比例
         
         # 设置窗口样式
@@ -60,8 +1592,13 @@ class FileExplorerFrame(wx.Frame):
         # 创建主面板
         self.main_panel = wx.Panel(self)
         
+        # 外层分割窗口：双窗格 + 可选的预览窗格
+        self.content_splitter = wx.SplitterWindow(self.main_panel, style=wx.SP_3D | wx.SP_LIVE_UPDATE)
+        self.content_splitter.SetMinimumPaneSize(150)
+        self.content_splitter.SetSashGravity(1.0)
+        
         # 创建分割窗口
-        self.splitter = wx.SplitterWindow(self.main_panel, style=wx.SP_3D | wx.SP_LIVE_UPDATE | wx.SP_PERMIT_UNSPLIT)
+        self.splitter = wx.SplitterWindow(self.content_splitter, style=wx.SP_3D | wx.SP_LIVE_UPDATE | wx.SP_PERMIT_UNSPLIT)
         
         # 创建左右两个标签页面板
         self.left_notebook = wx.Notebook(self.splitter)
@@ -71,13 +1608,18 @@ class FileExplorerFrame(wx.Frame):
         # 设置分割窗口
         self.splitter.SplitVertically(self.left_notebook, self.right_notebook)
         
+        # 预览窗格默认隐藏
+        self.preview_pane = PreviewPane(self.content_splitter)
+        self.preview_pane.Hide()
+        self.content_splitter.Initialize(self.splitter)
+        
         # 绑定分割窗口事件
         self.splitter.Bind(wx.EVT_SPLITTER_SASH_POS_CHANGED, self.on_splitter_changed)
         self.splitter.Bind(wx.EVT_SPLITTER_SASH_POS_CHANGING, self.on_splitter_changing)
         
         # 主布局
         main_sizer = wx.BoxSizer(wx.VERTICAL)
-        main_sizer.Add(self.splitter, 1, wx.EXPAND)
+        main_sizer.Add(self.content_splitter, 1, wx.EXPAND)
         self.main_panel.SetSizer(main_sizer)
         
         # 加载系统图标
@@ -96,6 +1638,7 @@ class FileExplorerFrame(wx.Frame):
         self.right_notebook.Bind(wx.EVT_LEFT_DCLICK, lambda evt: self.on_notebook_dclick(evt, "right"))
         self.Bind(wx.EVT_SIZE, self.on_size)
         self.Bind(wx.EVT_CLOSE, self.OnClose)
+        self.Bind(wx.EVT_CHAR_HOOK, self.on_char_hook)
         
         # 初始化标签页
         self.init_notebooks()
@@ -135,10 +1678,10 @@ class FileExplorerFrame(wx.Frame):
         for item in self.theme_items.values():
             self.Bind(wx.EVT_MENU, self.on_change_theme, item)
 
-    def get_selected_paths(self):
+    def get_selected_paths(self, tab=None):
         """获取选中的文件路径列表"""
         selected_paths = []
-        current_tab = self.get_current_tab()
+        current_tab = tab or self.get_current_tab()
         if not current_tab:
             return selected_paths
             
@@ -149,7 +1692,9 @@ class FileExplorerFrame(wx.Frame):
             if item == -1:
                 break
             name = list_ctrl.GetItem(item, 1).GetText()
-            path = os.path.join(current_tab['path'], name)
+            if name == "..":
+                continue
+            path = self.vfs.join(current_tab['path'], name)
             selected_paths.append(path)
         return selected_paths
 
@@ -175,19 +1720,14 @@ class FileExplorerFrame(wx.Frame):
         event.Skip()
 
     def navigate_to(self, path, side=None):
-        """导航到指定路径"""
+        """导航到指定路径
+
+        路径检查在后台进行，网络挂载点失去响应时界面不会卡住；
+        检查期间状态栏显示"正在连接"，按 Esc 或再次导航可取消。
+        """
         try:
             # 规范化路径
-            path = os.path.normpath(path)
-            
-            # 检查路径是否存在且可访问
-            if not os.path.exists(path):
-                wx.MessageBox(f"路径不存在: {path}", "错误", wx.OK | wx.ICON_ERROR)
-                return
-                
-            if not os.access(path, os.R_OK):
-                wx.MessageBox(f"无法访问路径: {path}", "错误", wx.OK | wx.ICON_ERROR)
-                return
+            path = self.vfs.normpath(path)
             
             # 获取当前标签页
             if side is None:
@@ -203,34 +1743,125 @@ class FileExplorerFrame(wx.Frame):
                 self.refresh_file_list(current_tab)
                 return
                 
-            # 更新路径
-            current_tab['path'] = path
-            current_tab['history'].append(path)
-            
-            # 更新标签页标题
-            notebook = self.left_notebook if current_tab in self.tabs['left'] else self.right_notebook
-            index = notebook.GetSelection()
-            if index != -1:
-                title = os.path.basename(path) or path
-                notebook.SetPageText(index, title)
-            
-            # 更新路径输入框
+            self.cancel_navigation(current_tab)
             current_tab['path_ctrl'].SetValue(path)
-            
-            # 刷新文件列表
-            self.refresh_file_list(current_tab)
-            
-            # 更新监控
-            self.start_watching(path)
+            self.status_bar.SetStatusText(f"正在连接 {path} ...（Esc 取消）", 0)
+            current_tab['probe'] = self.prober.run(
+                path, self.probe_location, lambda p, result: wx.CallAfter(self.on_navigate_probed, current_tab, p, result))
             
         except Exception as e:
             wx.LogError(f"导航失败: {str(e)}")
 
+    def probe_location(self, path):
+        """（后台线程）检查导航目标：本地路径和归档由 ArchiveCache 检查，其他位置交给对应的文件系统"""
+        if self.vfs.is_local(path):
+            return self.archives.probe(path)
+        return self.vfs.probe(path)
+
+    def cancel_navigation(self, tab):
+        """取消尚未完成的导航，返回是否有被取消的导航"""
+        probe = tab.get('probe')
+        tab['probe'] = None
+        if probe and probe.pending:
+            probe.cancel()
+            tab['path_ctrl'].SetValue(tab['path'])
+            self.status_bar.SetStatusText("已取消", 0)
+            return True
+        return False
+
+    def on_navigate_probed(self, tab, path, result):
+        """路径检查完成，切换到该目录"""
+        if not self or not tab.get('probe') or tab['probe'].path != path:
+            return  # 已取消或已被新的导航取代
+        tab['probe'] = None
+        
+        error = None
+        if result.error == TIMEOUT:
+            error = f"路径没有响应: {path}"
+        elif result.error == UNRESPONSIVE:
+            error = f"该位置最近没有响应，请稍后再试: {path}"
+        elif result.error:
+            error = f"无法访问路径: {path}\n{str(result.error)}"
+        elif not result.exists:
+            error = f"路径不存在: {path}"
+            self.frecency.remove(path)
+        elif not result.is_dir:
+            error = f"不是文件夹: {path}"
+        elif not result.readable:
+            error = f"无法访问路径: {path}"
+        if error:
+            tab['path_ctrl'].SetValue(tab['path'])
+            self.status_bar.SetStatusText("", 0)
+            wx.MessageBox(error, "错误", wx.OK | wx.ICON_ERROR)
+            return
+            
+        # 更新路径
+        tab['path'] = path
+        tab['history'].append(path)
+        self.path_completions.add_visited(path)
+        self.frecency.add(path)
+        
+        # 更新标签页标题
+        self.set_tab_stale(tab, False)
+        
+        # 更新路径输入框
+        tab['path_ctrl'].SetValue(path)
+        
+        # 刷新文件列表
+        self.refresh_file_list(tab)
+        
+        # 更新监控
+        self.start_watching(path)
+
+    def on_frecency_loaded(self, entries):
+        """（后台线程）用常用目录数据库中的路径补充地址栏补全的前缀树"""
+        for path, (rank, last_access) in entries.items():
+            self.path_completions.add_visited(path, max(1, int(rank)))
+
+    def show_quick_jump(self, event=None):
+        """打开快速跳转对话框，在当前标签页中打开选中的目录"""
+        dialog = QuickJumpDialog(self, self.frecency)
+        if dialog.ShowModal() == wx.ID_OK and dialog.path:
+            self.navigate_to(dialog.path)
+        dialog.Destroy()
+
+    def on_char_hook(self, event):
+        """Esc 取消正在进行的导航"""
+        if event.GetKeyCode() == wx.WXK_ESCAPE:
+            current_tab = self.get_current_tab()
+            if current_tab and self.cancel_navigation(current_tab):
+                return
+        event.Skip()
+
     def OnClose(self, event):
         """窗口关闭时清理资源"""
         if self.observer and self.observer.is_alive():
             self.observer.stop()
             self.observer.join()
+        self.poll_watcher.stop()
+        if self.activity_dialog:
+            self.activity_dialog.Close()
+        if self.memory_dialog:
+            self.memory_dialog.Close()
+        self.frecency.close()
+        self.git_status.stop()
+        self.vfs.close()
+        self.metadata_timer.Stop()
+        self.metadata_loader.shutdown()
+        self.thumbnail_loader.shutdown()
+        self.preview_loader.shutdown()
+        self.stop_compare()
+        if self.mirror:
+            self.mirror.cancel()
+        if self.dup_finder:
+            self.dup_finder.cancel()
+        self.disk_usage_timer.Stop()
+        self.flat_timer.Stop()
+        for tab in self.tabs['left'] + self.tabs['right']:
+            if tab['kind'] == "diskusage":
+                tab['du_scanner'].cancel()
+            elif tab['kind'] == "flat":
+                tab['flat'].cancel()
         self.clear_icon_cache()
         self.Destroy()
 
@@ -248,8 +1879,8 @@ class FileExplorerFrame(wx.Frame):
         plus_panel = wx.Panel(self.right_notebook)
         self.right_notebook.AddPage(plus_panel, "+", False)
 
-    def add_tab(self, initial_path, side="left"):
-        """创建新标签页"""
+    def add_tab(self, initial_path, side="left", columns=None, history=None):
+        """创建新标签页；columns 为附加列（默认与上次设置相同），history 用于恢复关闭的标签页"""
         notebook = self.left_notebook if side == "left" else self.right_notebook
         
         # 创建标签页面板
@@ -270,6 +1901,9 @@ class FileExplorerFrame(wx.Frame):
             wx.ArtProvider.GetBitmap(wx.ART_NEW_DIR, size=(16, 16)))
         refresh_tool = toolbar.AddTool(wx.ID_REFRESH, "刷新", 
             wx.ArtProvider.GetBitmap(wx.ART_REDO, size=(16, 16)))
+        toolbar.AddSeparator()
+        thumbnail_tool = toolbar.AddCheckTool(ID_THUMBNAIL_VIEW, "缩略图",
+            wx.ArtProvider.GetBitmap(wx.ART_LIST_VIEW, size=(16, 16)))
         
         # 设置工具栏按钮提示
         toolbar.SetToolShortHelp(wx.ID_BACKWARD, "后退 (Alt+←)")
@@ -277,18 +1911,21 @@ class FileExplorerFrame(wx.Frame):
         toolbar.SetToolShortHelp(wx.ID_UP, "上级目录 (Alt+↑)")
         toolbar.SetToolShortHelp(wx.ID_NEW, "新建文件夹 (Ctrl+N)")
         toolbar.SetToolShortHelp(wx.ID_REFRESH, "刷新 (F5)")
+        toolbar.SetToolShortHelp(ID_THUMBNAIL_VIEW, "缩略图视图")
         
         toolbar.Realize()
         
         # 路径输入框
         path_ctrl = wx.TextCtrl(panel, style=wx.TE_PROCESS_ENTER)
         path_ctrl.SetValue(initial_path)
+        path_ctrl.AutoComplete(PathCompleter(self.path_completions))
+        self.path_completions.add_visited(initial_path)
         
         # 创建图标列表
         icon_list = wx.ImageList(16, 16)
         
         # 文件列表
-        file_list = wx.ListCtrl(panel, style=wx.LC_REPORT|wx.LC_SINGLE_SEL)
+        file_list = wx.ListCtrl(panel, style=wx.LC_REPORT)
         file_list.SetImageList(icon_list, wx.IMAGE_LIST_SMALL)
         
         # 添加列
@@ -296,6 +1933,10 @@ class FileExplorerFrame(wx.Frame):
         file_list.InsertColumn(1, "名称", width=200)
         file_list.InsertColumn(2, "大小", width=100)
         file_list.InsertColumn(3, "修改日期", width=150)
+        columns = list(self.default_columns if columns is None else columns)
+        for offset, key in enumerate(columns):
+            title, width = EXTRA_COLUMNS[key]
+            file_list.InsertColumn(BASE_COLUMN_COUNT + offset, title, width=width)
         
         # 布局
         sizer.Add(toolbar, 0, wx.EXPAND)
@@ -308,12 +1949,15 @@ class FileExplorerFrame(wx.Frame):
         file_list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_item_activated)
         file_list.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_item_selected)
         file_list.Bind(wx.EVT_LIST_ITEM_RIGHT_CLICK, self.on_item_right_click)
+        file_list.Bind(wx.EVT_LIST_COL_RIGHT_CLICK, lambda evt: self.show_column_menu(tab_data))
         file_list.Bind(wx.EVT_SIZE, lambda evt: self.adjust_list_columns(file_list))
         toolbar.Bind(wx.EVT_TOOL, self.on_back, id=wx.ID_BACKWARD)
         toolbar.Bind(wx.EVT_TOOL, self.on_forward, id=wx.ID_FORWARD)
         toolbar.Bind(wx.EVT_TOOL, self.on_up, id=wx.ID_UP)
         toolbar.Bind(wx.EVT_TOOL, self.new_folder, id=wx.ID_NEW)
         toolbar.Bind(wx.EVT_TOOL, lambda evt: self.refresh_file_list(), id=wx.ID_REFRESH)
+        toolbar.Bind(wx.EVT_TOOL, lambda evt: self.set_view_mode(
+            tab_data, "thumbnails" if evt.IsChecked() else "list"), id=ID_THUMBNAIL_VIEW)
         
         # 记录标签页状态
         tab_data = {
@@ -322,25 +1966,125 @@ class FileExplorerFrame(wx.Frame):
             "path_ctrl": path_ctrl,
             "list": file_list,
             "icon_list": icon_list,
-            "history": deque([initial_path], maxlen=10)
+            "icon_indexes": {},  # 位图 -> (图像列表中的位置, 位图)
+            "history": deque(history or [initial_path], maxlen=10),
+            "items": [],
+            "view_mode": "list",
+            "thumb_grid": None,
+            "compare": None,
+            "kind": "dir",
+            "probe": None,
+            "entries": [],  # 当前显示的目录列表（ListingEntry）
+            "listed_path": None,
+            "scan_id": 0,
+            "stale": False,
+            "columns": columns,  # 显示的附加列
+            "column_values": {},  # 附加列 -> {名称: 显示的文字}
+            "meta_range": None  # 最近一次请求元数据的 (目录, 首行, 末行, 行数)
         }
+        self.insert_tab_page(side, panel, os.path.basename(initial_path) or initial_path, tab_data)
+        
+        # 刷新文件列表
+        self.refresh_file_list(tab_data)
+        
+        # 调整布局
+        panel.Layout()
+
+    def insert_tab_page(self, side, panel, title, tab_data):
+        """在"+"标签页之前插入标签页并记录其状态"""
+        notebook = self.left_notebook if side == "left" else self.right_notebook
         
         # 如果是第一个标签页，直接添加
         if not self.tabs[side]:
             self.tabs[side].append(tab_data)
-            notebook.InsertPage(0, panel, os.path.basename(initial_path) or initial_path, True)
+            notebook.InsertPage(0, panel, title, True)
         else:
             # 在"+"标签页之前插入新标签页
             self.tabs[side].append(tab_data)
-            notebook.InsertPage(notebook.GetPageCount() - 1, panel, os.path.basename(initial_path) or initial_path, True)
+            notebook.InsertPage(notebook.GetPageCount() - 1, panel, title, True)
             # 确保"+"标签页保持不选中状态
             notebook.SetSelection(notebook.GetPageCount() - 2)
+
+    def add_tool_tab(self, side, kind, title, path, columns, tools=(), list_factory=None):
+        """创建结果类标签页（重复文件等）
+
+        列表第 1 列存放完整路径（或相对于 path 的路径），get_selected_paths 等现有操作可以直接使用。
+        tools 为 (标签, 图标, 提示, 处理函数) 列表；list_factory(父窗口) 用于创建虚拟列表等特殊列表。返回标签页数据。
+        """
+        notebook = self.left_notebook if side == "left" else self.right_notebook
+        panel = wx.Panel(notebook)
+        sizer = wx.BoxSizer(wx.VERTICAL)
         
-        # 刷新文件列表
-        self.refresh_file_list(tab_data)
+        toolbar = wx.ToolBar(panel)
+        for label, art, short_help, handler in tools:
+            tool = toolbar.AddTool(wx.ID_ANY, label, wx.ArtProvider.GetBitmap(art, size=(16, 16)), short_help)
+            toolbar.Bind(wx.EVT_TOOL, handler, id=tool.GetId())
+        toolbar.Realize()
         
-        # 调整布局
+        path_ctrl = wx.TextCtrl(panel, style=wx.TE_READONLY)
+        path_ctrl.SetValue(path)
+        icon_list = wx.ImageList(16, 16)
+        list_ctrl = list_factory(panel) if list_factory else wx.ListCtrl(panel, style=wx.LC_REPORT)
+        list_ctrl.SetImageList(icon_list, wx.IMAGE_LIST_SMALL)
+        for index, (name, width) in enumerate(columns):
+            list_ctrl.InsertColumn(index, name, width=width)
+            
+        sizer.Add(toolbar, 0, wx.EXPAND)
+        sizer.Add(path_ctrl, 0, wx.EXPAND|wx.ALL, 5)
+        sizer.Add(list_ctrl, 1, wx.EXPAND|wx.ALL, 5)
+        panel.SetSizer(sizer)
+        
+        list_ctrl.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_item_activated)
+        list_ctrl.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_item_selected)
+        list_ctrl.Bind(wx.EVT_LIST_ITEM_RIGHT_CLICK, self.on_item_right_click)
+        list_ctrl.Bind(wx.EVT_SIZE, lambda evt: self.adjust_list_columns(list_ctrl))
+        
+        tab_data = {
+            "panel": panel,
+            "path": path,
+            "path_ctrl": path_ctrl,
+            "list": list_ctrl,
+            "icon_list": icon_list,
+            "icon_indexes": {},  # 位图 -> (图像列表中的位置, 位图)
+            "history": deque([path], maxlen=10),
+            "items": [],
+            "view_mode": "list",
+            "thumb_grid": None,
+            "compare": None,
+            "kind": kind,
+            "probe": None,
+            "entries": [],  # 当前显示的目录列表（ListingEntry）
+            "listed_path": None,
+            "scan_id": 0,
+            "stale": False,
+            "columns": [],
+            "column_values": {},
+            "meta_range": None
+        }
+        self.insert_tab_page(side, panel, title, tab_data)
         panel.Layout()
+        return tab_data
+
+    def set_view_mode(self, tab, mode):
+        """切换标签页的列表/缩略图视图"""
+        grid = tab['thumb_grid']
+        if mode == "thumbnails" and grid is None:
+            grid = ThumbnailGrid(tab['panel'], self, tab)
+            grid.SetBackgroundColour(tab['list'].GetBackgroundColour())
+            grid.SetForegroundColour(tab['list'].GetForegroundColour())
+            tab['panel'].GetSizer().Add(grid, 1, wx.EXPAND|wx.ALL, 5)
+            tab['thumb_grid'] = grid
+            
+        tab['view_mode'] = mode
+        tab['list'].Show(mode == "list")
+        if grid:
+            grid.Show(mode == "thumbnails")
+            if mode == "thumbnails":
+                grid.set_items(tab['items'])
+                grid.SetFocus()
+            else:
+                self.thumbnail_loader.cancel(grid)
+        tab['panel'].Layout()
 
     def on_add_tab(self, event):
         """添加新标签页"""
@@ -398,6 +2142,10 @@ class FileExplorerFrame(wx.Frame):
         # 文件菜单
         file_menu = wx.Menu()
         file_menu.Append(wx.ID_NEW, "新建文件夹\tCtrl+N")
+        quick_jump_item = file_menu.Append(wx.ID_ANY, "快速跳转...\tCtrl+J")
+        file_menu.AppendSeparator()
+        export_item = file_menu.Append(wx.ID_ANY, "导出列表...\tCtrl+E")
+        export_tree_item = file_menu.Append(wx.ID_ANY, "导出列表(包括子目录)...\tCtrl+Shift+E")
         file_menu.AppendSeparator()
         file_menu.Append(wx.ID_CLOSE, "关闭标签页\tCtrl+W")
         restore_tab_item = file_menu.Append(wx.ID_ANY, "恢复关闭的标签页\tCtrl+Shift+T")
@@ -411,12 +2159,19 @@ class FileExplorerFrame(wx.Frame):
         edit_menu.Append(wx.ID_COPY, "复制\tCtrl+C")
         edit_menu.Append(wx.ID_PASTE, "粘贴\tCtrl+V")
         edit_menu.AppendSeparator()
+        rename_menu_item = edit_menu.Append(wx.ID_ANY, "重命名\tF2")
+        batch_rename_item = edit_menu.Append(wx.ID_ANY, "批量重命名...\tCtrl+M")
+        undo_rename_item = edit_menu.Append(wx.ID_ANY, "撤销批量重命名\tCtrl+Shift+Z")
+        edit_menu.AppendSeparator()
         edit_menu.Append(wx.ID_DELETE, "删除\tDel")
         menubar.Append(edit_menu, "编辑(&E)")
         
         # 视图菜单
         view_menu = wx.Menu()
         view_menu.Append(wx.ID_REFRESH, "刷新\tF5")
+        self.preview_item = view_menu.AppendCheckItem(wx.ID_ANY, "预览窗格\tAlt+P")
+        listing_cache_item = view_menu.AppendCheckItem(wx.ID_ANY, "缓存较慢目录的列表")
+        listing_cache_item.Check(self.listing_cache_enabled)
         
         # 主题子菜单
         theme_menu = wx.Menu()
@@ -428,18 +2183,64 @@ class FileExplorerFrame(wx.Frame):
         view_menu.AppendSubMenu(theme_menu, "主题")
         menubar.Append(view_menu, "视图(&V)")
         
+        # 工具菜单
+        tools_menu = wx.Menu()
+        compare_item = tools_menu.Append(wx.ID_ANY, "比较左右标签页\tCtrl+D")
+        compare_hash_item = tools_menu.Append(wx.ID_ANY, "比较左右标签页(校验内容)\tCtrl+Shift+D")
+        stop_compare_item = tools_menu.Append(wx.ID_ANY, "停止比较")
+        tools_menu.AppendSeparator()
+        mirror_item = tools_menu.Append(wx.ID_ANY, "镜像同步 左→右...")
+        stop_mirror_item = tools_menu.Append(wx.ID_ANY, "停止同步")
+        tools_menu.AppendSeparator()
+        dup_item = tools_menu.Append(wx.ID_ANY, "查找重复文件...")
+        stop_dup_item = tools_menu.Append(wx.ID_ANY, "停止查找重复文件")
+        tools_menu.AppendSeparator()
+        disk_usage_item = tools_menu.Append(wx.ID_ANY, "磁盘占用分析\tCtrl+U")
+        flat_item = tools_menu.Append(wx.ID_ANY, "扁平列表(所有子目录中的文件)\tCtrl+Shift+L")
+        menubar.Append(tools_menu, "工具(&T)")
+        
+        # 调试菜单
+        debug_menu = wx.Menu()
+        watch_stats_item = debug_menu.Append(wx.ID_ANY, "监控统计...")
+        activity_item = debug_menu.Append(wx.ID_ANY, "文件活动...")
+        memory_item = debug_menu.Append(wx.ID_ANY, "内存...")
+        force_polling_item = debug_menu.AppendCheckItem(wx.ID_ANY, "对所有目录使用轮询监控")
+        menubar.Append(debug_menu, "调试(&G)")
+        
         self.SetMenuBar(menubar)
         
         # 绑定菜单事件
         self.Bind(wx.EVT_MENU, self.new_folder, id=wx.ID_NEW)
+        self.Bind(wx.EVT_MENU, self.show_quick_jump, id=quick_jump_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.export_listing(), id=export_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.export_listing(recursive=True), id=export_tree_item.GetId())
         self.Bind(wx.EVT_MENU, self.on_close_tab, id=wx.ID_CLOSE)
         self.Bind(wx.EVT_MENU, lambda evt: self.Close(), id=wx.ID_EXIT)
         self.Bind(wx.EVT_MENU, self.on_cut, id=wx.ID_CUT)
         self.Bind(wx.EVT_MENU, self.on_copy, id=wx.ID_COPY)
         self.Bind(wx.EVT_MENU, self.on_paste, id=wx.ID_PASTE)
         self.Bind(wx.EVT_MENU, self.delete_items, id=wx.ID_DELETE)
+        self.Bind(wx.EVT_MENU, self.on_rename, id=rename_menu_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.batch_rename(), id=batch_rename_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.undo_batch_rename(), id=undo_rename_item.GetId())
         self.Bind(wx.EVT_MENU, lambda evt: self.refresh_file_list(), id=wx.ID_REFRESH)
         self.Bind(wx.EVT_MENU, self.restore_closed_tab, id=restore_tab_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.show_preview_pane(evt.IsChecked()), id=self.preview_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: setattr(self, 'listing_cache_enabled', evt.IsChecked()),
+                  id=listing_cache_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.start_compare(), id=compare_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.start_compare(use_hash=True), id=compare_hash_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.stop_compare(), id=stop_compare_item.GetId())
+        self.Bind(wx.EVT_MENU, self.on_mirror, id=mirror_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.mirror and self.mirror.cancel(), id=stop_mirror_item.GetId())
+        self.Bind(wx.EVT_MENU, self.start_duplicate_search, id=dup_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.dup_finder and self.dup_finder.cancel(), id=stop_dup_item.GetId())
+        self.Bind(wx.EVT_MENU, self.start_disk_usage, id=disk_usage_item.GetId())
+        self.Bind(wx.EVT_MENU, self.start_flat_view, id=flat_item.GetId())
+        self.Bind(wx.EVT_MENU, self.show_watch_stats, id=watch_stats_item.GetId())
+        self.Bind(wx.EVT_MENU, self.show_activity, id=activity_item.GetId())
+        self.Bind(wx.EVT_MENU, self.show_memory, id=memory_item.GetId())
+        self.Bind(wx.EVT_MENU, lambda evt: self.set_force_polling(evt.IsChecked()), id=force_polling_item.GetId())
         
         # 绑定主题切换事件
         for item in self.theme_items.values():
@@ -455,24 +2256,132 @@ class FileExplorerFrame(wx.Frame):
                 self.refresh_file_list(tab)
  
     def start_watching(self, path):
-        """启动目录监控"""
+        """启动目录监控；是否需要轮询由 prober 在后台判断，挂起的网络挂载点不会卡住界面"""
         try:
-            if self.observer and self.observer.is_alive():
-                if self.watch_dog:
-                    self.observer.unschedule(self.watch_dog)
-                
-            handler = FileChangeHandler(self.on_file_change)
-            self.watch_dog = self.observer.schedule(handler, path, recursive=False)
-            if not self.observer.is_alive():
-                self.observer.start()
-                
+            archive = self.archives.archive_of(path)
+            if archive:
+                path = os.path.dirname(archive)  # 归档中的路径：监控归档所在的文件夹，归档变化时重新读取
+            self.watched_path = path
+            if self.watch_request:
+                self.watch_request.cancel()
+                self.watch_request = None
+            if self.watch_dog:
+                self.remove_watch(self.watch_dog, self.watch_handler)
+                self.watch_dog = None
+            if self.poll_watch:
+                self.poll_watcher.unwatch(self.poll_watch)
+                self.poll_watch = None
+            if not self.vfs.is_local(path):
+                return  # 远程位置收不到变更通知，修改后由各操作自己刷新
+        except Exception as e:
+            wx.LogError(f"监控启动失败: {str(e)}")
+            return
+
+        if self.force_polling:
+            self.begin_watching(path, True)
+            return
+        def probed(p, result):
+            # 在界面线程中才读取 request，此时 run() 已经返回
+            wx.CallAfter(lambda: self.on_watch_probed(request, result))
+
+        request = self.prober.run(path, needs_polling, probed)
+        self.watch_request = request
+
+    def on_watch_probed(self, request, result):
+        """判断完成（界面线程）；超时或出错时无法判断，改用在自己线程中进行的轮询"""
+        if not self or request is not self.watch_request:
+            return  # 已被新的监控请求取代
+        self.watch_request = None
+        path = request.path
+        self.begin_watching(path, result if isinstance(result, bool) else True)
+
+    def begin_watching(self, path, polling):
+        try:
+            if polling:
+                self.poll_watch = self.poll_watcher.watch(path, self.on_poll_change)
+                return
+            self.watch_handler = FileChangeHandler(path, self.activity)
+            self.watch_dog = self.add_watch(path, self.watch_handler)
         except Exception as e:
             wx.LogError(f"监控启动失败: {str(e)}")
 
-    def on_file_change(self, msg):
-        """文件变化回调"""
-        wx.CallAfter(self.status_bar.SetStatusText, msg, 0)
-        wx.CallAfter(self.refresh_file_list)
+    def add_watch(self, path, handler, recursive=False):
+        """向共享的监控器添加处理器，返回监控句柄"""
+        watch = self.observer.schedule(handler, path, recursive=recursive)
+        self._watch_refs[watch] = self._watch_refs.get(watch, 0) + 1
+        if not self.observer.is_alive():
+            self.observer.start()
+        return watch
+
+    def remove_watch(self, watch, handler):
+        """移除处理器，最后一个处理器移除时才注销监控"""
+        count = self._watch_refs.get(watch, 0) - 1
+        if count > 0:
+            self._watch_refs[watch] = count
+            self.observer.remove_handler_for_watch(handler, watch)
+        else:
+            self._watch_refs.pop(watch, None)
+            self.observer.unschedule(watch)
+
+    def on_poll_change(self, path, events):
+        """轮询监控发现变化（在轮询线程中调用）"""
+        for kind, name in events:
+            self.activity.record(path, kind, os.path.join(path, name) if kind != "error" else name)
+
+    def show_watch_stats(self, event):
+        """显示各监控目录的方式和开销"""
+        lines = []
+        for watch, count in self._watch_refs.items():
+            lines.append(f"{watch.path}\n    系统通知, {count} 个处理器")
+        for path, interval, polls, scans, changes, io_ops, cpu_time, error in self.poll_watcher.stats():
+            lines.append(f"{path}\n    轮询间隔 {interval:.1f} 秒, 轮询 {polls} 次, 列目录 {scans} 次, "
+                         f"变化 {changes} 次, I/O {io_ops} 次, CPU {cpu_time * 1000:.1f} 毫秒"
+                         + (f", 错误: {error}" if error else ""))
+        wx.MessageBox("\n".join(lines) or "没有正在监控的目录", "监控统计", wx.OK | wx.ICON_INFORMATION)
+
+    def set_force_polling(self, enabled):
+        """对所有目录使用轮询监控（用于排查通知丢失的问题）"""
+        self.force_polling = enabled
+        current_tab = self.get_current_tab()
+        if current_tab:
+            self.start_watching(current_tab['path'])
+
+    def show_memory(self, event):
+        """显示各缓存的内存占用，可修改内存预算"""
+        if self.memory_dialog:
+            self.memory_dialog.Raise()
+            return
+        self.memory_dialog = MemoryDialog(self, self.memory)
+        self.memory_dialog.Show()
+
+    def show_activity(self, event):
+        """打开文件活动监视器（不阻塞主窗口）"""
+        if self.activity_dialog:
+            self.activity_dialog.Raise()
+            return
+        self.activity_dialog = ActivityDialog(self, self.activity)
+        self.activity_dialog.Show()
+
+    def on_activity_pending(self):
+        """有新的文件变化：稍等片刻，合并之后到达的变化"""
+        if not self:
+            return
+        wx.CallLater(ACTIVITY_COALESCE_MS, self.on_file_change)
+
+    def on_file_change(self):
+        """取走合并的文件变化，当前目录有变化时只刷新一次"""
+        if not self:
+            return
+        pending = self.activity.take_pending()
+        if not self.watched_path or self.watched_path not in pending:
+            return
+        count, last_event = pending[self.watched_path]
+        self.git_status.invalidate(self.watched_path)
+        msg = describe(last_event)
+        if count > 1:
+            msg += f" 等 {count} 项"
+        self.status_bar.SetStatusText(msg, 0)
+        self.refresh_file_list()
 
     def sync_directory_changes(self):
         """监控目录变化并同步"""
@@ -547,6 +2456,13 @@ class FileExplorerFrame(wx.Frame):
         self.main_panel.SetBackgroundColour(theme['bg'])
         self.main_panel.SetForegroundColour(theme['fg'])
         
+        # 设置预览窗格颜色
+        self.preview_pane.SetBackgroundColour(theme['bg'])
+        self.preview_pane.SetForegroundColour(theme['fg'])
+        self.preview_pane.text_ctrl.SetBackgroundColour(theme['textctrl_bg'])
+        self.preview_pane.text_ctrl.SetForegroundColour(theme['textctrl_fg'])
+        self.preview_pane.Refresh()
+        
         # 设置标签页颜色
         for side in ['left', 'right']:
             notebook = self.left_notebook if side == 'left' else self.right_notebook
@@ -573,6 +2489,10 @@ class FileExplorerFrame(wx.Frame):
                 list_ctrl = tab['list']
                 list_ctrl.SetBackgroundColour(theme['list_bg'])
                 list_ctrl.SetForegroundColour(theme['list_fg'])
+                if tab['thumb_grid']:
+                    tab['thumb_grid'].SetBackgroundColour(theme['list_bg'])
+                    tab['thumb_grid'].SetForegroundColour(theme['list_fg'])
+                    tab['thumb_grid'].Refresh()
                 
                 # 刷新控件
                 tab['panel'].Refresh()
@@ -602,22 +2522,35 @@ class FileExplorerFrame(wx.Frame):
     def new_folder(self, event):
         """创建新文件夹"""
         current_tab = self.get_current_tab()
-        if not current_tab:
+        if not current_tab or not self.check_writable(current_tab):
             return
             
         dlg = wx.TextEntryDialog(self, "请输入文件夹名称:", "新建文件夹")
-        if dlg.ShowModal() == wx.ID_OK:
-            name = dlg.GetValue()
-            if not name:
-                return
-                
-            path = os.path.join(current_tab['path'], name)
+        name = dlg.GetValue() if dlg.ShowModal() == wx.ID_OK else ""
+        dlg.Destroy()
+        if not name:
+            return
+            
+        # 在后台创建：远程位置或卡住的网络驱动器不会卡住界面
+        parent = current_tab['path']
+        path = self.vfs.join(parent, name)
+        
+        def worker():
+            error = None
             try:
-                os.makedirs(path, exist_ok=True)
-                self.refresh_file_list(current_tab)
+                self.vfs.mkdir(path)
             except Exception as e:
-                wx.MessageBox(f"创建文件夹失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
-        dlg.Destroy()
+                error = e
+            wx.CallAfter(self.on_folder_created, parent, error)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_folder_created(self, parent, error):
+        if not self:
+            return
+        self.path_completions.subdirs.invalidate(parent)
+        self.refresh_tabs_at(parent)
+        if error:
+            wx.MessageBox(f"创建文件夹失败: {str(error)}", "错误", wx.OK | wx.ICON_ERROR)
 
     def load_system_icons(self):
         """加载系统图标"""
@@ -717,8 +2650,9 @@ class FileExplorerFrame(wx.Frame):
             ext = os.path.splitext(file_path)[1].lower()
             cache_key = ext if ext else os.path.basename(file_path).lower()
             
-            if cache_key in self._icon_cache:
-                return self._icon_cache[cache_key]
+            cached = self._icon_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
             # 从注册表获取图标
             try:
@@ -769,7 +2703,7 @@ class FileExplorerFrame(wx.Frame):
                         win32gui.DestroyIcon(handle)
                         
                     # 缓存并返回图标
-                    self._icon_cache[cache_key] = bitmap
+                    self._icon_cache.put(cache_key, bitmap)
                     return bitmap
                     
             except Exception as e:
@@ -791,7 +2725,7 @@ class FileExplorerFrame(wx.Frame):
                 '.dll': wx.ArtProvider.GetBitmap(wx.ART_NORMAL_FILE, size=(16, 16)),
             }
             default_icon = default_icons.get(ext, self.file_icon)
-            self._icon_cache[cache_key] = default_icon
+            self._icon_cache.put(cache_key, default_icon)
             return default_icon
                 
         except Exception as e:
@@ -799,16 +2733,123 @@ class FileExplorerFrame(wx.Frame):
             return self.file_icon
 
     def refresh_file_list(self, tab=None):
-        """刷新指定标签页或当前标签页的文件列表"""
+        """刷新指定标签页或当前标签页的文件列表
+
+        目录在后台线程中扫描，完成后把差异应用到列表上（文件监控触发的刷新走同一路径）。
+        切换到新目录时如果有快照，先显示快照并标记为过期，扫描完成后再更新。
+        """
         if tab is None:
             tab = self.get_current_tab()
-        if not tab:
+        if not tab or tab['kind'] != "dir":
             return
             
+        path = tab['path']
+        tab['scan_id'] += 1
+        if tab['listed_path'] != path:
+            tab['listed_path'] = path
+            tab['column_values'] = {}
+            use_snapshot = self.listing_cache_enabled and not self.archives.archive_of(path)
+            snapshot = self.listing_store.load(path) if use_snapshot else None
+            if snapshot:
+                scanned_at, entries = snapshot
+                self.populate_list(tab, entries)
+                self.set_tab_stale(tab, True)
+                when = datetime.fromtimestamp(scanned_at).strftime('%Y-%m-%d %H:%M')
+                self.status_bar.SetStatusText(f"显示的是 {when} 的缓存列表，正在刷新...", 0)
+            else:
+                self.populate_list(tab, [])
+                self.status_bar.SetStatusText(f"正在加载 {path} ...", 0)
+                
+        threading.Thread(target=self.scan_directory, args=(tab, path, tab['scan_id']), daemon=True).start()
+
+    def scan_directory(self, tab, path, scan_id):
+        """扫描线程：列出目录，较慢或较大的目录同时保存快照"""
+        start = time.monotonic()
+        archive = self.archives.archive_of(path)
+        try:
+            if archive:
+                entries = self.archives.list_dir(
+                    path, lambda count: wx.CallAfter(self.on_archive_indexing, tab, path, scan_id, count))
+            else:
+                entries = self.vfs.list_dir(path)
+            error = None
+        except (OSError, EOFError, tarfile.TarError, zipfile.BadZipFile) as e:
+            entries, error = None, e
+        elapsed = time.monotonic() - start
+        
+        if entries is not None and self.listing_cache_enabled and not archive:
+            slow = not self.vfs.is_local(path) or needs_polling(path)
+            if elapsed > SNAPSHOT_MIN_SCAN_TIME or len(entries) > SNAPSHOT_MIN_ENTRIES or slow:
+                try:
+                    self.listing_store.save(path, entries)
+                except OSError:
+                    pass
+        wx.CallAfter(self.on_directory_scanned, tab, path, scan_id, entries, error)
+
+    def on_directory_scanned(self, tab, path, scan_id, entries, error):
+        if not self or tab['scan_id'] != scan_id or tab['path'] != path:
+            return  # 已切换到其他目录或有更新的扫描
+        self.set_tab_stale(tab, False)
+        if error:
+            self.status_bar.SetStatusText("", 0)
+            wx.LogError(f"无法访问目录 {path}：{str(error)}")
+            return
+        self.apply_listing(tab, entries)
+
+    def on_archive_indexing(self, tab, path, scan_id, count):
+        """第一次打开 tar 归档时显示读取索引的进度"""
+        if self and tab['scan_id'] == scan_id and tab['path'] == path:
+            self.status_bar.SetStatusText(f"正在读取归档索引: 已读取 {count} 项...", 0)
+
+    def set_tab_stale(self, tab, stale):
+        """在标签页标题上标记列表是否来自过期的快照"""
+        tab['stale'] = stale
+        side = "left" if tab in self.tabs['left'] else "right"
+        if tab in self.tabs[side]:
+            notebook = self.left_notebook if side == "left" else self.right_notebook
+            title = os.path.basename(tab['path']) or tab['path']
+            notebook.SetPageText(self.tabs[side].index(tab), title + (" (缓存)" if stale else ""))
+
+    def make_list_item(self, tab, entry):
+        modified = datetime.fromtimestamp(entry.mtime).strftime('%Y-%m-%d %H:%M:%S')
+        return (entry.name, entry.is_dir, entry.size, modified, self.vfs.join(tab['path'], entry.name))
+
+    def set_list_row(self, tab, index, item, insert=True):
+        """写入列表的一行（insert 为 False 时更新已有的行）"""
+        list_ctrl = tab['list']
+        name, is_dir, size, modified, full_path = item
+        icon_idx = self.list_icon_index(tab, item)
+        if insert:
+            list_ctrl.InsertItem(index, "")
+        list_ctrl.SetItemImage(index, icon_idx)
+        list_ctrl.SetItem(index, 1, name)
+        list_ctrl.SetItem(index, 2, self.format_size(size) if not is_dir and name != ".." else "")
+        list_ctrl.SetItem(index, 3, modified if name != ".." else "")
+        for offset, key in enumerate(tab['columns']):
+            list_ctrl.SetItem(index, BASE_COLUMN_COUNT + offset, tab['column_values'].get(key, {}).get(name, ""))
+
+    def list_icon_index(self, tab, item):
+        """返回行图标在标签页图像列表中的位置；同一位图只加入一次，图像列表不会随刷新增长"""
+        name, is_dir, size, modified, full_path = item
+        indexes = tab['icon_indexes']
+        if name == "..":
+            key = ".."
+            if key not in indexes:
+                up_icon = wx.ArtProvider.GetBitmap(wx.ART_GO_UP, wx.ART_OTHER, (16, 16))
+                indexes[key] = (tab['icon_list'].Add(up_icon), up_icon)
+            return indexes[key][0]
+        icon = self.folder_icon if is_dir else self.get_file_type_icon(full_path)
+        # 按位图对象区分，同时保存位图本身，保证其 id 不会被其他对象重用
+        key = id(icon)
+        if key not in indexes:
+            indexes[key] = (tab['icon_list'].Add(icon), icon)
+        return indexes[key][0]
+
+    def populate_list(self, tab, entries):
+        """用完整的目录列表重新填充标签页"""
         list_ctrl = tab['list']
         icon_list = tab['icon_list']
         current_path = tab['path']
-        path_ctrl = tab['path_ctrl']
         
         # 保存当前滚动位置和选中项
         top_item = list_ctrl.GetTopItem()
@@ -821,80 +2862,808 @@ class FileExplorerFrame(wx.Frame):
             selected_items.append(list_ctrl.GetItem(item, 1).GetText())
         
         # 更新路径显示
-        path_ctrl.SetValue(current_path)
+        tab['path_ctrl'].SetValue(current_path)
         
         # 清空列表
+        list_ctrl.Freeze()
+        list_ctrl.DeleteAllItems()
+        icon_list.RemoveAll()
+        tab['icon_indexes'] = {}
+        
+        items = [self.make_list_item(tab, entry) for entry in entries]
+        # 排序：文件夹优先，然后按名称排序
+        items.sort(key=lambda x: (not x[1], x[0].lower()))
+        # 添加上级目录项
+        parent = os.path.dirname(current_path)
+        if parent and parent != current_path:
+            items.insert(0, ("..", True, 0, "", parent))
+        tab['items'] = items
+        tab['entries'] = entries
+        
+        # 添加到列表
+        for idx, item in enumerate(items):
+            self.set_list_row(tab, idx, item)
+            # 恢复选中状态
+            if item[0] in selected_items:
+                list_ctrl.SetItemState(idx, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
+        list_ctrl.Thaw()
+        
+        # 恢复滚动位置
+        if top_item >= 0 and top_item < list_ctrl.GetItemCount():
+            list_ctrl.EnsureVisible(top_item)
+            
+        self.after_list_changed(tab)
+        
+        # 调整列宽
+        self.adjust_list_columns(list_ctrl)
+
+    def apply_listing(self, tab, entries):
+        """把新的目录列表与当前显示的列表比较，只更新有变化的行"""
+        added, removed, changed = diff_listings(tab['entries'], entries)
+        if not tab['entries'] or len(added) + len(removed) + len(changed) > max(100, len(entries) // 2):
+            self.populate_list(tab, entries)
+            return
+        tab['entries'] = entries
+        if not (added or removed or changed):
+            self.update_list_status(tab)
+            return
+            
+        list_ctrl = tab['list']
+        items = tab['items']
+        list_ctrl.Freeze()
+        
+        # 类型变化（文件 <-> 文件夹）会改变排序位置，按删除后重新添加处理
+        old_types = {item[0]: item[1] for item in items}
+        retyped = {entry.name for entry in changed if old_types.get(entry.name) != entry.is_dir}
+        gone = set(removed) | retyped
+        first = 1 if items and items[0][0] == ".." else 0
+        for index in range(len(items) - 1, first - 1, -1):
+            if items[index][0] in gone:
+                list_ctrl.DeleteItem(index)
+                del items[index]
+                
+        positions = {item[0]: index for index, item in enumerate(items)}
+        for entry in changed:
+            if entry.name in retyped:
+                continue
+            index = positions[entry.name]
+            items[index] = self.make_list_item(tab, entry)
+            self.set_list_row(tab, index, items[index], insert=False)
+            
+        keys = [(not item[1], item[0].lower()) for item in items[first:]]
+        for entry in added + [entry for entry in changed if entry.name in retyped]:
+            key = (not entry.is_dir, entry.name.lower())
+            pos = bisect.bisect_left(keys, key)
+            keys.insert(pos, key)
+            item = self.make_list_item(tab, entry)
+            items.insert(first + pos, item)
+            self.set_list_row(tab, first + pos, item)
+        list_ctrl.Thaw()
+        
+        self.after_list_changed(tab, {entry.name for entry in added + changed})
+
+    def after_list_changed(self, tab, names=None):
+        """列表内容变化后更新缩略图、比较高亮和状态栏"""
+        if tab['view_mode'] == "thumbnails":
+            tab['thumb_grid'].set_items(tab['items'])
+            
+        # 恢复目录比较的高亮
+        self.apply_compare_marks(tab, names)
+        self.update_extra_columns(tab, names)
+        self.update_list_status(tab)
+
+    def update_extra_columns(self, tab, names=None):
+        """填写附加列：只读取缓存的结果，缺少或过期的在后台计算，完成后再次调用本方法
+
+        names 为新增或修改过的项目（None 表示整个列表），它们已有的元数据作废。
+        """
+        if not tab['columns'] or tab['kind'] != "dir":
+            return
+        if "git" in tab['columns']:
+            in_archive = self.archives.archive_of(tab['path'])
+            self.set_column_values(tab, "git", {} if in_archive else self.git_status.lookup(tab['path']) or {})
+        if any(key in METADATA_COLUMNS for key in tab['columns']):
+            if names:
+                for key in METADATA_COLUMNS:
+                    values = tab['column_values'].get(key)
+                    for name in names if values else ():
+                        values.pop(name, None)
+            tab['meta_range'] = None
+            self.request_metadata(tab)
+            if not self.metadata_timer.IsRunning():
+                self.metadata_timer.Start(200)
+
+    def request_metadata(self, tab):
+        """为可见的行（以及下面 METADATA_PREFETCH 行）请求还没有的元数据，替换该标签页之前的请求"""
+        keys = [key for key in tab['columns'] if key in METADATA_COLUMNS]
+        list_ctrl = tab['list']
+        if not keys or self.archives.archive_of(tab['path']) or not list_ctrl.IsShownOnScreen():
+            self.metadata_loader.cancel(tab['panel'])
+            tab['meta_range'] = None
+            return
+        items = tab['items']
+        top = max(list_ctrl.GetTopItem(), 0)
+        end = min(len(items), top + list_ctrl.GetCountPerPage() + METADATA_PREFETCH)
+        meta_range = (tab['path'], top, end, len(items))
+        if tab['meta_range'] == meta_range:
+            return
+        tab['meta_range'] = meta_range
+        values = tab['column_values']
+        jobs = []
+        for name, is_dir, size, modified, full_path in items[top:end]:
+            if name == "..":
+                continue
+            missing = tuple(key for key in keys if name not in values.setdefault(key, {}))
+            if missing:
+                jobs.append((full_path, missing))
+        self.metadata_loader.request(tab['panel'], jobs,
+                                     lambda owner, path, found: self.metadata_results.put((owner, path, found)))
+
+    def on_metadata_timer(self, event):
+        """批量写入后台提取的元数据；列表滚动后为新的可见行发出请求"""
+        results = {}
+        while True:
+            try:
+                owner, path, found = self.metadata_results.get_nowait()
+            except queue.Empty:
+                break
+            results.setdefault(owner, []).append((path, found))
+        active = False
+        for tab in self.tabs['left'] + self.tabs['right']:
+            if tab['kind'] != "dir" or not any(key in METADATA_COLUMNS for key in tab['columns']):
+                continue
+            active = True
+            if tab['panel'] in results:
+                self.apply_metadata(tab, results[tab['panel']])
+            self.request_metadata(tab)
+        if not active:
+            self.metadata_timer.Stop()
+
+    def apply_metadata(self, tab, results):
+        """记录元数据，并更新可见范围内对应的行（其他行在插入时从 column_values 读取）"""
+        values = tab['column_values']
+        rows = {}
+        for path, found in results:
+            if os.path.dirname(path) != tab['path']:
+                continue  # 已切换到其他目录
+            name = os.path.basename(path)
+            for key, text in found.items():
+                values.setdefault(key, {})[name] = text
+            rows[name] = found
+        if not rows:
+            return
+        list_ctrl = tab['list']
+        items = tab['items']
+        top = max(list_ctrl.GetTopItem(), 0)
+        end = min(len(items), top + list_ctrl.GetCountPerPage() + METADATA_PREFETCH)
+        for index in range(top, end):
+            found = rows.get(items[index][0])
+            if found is None:
+                continue
+            for key, text in found.items():
+                if key in tab['columns']:
+                    list_ctrl.SetItem(index, BASE_COLUMN_COUNT + tab['columns'].index(key), text)
+
+    def set_column_values(self, tab, key, values):
+        """替换一列的值，只重写有变化的行"""
+        old = tab['column_values'].get(key, {})
+        tab['column_values'][key] = values
+        if key not in tab['columns'] or old == values:
+            return
+        column = BASE_COLUMN_COUNT + tab['columns'].index(key)
+        list_ctrl = tab['list']
+        for index, item in enumerate(tab['items']):
+            name = item[0]
+            if old.get(name) != values.get(name):
+                list_ctrl.SetItem(index, column, values.get(name, ""))
+
+    def show_column_menu(self, tab):
+        """列标题的右键菜单：显示或隐藏附加列"""
+        if tab['kind'] != "dir":
+            return
+        menu = wx.Menu()
+        for key, (title, width) in EXTRA_COLUMNS.items():
+            item = menu.AppendCheckItem(wx.ID_ANY, title)
+            item.Check(key in tab['columns'])
+            if key == "git" and not self.git_status.available:
+                item.SetItemLabel(title + "（未找到 git）")
+                item.Enable(False)
+            menu.Bind(wx.EVT_MENU, lambda evt, key=key: self.toggle_column(tab, key), item)
+        tab['list'].PopupMenu(menu)
+        menu.Destroy()
+
+    def toggle_column(self, tab, key):
+        list_ctrl = tab['list']
+        if key in tab['columns']:
+            list_ctrl.DeleteColumn(BASE_COLUMN_COUNT + tab['columns'].index(key))
+            tab['columns'].remove(key)
+            tab['column_values'].pop(key, None)
+        else:
+            title, width = EXTRA_COLUMNS[key]
+            tab['columns'].append(key)
+            list_ctrl.InsertColumn(BASE_COLUMN_COUNT + len(tab['columns']) - 1, title, width=width)
+            self.update_extra_columns(tab)
+        self.default_columns = list(tab['columns'])  # 之后打开的标签页显示相同的列
+        self.adjust_list_columns(list_ctrl)
+
+    def on_git_status_updated(self, root):
+        """仓库的 git status 结果已更新：刷新该仓库中各标签页的状态列"""
+        if not self:
+            return
+        prefix = root.rstrip(os.sep) + os.sep
+        for tab in self.tabs['left'] + self.tabs['right']:
+            if tab['kind'] == "dir" and "git" in tab['columns'] and (
+                    tab['path'] == root or tab['path'].startswith(prefix)):
+                self.update_extra_columns(tab)
+
+    def update_list_status(self, tab):
+        items = tab['items']
+        total_items = len(items) - (1 if items and items[0][0] == ".." else 0)
+        folders = sum(1 for item in items if item[1] and item[0] != "..")
+        files = total_items - folders
+        self.status_bar.SetStatusText(f"文件夹: {folders}, 文件: {files}", 0)
+    
+    def format_size(self, size):
+        """将文件大小转换为人类可读的格式"""
+        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+            if size < 1024.0:
+                if unit == 'B':
+                    return f"{int(size)} {unit}"
+                return f"{size:.2f} {unit}"
+            size /= 1024.0
+        return f"{size:.2f} PB"
+    
+    # 其余方法实现（new_folder, delete_items等）...
+    
+    def start_compare(self, use_hash=False):
+        """比较左右两侧当前标签页的目录树，差异在两侧列表中高亮"""
+        left_tab = self.get_current_tab("left")
+        right_tab = self.get_current_tab("right")
+        if not left_tab or not right_tab:
+            return
+            
+        self.stop_compare()
+        for tab in (left_tab, right_tab):
+            tab['compare'] = {"root": tab['path'], "marks": {}}
+            self.refresh_file_list(tab)
+            
+        self.compare_tabs = (left_tab, right_tab)
+        self.compare_queue = queue.SimpleQueue()
+        self.comparer = DirectoryComparer(left_tab['path'], right_tab['path'],
+                                          self.compare_queue.put, use_hash=use_hash)
+        self.comparer.start()
+        self.compare_timer.Start(300)
+        self.status_bar.SetStatusText("正在比较...", 0)
+
+    def stop_compare(self):
+        """取消正在进行的比较，已有的高亮保留"""
+        if self.comparer and not self.comparer.finished:
+            self.comparer.cancel()
+            self.status_bar.SetStatusText("比较已停止", 0)
+        self.compare_timer.Stop()
+        self.comparer = None
+
+    def on_compare_timer(self, event):
+        """批量取出比较结果并更新两侧列表（比较线程不直接操作界面）"""
+        comparer = self.comparer
+        if not comparer:
+            return
+        # 先记录状态再取结果，保证结束前报告的差异都已取出
+        finished = comparer.finished
+        left_tab, right_tab = self.compare_tabs
+        left_marks = left_tab['compare']['marks']
+        right_marks = right_tab['compare']['marks']
+        changed = set()
+        
+        while True:
+            try:
+                diffs = self.compare_queue.get_nowait()
+            except queue.Empty:
+                break
+            for diff in diffs:
+                if not diff.relpath:
+                    continue  # 比较的根目录本身无法读取，只计入错误数
+                top = diff.relpath.split(os.sep, 1)[0]
+                changed.add(top)
+                if top != diff.relpath:
+                    # 子目录中有差异，顶层目录标记为"不同"
+                    left_marks.setdefault(top, CHANGED)
+                    right_marks.setdefault(top, CHANGED)
+                    continue
+                if diff.status != RIGHT_ONLY:
+                    left_marks[top] = diff.status
+                if diff.status != LEFT_ONLY:
+                    right_marks[top] = diff.status
+                    
+        if changed:
+            self.apply_compare_marks(left_tab, changed)
+            self.apply_compare_marks(right_tab, changed)
+            
+        summary = (f"已比较 {comparer.dirs_compared} 个文件夹, {comparer.files_compared} 个文件, "
+                   f"差异 {comparer.diff_count} 项")
+        if comparer.errors:
+            summary += f", {comparer.errors} 项无法读取"
+        if finished:
+            self.compare_timer.Stop()
+            self.comparer = None
+            if not comparer.cancel_event.is_set():
+                self.status_bar.SetStatusText("比较完成: " + summary, 0)
+        else:
+            self.status_bar.SetStatusText("正在比较... " + summary, 0)
+
+    def apply_compare_marks(self, tab, names=None):
+        """按比较结果设置列表项的背景色"""
+        compare = tab['compare']
+        if not compare or compare['root'] != tab['path']:
+            return
+        marks = compare['marks']
+        list_ctrl = tab['list']
+        for index, item in enumerate(tab['items']):
+            name = item[0]
+            if names is not None and name not in names:
+                continue
+            colour = COMPARE_COLOURS.get(marks.get(name))
+            if colour:
+                list_ctrl.SetItemBackgroundColour(index, colour)
+                list_ctrl.SetItemTextColour(index, wx.BLACK)
+
+    def on_mirror(self, event):
+        """将左侧当前目录单向同步到右侧当前目录"""
+        left_tab = self.get_current_tab("left")
+        right_tab = self.get_current_tab("right")
+        if not left_tab or not right_tab:
+            return
+        if self.mirror:
+            wx.MessageBox("已有同步正在进行", "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+            
+        source, target = left_tab['path'], right_tab['path']
+        if os.path.normcase(source) == os.path.normcase(target):
+            wx.MessageBox("源和目标是同一个目录", "错误", wx.OK | wx.ICON_ERROR)
+            return
+            
+        dlg = MirrorDialog(self, source, target)
+        if dlg.ShowModal() != wx.ID_OK:
+            dlg.Destroy()
+            return
+        options = dlg.get_options()
+        dlg.Destroy()
+        
+        if options["delete_extraneous"] and not options["dry_run"]:
+            msg = f"目标目录中源目录不存在的项目将被移动到回收站：\n{target}\n\n确定继续吗？"
+            if wx.MessageBox(msg, "确认同步", wx.YES_NO | wx.NO_DEFAULT | wx.ICON_QUESTION) != wx.YES:
+                return
+                
+        self.mirror = Mirror(source, target, remove=self.vfs.local.trash,
+                             progress=lambda stats, path: wx.CallAfter(self.on_mirror_progress, stats, path),
+                             **options)
+        threading.Thread(target=self.run_mirror, args=(self.mirror, right_tab), daemon=True).start()
+        self.status_bar.SetStatusText("正在同步...", 0)
+
+    def run_mirror(self, mirror, tab):
+        """同步线程"""
+        try:
+            stats = mirror.run()
+            error = None
+        except Exception as e:
+            stats, error = mirror.stats, e
+        wx.CallAfter(self.on_mirror_done, mirror, stats, tab, error)
+
+    def on_mirror_progress(self, stats, path):
+        if self.mirror:
+            self.status_bar.SetStatusText(
+                f"正在同步: {os.path.basename(path)}  已写入 {self.format_size(stats.bytes_written)}", 0)
+
+    def on_mirror_done(self, mirror, stats, tab, error):
+        """同步结束，报告结果"""
+        if not self:
+            return
+        self.mirror = None
+        if tab in self.tabs['left'] or tab in self.tabs['right']:
+            self.refresh_file_list(tab)
+            
+        if error:
+            wx.MessageBox(f"同步失败: {str(error)}", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        title = "同步预览" if mirror.dry_run else ("同步已取消" if mirror.cancel_event.is_set() else "同步完成")
+        lines = [
+            f"新文件: {stats.files_copied}, 更新: {stats.files_updated}, 新文件夹: {stats.dirs_created}, 删除: {stats.files_deleted}",
+            f"改写的块: {stats.blocks_changed} / {stats.blocks_total}",
+            f"写入: {self.format_size(stats.bytes_written)}, 全量复制需写入: {self.format_size(stats.bytes_full)}",
+            f"节省: {self.format_size(stats.bytes_saved)}",
+        ]
+        if stats.errors:
+            lines.append(f"\n{len(stats.errors)} 个错误:")
+            lines.extend(stats.errors[:10])
+        self.status_bar.SetStatusText(title, 0)
+        wx.MessageBox("\n".join(lines), title, wx.OK | wx.ICON_INFORMATION)
+
+    def start_duplicate_search(self, event):
+        """在选中的文件夹（未选中时为当前目录）中查找重复文件"""
+        current_tab = self.get_current_tab()
+        if not current_tab or current_tab['kind'] != "dir":
+            return
+        if self.dup_finder:
+            wx.MessageBox("已有重复文件查找正在进行", "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+            
+        root = current_tab['path']
+        selected = self.get_selected_paths(current_tab)
+        dirs = {item[4] for item in current_tab['items'] if item[1] and item[0] != ".."}
+        if len(selected) == 1 and selected[0] in dirs:
+            root = selected[0]
+            
+        side = "left" if current_tab in self.tabs['left'] else "right"
+        stages = {"scan": "扫描", "partial": "比较首尾", "full": "完整哈希"}
+        
+        def progress(stage, done, total):
+            text = f"查找重复文件: {stages[stage]} {done}" + (f"/{total}" if total else "")
+            wx.CallAfter(self.status_bar.SetStatusText, text, 0)
+            
+        self.dup_finder = DuplicateFinder(root, progress=progress)
+        threading.Thread(target=self.run_duplicate_search, args=(self.dup_finder, side), daemon=True).start()
+        self.status_bar.SetStatusText("查找重复文件...", 0)
+
+    def run_duplicate_search(self, finder, side):
+        """查找线程，同时获取结果文件的修改时间"""
+        try:
+            groups = finder.run()
+            modified = {}
+            for group in groups:
+                for path in group.paths:
+                    try:
+                        mtime = os.path.getmtime(path)
+                        modified[path] = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
+                    except OSError:
+                        pass
+            error = None
+        except Exception as e:
+            groups, modified, error = [], {}, e
+        wx.CallAfter(self.on_duplicates_found, finder, groups, modified, side, error)
+
+    def on_duplicates_found(self, finder, groups, modified, side, error):
+        """在新标签页中按内容分组显示重复文件"""
+        if not self:
+            return
+        self.dup_finder = None
+        if error:
+            wx.MessageBox(f"查找重复文件失败: {str(error)}", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        if finder.cancel_event.is_set():
+            self.status_bar.SetStatusText("查找重复文件已停止", 0)
+            return
+            
+        title = "重复文件 - " + (os.path.basename(finder.root) or finder.root)
+        tools = [
+            ("移到回收站", wx.ART_DELETE, "每组保留一个（组内选中的项，否则为第一项），其余移到回收站",
+             lambda evt: self.dedupe(tab, "trash")),
+            ("替换为硬链接", wx.ART_COPY, "每组保留一个（组内选中的项，否则为第一项），其余替换为指向它的硬链接",
+             lambda evt: self.dedupe(tab, "hardlink")),
+        ]
+        columns = [("组", 40), ("路径", 400), ("大小", 100), ("修改日期", 150)]
+        tab = self.add_tool_tab(side, "duplicates", title, finder.root, columns, tools)
+        tab['dup_groups'] = groups
+        tab['dup_modified'] = modified
+        self.render_duplicates(tab)
+
+    def render_duplicates(self, tab):
+        """重新填充重复文件列表，相邻的组用不同背景色区分"""
+        list_ctrl = tab['list']
         list_ctrl.DeleteAllItems()
-        icon_list.RemoveAll()
+        items = []
+        group_colour = wx.Colour(235, 242, 255)
+        for group_index, group in enumerate(tab['dup_groups']):
+            for path in group.paths:
+                index = len(items)
+                modified = tab['dup_modified'].get(path, "")
+                items.append((path, False, group.size, modified, path))
+                list_ctrl.InsertItem(index, str(group_index + 1))
+                list_ctrl.SetItem(index, 1, path)
+                list_ctrl.SetItem(index, 2, self.format_size(group.size))
+                list_ctrl.SetItem(index, 3, modified)
+                if group_index % 2:
+                    list_ctrl.SetItemBackgroundColour(index, group_colour)
+                    list_ctrl.SetItemTextColour(index, wx.BLACK)
+        tab['items'] = items
         
-        try:
-            items = []
-            # 添加上级目录项
-            parent = os.path.dirname(current_path)
-            if parent and parent != current_path:
-                items.append(("..", True, 0, "", parent))
-            
-            # 获取目录内容
-            for item in os.listdir(current_path):
-                full_path = os.path.join(current_path, item)
-                is_dir = os.path.isdir(full_path)
-                try:
-                    size = os.path.getsize(full_path) if not is_dir else 0
-                    mtime = os.path.getmtime(full_path)
-                    modified = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
-                    items.append((item, is_dir, size, modified, full_path))
-                except OSError:
+        wasted = sum(group.wasted for group in tab['dup_groups'])
+        self.status_bar.SetStatusText(
+            f"重复文件: {len(tab['dup_groups'])} 组, 共 {len(items)} 个文件, 可释放 {self.format_size(wasted)}", 0)
+
+    def dedupe(self, tab, mode):
+        """批量处理重复文件：trash 移到回收站，hardlink 替换为硬链接"""
+        selected = set(self.get_selected_paths(tab))
+        plan = []
+        for group in tab['dup_groups']:
+            keep = next((p for p in group.paths if p in selected), group.paths[0])
+            plan.append((group, keep, [p for p in group.paths if p != keep]))
+        count = sum(len(others) for group, keep, others in plan)
+        if not count:
+            return
+            
+        action = "移到回收站" if mode == "trash" else "替换为硬链接"
+        msg = f"每组保留一个文件，其余 {count} 个文件将被{action}。\n确定继续吗？"
+        if wx.MessageBox(msg, "确认", wx.YES_NO | wx.NO_DEFAULT | wx.ICON_QUESTION) != wx.YES:
+            return
+            
+        def worker():
+            # 扫描结果可能已过去很久：保留的文件和每个副本都必须与扫描时的大小和修改时间相同
+            done, errors, skipped = set(), [], []
+            for group, keep, others in plan:
+                if not group.unchanged(keep):
+                    skipped.extend(f"{path}: 保留的文件 {keep} 在扫描后已改变或不存在" for path in others)
                     continue
+                for path in others:
+                    if not group.unchanged(path):
+                        skipped.append(f"{path}: 在扫描后已改变或不存在")
+                        continue
+                    try:
+                        if mode == "trash":
+                            self.vfs.local.trash(path)
+                        else:
+                            replace_with_hardlink(keep, path)
+                        done.add(path)
+                    except Exception as e:
+                        errors.append(f"{path}: {str(e)}")
+                wx.CallAfter(self.status_bar.SetStatusText, f"正在{action}: {len(done)}/{count}", 0)
+            wx.CallAfter(self.on_dedupe_done, tab, done, errors, skipped)
             
-            # 排序：文件夹优先，然后按名称排序
-            items.sort(key=lambda x: (not x[1], x[0].lower()))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_dedupe_done(self, tab, done, errors, skipped):
+        """处理完成后从结果中移除已处理的文件，报告失败和跳过的文件"""
+        if not self or not (tab in self.tabs['left'] or tab in self.tabs['right']):
+            return
+        for group in tab['dup_groups']:
+            group.paths = [p for p in group.paths if p not in done]
+        tab['dup_groups'] = [g for g in tab['dup_groups'] if len(g.paths) > 1]
+        self.render_duplicates(tab)
+        if errors:
+            wx.MessageBox(f"{len(errors)} 个文件处理失败:\n" + "\n".join(errors[:10]), "错误", wx.OK | wx.ICON_ERROR)
+        if skipped:
+            wx.MessageBox(f"{len(skipped)} 个文件在扫描后有变化，未处理（请重新查找）:\n" + "\n".join(skipped[:10]),
+                          "已跳过", wx.OK | wx.ICON_WARNING)
+
+    def start_disk_usage(self, event):
+        """分析选中的文件夹（未选中时为当前目录）的磁盘占用"""
+        current_tab = self.get_current_tab()
+        if not current_tab or current_tab['kind'] != "dir":
+            return
             
-            # 添加到列表
-            for idx, (name, is_dir, size, modified, full_path) in enumerate(items):
-                if name == "..":
-                    icon = wx.ArtProvider.GetBitmap(wx.ART_GO_UP, wx.ART_OTHER, (16, 16))
-                else:
-                    icon = self.folder_icon if is_dir else self.get_file_type_icon(full_path)
-                
-                icon_idx = icon_list.Add(icon)
-                list_ctrl.InsertItem(idx, "")
-                list_ctrl.SetItemImage(idx, icon_idx)
-                list_ctrl.SetItem(idx, 1, name)
-                list_ctrl.SetItem(idx, 2, self.format_size(size) if not is_dir and name != ".." else "")
-                list_ctrl.SetItem(idx, 3, modified if name != ".." else "")
-                
-                # 恢复选中状态
-                if name in selected_items:
-                    list_ctrl.SetItemState(idx, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
+        root = current_tab['path']
+        selected = self.get_selected_paths(current_tab)
+        dirs = {item[4] for item in current_tab['items'] if item[1] and item[0] != ".."}
+        if len(selected) == 1 and selected[0] in dirs:
+            root = selected[0]
             
-            # 恢复滚动位置
-            if top_item >= 0 and top_item < list_ctrl.GetItemCount():
-                list_ctrl.EnsureVisible(top_item)
+        side = "left" if current_tab in self.tabs['left'] else "right"
+        title = "磁盘占用 - " + (os.path.basename(root) or root)
+        tools = [
+            ("上一级", wx.ART_GO_UP, "显示上一级目录", lambda evt: self.disk_usage_up(tab)),
+            ("停止扫描", wx.ART_CROSS_MARK, "停止扫描，保留已统计的结果", lambda evt: tab['du_scanner'].cancel()),
+            ("重新扫描", wx.ART_REDO, "重新扫描整个目录树", lambda evt: self.rescan_disk_usage(tab)),
+        ]
+        columns = [("占比", 60), ("路径", 360), ("大小", 100), ("文件数", 80)]
+        tab = self.add_tool_tab(side, "diskusage", title, root, columns, tools)
+        tab['du_root'] = root
+        tab['du_scanner'] = None
+        
+        # 树图放在路径栏和列表之间
+        tab['treemap'] = TreemapView(tab['panel'],
+                                     lambda path: self.select_disk_usage_item(tab, path),
+                                     lambda path: self.show_disk_usage_node(tab, path))
+        tab['panel'].GetSizer().Insert(2, tab['treemap'], 1, wx.EXPAND | wx.LEFT | wx.RIGHT, 5)
+        tab['panel'].Layout()
+        self.rescan_disk_usage(tab)
+
+    def rescan_disk_usage(self, tab):
+        """（重新）扫描整个目录树，扫描过程中由定时器逐步刷新"""
+        if tab['du_scanner']:
+            tab['du_scanner'].cancel()
+        scanner = DiskUsageScanner(tab['du_root'])
+        tab['du_scanner'] = scanner
+        tab['du_version'] = -1
+        self.show_disk_usage_node(tab, tab['du_root'])
+        scanner.start()
+        self.disk_usage_timer.Start(500)
+
+    def on_disk_usage_timer(self, event):
+        """只在合计有变化时重绘，全部扫描结束后停止定时器"""
+        running = False
+        for tab in self.tabs['left'] + self.tabs['right']:
+            if tab['kind'] != "diskusage":
+                continue
+            scanner = tab['du_scanner']
+            running = running or not scanner.finished
+            if scanner.version != tab['du_version']:
+                tab['du_version'] = scanner.version
+                self.render_disk_usage(tab)
+        if not running:
+            self.disk_usage_timer.Stop()
+
+    def show_disk_usage_node(self, tab, path):
+        """下钻到 path，直接使用已统计的合计，不重新扫描"""
+        scanner = tab['du_scanner']
+        node = scanner.find(path)
+        if node is None:
+            return
+        tab['du_node'] = node
+        tab['path'] = node.path
+        tab['path_ctrl'].SetValue(node.path)
+        tab['treemap'].set_node(scanner, node)
+        self.render_disk_usage(tab)
+
+    def disk_usage_up(self, tab):
+        node = tab['du_node']
+        if node.parent is not None:
+            self.show_disk_usage_node(tab, node.parent.path)
+
+    def render_disk_usage(self, tab):
+        """按大小排列当前目录的子目录和大文件，保留原有的选择"""
+        scanner = tab['du_scanner']
+        node = tab['du_node']
+        list_ctrl = tab['list']
+        selected = set(self.get_selected_paths(tab))
+        
+        rows = [(child.path, True, child.total, child.file_count, child.complete)
+                for child in scanner.sorted_children(node)]
+        rows.extend((os.path.join(node.path, name), False, size, 1, True) for size, name in node.large_files)
+        rows.sort(key=lambda row: row[2], reverse=True)
+        if node.parent is not None:
+            rows.insert(0, ("..", True, 0, 0, True))
             
-            # 更新状态栏
-            total_items = len(items) - (1 if items and items[0][0] == ".." else 0)
-            folders = sum(1 for item in items if item[1] and item[0] != "..")
-            files = total_items - folders
-            self.status_bar.SetStatusText(f"文件夹: {folders}, 文件: {files}", 0)
+        total = node.total or 1
+        pending_colour = wx.SystemSettings.GetColour(wx.SYS_COLOUR_GRAYTEXT)
+        items = []
+        list_ctrl.Freeze()
+        list_ctrl.DeleteAllItems()
+        for index, (path, is_dir, size, count, complete) in enumerate(rows):
+            items.append((path, is_dir, size, "", node.parent.path if path == ".." else path))
+            list_ctrl.InsertItem(index, f"{size * 100 / total:.1f}%" if path != ".." else "")
+            list_ctrl.SetItem(index, 1, path)
+            if path != "..":
+                list_ctrl.SetItem(index, 2, self.format_size(size))
+                list_ctrl.SetItem(index, 3, str(count))
+            if not complete:
+                list_ctrl.SetItemTextColour(index, pending_colour)
+            if path in selected:
+                list_ctrl.Select(index)
+        list_ctrl.Thaw()
+        tab['items'] = items
+        tab['treemap'].update()
+        
+        state = "已完成" if scanner.finished else ("已停止" if scanner.cancel_event.is_set() else "扫描中")
+        others = node.own_files - len(node.large_files)
+        text = f"磁盘占用({state}): {self.format_size(node.total)}, {node.file_count} 个文件, 已扫描 {scanner.dirs_scanned} 个目录"
+        if others > 0:
+            text += f"; 另有 {others} 个较小的文件共 {self.format_size(node.other_size)}"
+        if scanner.errors:
+            text += f", {scanner.errors} 个目录无法读取"
+        self.status_bar.SetStatusText(text, 0)
+
+    def select_disk_usage_item(self, tab, path):
+        """在树图中点击后选中列表中对应的行"""
+        list_ctrl = tab['list']
+        for index, item in enumerate(tab['items']):
+            selected = item[0] == path
+            list_ctrl.SetItemState(index, wx.LIST_STATE_SELECTED if selected else 0, wx.LIST_STATE_SELECTED)
+            if selected:
+                list_ctrl.EnsureVisible(index)
+
+    def start_flat_view(self, event):
+        """在新标签页中列出选中的文件夹（未选中时为当前目录）下所有层级的文件"""
+        current_tab = self.get_current_tab()
+        if not current_tab or current_tab['kind'] != "dir" or self.archives.archive_of(current_tab['path']):
+            return
             
-        except Exception as e:
-            wx.LogError(f"无法访问目录 {current_path}：{str(e)}")
+        root = current_tab['path']
+        selected = self.get_selected_paths(current_tab)
+        dirs = {item[4] for item in current_tab['items'] if item[1] and item[0] != ".."}
+        if len(selected) == 1 and selected[0] in dirs:
+            root = selected[0]
             
-        # 调整列宽
-        self.adjust_list_columns(list_ctrl)
-    
-    def format_size(self, size):
-        """将文件大小转换为人类可读的格式"""
-        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-            if size < 1024.0:
-                if unit == 'B':
-                    return f"{int(size)} {unit}"
-                return f"{size:.2f} {unit}"
-            size /= 1024.0
-        return f"{size:.2f} PB"
-    
-    # 其余方法实现（new_folder, delete_items等）...
-    
+        side = "left" if current_tab in self.tabs['left'] else "right"
+        title = "扁平列表 - " + (os.path.basename(root) or root)
+        tools = [
+            ("停止扫描", wx.ART_CROSS_MARK, "停止扫描，保留已列出的文件", lambda evt: tab['flat'].cancel()),
+            ("重新扫描", wx.ART_REDO, "重新列出所有文件", lambda evt: self.rescan_flat_view(tab)),
+        ]
+        columns = [("", 30), ("相对路径", 360), ("大小", 100), ("修改日期", 150)]
+        tab = self.add_tool_tab(side, "flat", title, root, columns, tools,
+                                list_factory=lambda parent: FlatListCtrl(parent, self.format_size))
+        tab['flat'] = None
+        tab['list'].Bind(wx.EVT_LIST_COL_CLICK, lambda evt: self.sort_flat_view(tab, evt.GetColumn()))
+        self.rescan_flat_view(tab)
+
+    def rescan_flat_view(self, tab):
+        """（重新）遍历目录树，沿用原来的排序方式"""
+        old = tab['flat']
+        listing = FlatListing(tab['path'])
+        if old:
+            old.cancel()
+            listing.set_sort(old.sort_key, old.descending)
+        tab['flat'] = listing
+        tab['flat_version'] = -1
+        tab['list'].set_view(listing, None, 0)
+        listing.start()
+        self.flat_timer.Start(300)
+
+    def sort_flat_view(self, tab, column):
+        """点击列标题排序：大小和日期默认从大到小，再次点击反向"""
+        listing = tab['flat']
+        key = FlatListCtrl.SORT_COLUMNS.get(column)
+        if not listing or key is None:
+            return
+        if listing.sort_key == key:
+            descending = not listing.descending
+        else:
+            descending = key != "path"
+        listing.set_sort(key, descending)
+        self.flat_timer.Start(300)
+        self.update_flat_status(tab)
+
+    def on_flat_timer(self, event):
+        """有新文件或新的排序结果时刷新扁平列表，全部结束后停止定时器"""
+        running = False
+        for tab in self.tabs['left'] + self.tabs['right']:
+            if tab['kind'] != "flat":
+                continue
+            listing = tab['flat']
+            running = running or not listing.finished or listing.sort_pending()
+            if listing.version != tab['flat_version']:
+                tab['flat_version'] = listing.version
+                self.refresh_flat_view(tab)
+        if not running:
+            self.flat_timer.Stop()
+
+    def refresh_flat_view(self, tab):
+        """换用新的排列，选中的文件在新位置上保持选中"""
+        list_ctrl = tab['list']
+        listing = tab['flat']
+        selected = []
+        item = -1
+        while len(selected) <= 100:
+            item = list_ctrl.GetNextItem(item, wx.LIST_NEXT_ALL, wx.LIST_STATE_SELECTED)
+            if item == -1:
+                break
+            selected.append(list_ctrl.entry(item))
+        focused = list_ctrl.GetFocusedItem()
+        focused = list_ctrl.entry(focused) if focused != -1 else None
+        
+        order, count = listing.snapshot()
+        if order is list_ctrl.order and count == list_ctrl.GetItemCount():
+            self.update_flat_status(tab)
+            return
+        reordered = order is not list_ctrl.order
+        list_ctrl.set_view(listing, order, count)
+        if reordered and selected:
+            # 选中的行太多时不再逐个查找新位置
+            list_ctrl.SetItemState(-1, 0, wx.LIST_STATE_SELECTED)
+            if len(selected) <= 100:
+                for index in selected:
+                    row = listing.row_of(order, index)
+                    if row is not None:
+                        list_ctrl.SetItemState(row, wx.LIST_STATE_SELECTED, wx.LIST_STATE_SELECTED)
+            row = listing.row_of(order, focused) if focused is not None else None
+            if row is not None:
+                list_ctrl.Focus(row)
+        self.update_flat_status(tab)
+
+    def update_flat_status(self, tab):
+        listing = tab['flat']
+        if listing.finished:
+            state = "已停止" if listing.cancel_event.is_set() else "已完成"
+        else:
+            state = "扫描中"
+        text = f"扁平列表({state}): {listing.count} 个文件, 已扫描 {listing.dirs_scanned} 个目录"
+        if listing.sort_pending():
+            text += ", 正在排序..."
+        if listing.truncated:
+            text += f", 文件数超过上限, 只列出前 {listing.max_entries} 个"
+        if listing.errors:
+            text += f", {listing.errors} 个目录无法读取"
+        self.status_bar.SetStatusText(text, 0)
+
     def on_context_menu(self, event):
         """显示上下文菜单"""
         current_tab = self.get_current_tab()
@@ -957,19 +3726,38 @@ class FileExplorerFrame(wx.Frame):
             return
             
         current_tab = self.get_current_tab()
-        if not current_tab:
+        if not current_tab or not self.check_writable(current_tab):
             return
             
         dest = current_tab['path']
-        try:
-            for src in self.clipboard["paths"]:
-                if self.clipboard["type"] == "copy":
-                    shutil.copy2(src, dest)
-                else:  # 剪切操作
-                    shutil.move(src, dest)
-            self.refresh_file_list()
-        except Exception as e:
-            wx.LogError(f"操作失败：{str(e)}")
+        if self.clipboard["paths"] and self.archives.archive_of(self.clipboard["paths"][0]):
+            # 从归档中复制：流式解压到当前文件夹
+            self.extract_archive_items(self.clipboard["paths"], dest, current_tab)
+            return
+        # 在后台复制或移动：远程位置之间按块流式传输，不卡住界面
+        paths = list(self.clipboard["paths"])
+        move = self.clipboard["type"] != "copy"
+        self.status_bar.SetStatusText(f"正在{'移动' if move else '复制'} {len(paths)} 项...", 0)
+        
+        def worker():
+            error = None
+            try:
+                for src in paths:
+                    self.vfs.copy(src, dest, move=move)
+            except Exception as e:
+                error = e
+            wx.CallAfter(self.on_pasted, dest, paths if move else [], error)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_pasted(self, dest, moved, error):
+        if not self:
+            return
+        self.status_bar.SetStatusText("", 0)
+        self.refresh_tabs_at(dest)
+        for folder in {self.vfs.dirname(path) for path in moved}:
+            self.refresh_tabs_at(folder)
+        if error:
+            wx.LogError(f"操作失败：{str(error)}")
 
     def on_forward(self, event):
         """前进到下一个目录"""
@@ -981,7 +3769,7 @@ class FileExplorerFrame(wx.Frame):
         if len(history) > 1:
             current_path = history[-1]
             next_path = history[0]  # 获取最早的路径
-            if os.path.exists(next_path) and next_path != current_path:
+            if next_path != current_path:
                 history.rotate(-1)  # 循环移动历史记录
                 self.navigate_to(next_path)
 
@@ -1003,55 +3791,334 @@ class FileExplorerFrame(wx.Frame):
             if index == -1:
                 return
                 
+            if current_tab['kind'] == "diskusage" and current_tab['items'][index][1]:
+                self.show_disk_usage_node(current_tab, current_tab['items'][index][4])
+                return
+                
             name = list_ctrl.GetItem(index, 1).GetText()
-            path = os.path.join(current_tab['path'], name)
+            path = self.vfs.join(current_tab['path'], name)
+            if current_tab['kind'] == "flat":
+                # 扁平列表中只有文件
+                self.status_bar.SetStatusText(f"正在打开 {path} ...", 0)
+                self.prober.run(path, open_file, lambda p, result: wx.CallAfter(self.on_file_opened, p, result),
+                                timeout=10.0)
+                return
+            # 是否为文件夹使用列表中已有的信息，不在界面线程访问磁盘
+            items = current_tab['items']
             
             if name == "..":
                 # 导航到上级目录
-                parent = os.path.dirname(current_tab['path'])
+                parent = self.vfs.dirname(current_tab['path'])
                 if parent and parent != current_tab['path']:
                     self.navigate_to(parent)
-            elif os.path.isdir(path):
+            elif index < len(items) and items[index][1]:
                 # 导航到子目录
                 self.navigate_to(path)
+            elif self.archives.archive_of(path):
+                # 归档中的文件解压到临时文件夹后打开
+                self.open_archive_member(path)
+            elif not self.vfs.is_local(path):
+                # 远程文件下载到临时文件夹后打开
+                self.open_remote_file(path)
+            elif is_archive_name(name):
+                # 归档作为文件夹打开
+                self.navigate_to(path)
             else:
-                # 打开文件
-                try:
-                    os.startfile(path)
-                except Exception as e:
-                    # 尝试使用默认应用打开
-                    try:
-                        import subprocess
-                        subprocess.run(['start', '', path], shell=True, check=True)
-                    except Exception as sub_e:
-                        wx.MessageBox(f"无法打开文件: {str(e)}\n{str(sub_e)}", "错误", wx.OK | wx.ICON_ERROR)
+                # 打开文件（在后台打开，网络路径失去响应时不会卡住界面）
+                self.status_bar.SetStatusText(f"正在打开 {path} ...", 0)
+                self.prober.run(path, open_file, lambda p, result: wx.CallAfter(self.on_file_opened, p, result),
+                                timeout=10.0)
                         
         except Exception as e:
             wx.LogError(f"处理双击事件失败: {str(e)}")
 
+    def on_file_opened(self, path, result):
+        if not self:
+            return
+        self.status_bar.SetStatusText("", 0)
+        if result is None:
+            return
+        if result.error in (TIMEOUT, UNRESPONSIVE):
+            message = "该位置没有响应"
+        else:
+            message = str(result.error)
+        wx.MessageBox(f"无法打开文件: {path}\n{message}", "错误", wx.OK | wx.ICON_ERROR)
+
+    def open_archive_member(self, path):
+        """把归档中的单个文件解压到临时文件夹，再用关联的程序打开"""
+        self.status_bar.SetStatusText(f"正在解压 {os.path.basename(path)} ...", 0)
+        
+        def worker():
+            try:
+                temp_dir = tempfile.mkdtemp(prefix="wx_explorer_")
+                ExtractJob(self.archives, [path], temp_dir).run()
+                result = open_file(os.path.join(temp_dir, os.path.basename(path)))
+            except Exception as e:
+                result = ProbeResult(False, False, False, e)
+            wx.CallAfter(self.on_file_opened, path, result)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def open_remote_file(self, path):
+        """把远程文件下载到临时文件夹，再用关联的程序打开"""
+        self.status_bar.SetStatusText(f"正在下载 {self.vfs.basename(path)} ...", 0)
+        
+        def worker():
+            try:
+                temp_dir = tempfile.mkdtemp(prefix="wx_explorer_")
+                result = open_file(self.vfs.copy(path, temp_dir))
+            except Exception as e:
+                result = ProbeResult(False, False, False, e)
+            wx.CallAfter(self.on_file_opened, path, result)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def extract_archive_items(self, paths, dest, dest_tab=None):
+        """把归档中的项目流式解压到 dest，显示进度和速度，可以取消"""
+        job = ExtractJob(self.archives, paths, dest)
+        dialog = wx.ProgressDialog("解压", f"正在解压到 {dest}", maximum=1000, parent=self,
+                                   style=wx.PD_CAN_ABORT | wx.PD_APP_MODAL | wx.PD_ELAPSED_TIME)
+        
+        def worker():
+            try:
+                job.run()
+                error = None
+            except Exception as e:
+                error = e
+            wx.CallAfter(self.on_extract_done, job, dialog, dest_tab, error)
+        threading.Thread(target=worker, daemon=True).start()
+        wx.CallLater(200, self.on_job_tick, job, dialog)
+
+    def on_job_tick(self, job, dialog):
+        """定时更新解压或压缩的进度"""
+        if not self or job.finished:
+            return
+        elapsed = time.monotonic() - (job.started or time.monotonic())
+        speed = job.done_bytes / elapsed if elapsed > 0 else 0
+        value = int(job.done_bytes * 1000 / job.total_bytes) if job.total_bytes else 0
+        message = (f"{os.path.basename(job.current)}\n{self.format_size(min(job.done_bytes, job.total_bytes))} / "
+                   f"{self.format_size(job.total_bytes)}，{self.format_size(speed)}/s")
+        if isinstance(job, ArchiveJob) and job.done_bytes:
+            message += f"\n已写入 {self.format_size(job.out_bytes)}（{job.out_bytes * 100 // job.done_bytes}%）"
+        keep_going, skip = dialog.Update(min(value, 999), message)
+        if not keep_going:
+            job.cancel()
+        wx.CallLater(200, self.on_job_tick, job, dialog)
+
+    def on_extract_done(self, job, dialog, dest_tab, error):
+        if not self:
+            return
+        dialog.Destroy()
+        if dest_tab:
+            self.refresh_file_list(dest_tab)
+        if isinstance(error, InterruptedError):
+            self.status_bar.SetStatusText(f"解压已取消，已完成 {job.files} 个文件", 0)
+        elif error:
+            wx.MessageBox(f"解压失败: {str(error)}", "错误", wx.OK | wx.ICON_ERROR)
+        else:
+            skipped = f"，{job.skipped} 个已存在的文件被跳过" if job.skipped else ""
+            self.status_bar.SetStatusText(f"已解压 {job.files} 个文件（{self.format_size(job.done_bytes)}）{skipped}", 0)
+
+    def extract_to_other_side(self, paths, tab):
+        """把归档中选中的项目解压到另一侧的当前文件夹"""
+        other = self.get_current_tab("right" if tab in self.tabs['left'] else "left")
+        if not other or other['kind'] != "dir" or self.archives.archive_of(other['path']):
+            wx.MessageBox("另一侧没有可写入的文件夹", "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+        self.extract_archive_items(paths, other['path'], other)
+
+    def compress_items(self, paths, tab):
+        """把选中的项目压缩为归档，默认保存到另一侧的当前文件夹"""
+        other = self.get_current_tab("right" if tab in self.tabs['left'] else "left")
+        if other and other['kind'] == "dir" and not self.archives.archive_of(other['path']):
+            folder = other['path']
+        else:
+            folder = tab['path']
+        if len(paths) == 1:
+            name = os.path.splitext(os.path.basename(paths[0]))[0] if self.item_is_dir(tab, paths[0]) is False \
+                else os.path.basename(paths[0])
+        else:
+            name = os.path.basename(os.path.normpath(tab['path'])) or "archive"
+
+        dlg = CompressDialog(self, name, folder)
+        if dlg.ShowModal() != wx.ID_OK:
+            dlg.Destroy()
+            return
+        options = dlg.get_options()
+        dlg.Destroy()
+        dest = options["dest"]
+        if os.path.exists(dest):
+            wx.MessageBox(f"{dest} 已存在", "错误", wx.OK | wx.ICON_ERROR)
+            return
+
+        job = ArchiveJob(paths, dest, options["format"])
+        dialog = wx.ProgressDialog("压缩", f"正在压缩到 {dest}", maximum=1000, parent=self,
+                                   style=wx.PD_CAN_ABORT | wx.PD_APP_MODAL | wx.PD_ELAPSED_TIME)
+
+        def worker():
+            try:
+                job.run()
+                error = None
+            except Exception as e:
+                error = e
+            wx.CallAfter(self.on_compress_done, job, dialog, error)
+        threading.Thread(target=worker, daemon=True).start()
+        wx.CallLater(200, self.on_job_tick, job, dialog)
+
+    def on_compress_done(self, job, dialog, error):
+        if not self:
+            return
+        dialog.Destroy()
+        self.refresh_tabs_at(os.path.dirname(job.dest))
+        if isinstance(error, InterruptedError):
+            self.status_bar.SetStatusText("压缩已取消", 0)
+            return
+        if error:
+            wx.MessageBox(f"压缩失败: {str(error)}", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        elapsed = max(time.monotonic() - job.started, 0.001)
+        self.status_bar.SetStatusText(
+            f"已压缩 {job.files} 个文件：{self.format_size(job.done_bytes)} → {self.format_size(job.out_bytes)}，"
+            f"{self.format_size(job.done_bytes / elapsed)}/s", 0)
+        problems = [f"{path}: {e}" for path, e in job.errors]
+        problems += [f"{path}: 压缩过程中文件大小发生了变化" for path in job.changed]
+        if problems:
+            wx.MessageBox("以下文件未能完整压缩:\n" + "\n".join(problems[:20]), "提示", wx.OK | wx.ICON_WARNING)
+
+    def export_listing(self, recursive=False):
+        """把当前列表导出为 CSV / JSON Lines；recursive 为 True 时包括所有子目录
+
+        行在后台线程中边读取边写出：目录直接重新列出，扁平列表按当前排序读取，其他结果标签页按显示的列导出。
+        """
+        tab = self.get_current_tab()
+        if not tab:
+            return
+        fields = EXPORT_FIELDS
+        if tab['kind'] == "dir":
+            # 归档和远程位置导出列表中已有的项目
+            listed = self.archives.archive_of(tab['path']) or not self.vfs.is_local(tab['path'])
+            if recursive and listed:
+                wx.MessageBox("归档和远程文件夹不能包括子目录导出", "提示", wx.OK | wx.ICON_INFORMATION)
+                return
+            if recursive:
+                rows = tree_rows(tab['path'])
+            elif listed:
+                rows = (make_row(self.vfs.join(tab['path'], entry.name), entry.name, entry.is_dir, entry.size,
+                                 entry.mtime) for entry in list(tab['entries']))
+            else:
+                rows = directory_rows(tab['path'])
+        elif tab['kind'] == "flat":
+            rows = flat_rows(tab['flat'])
+        else:
+            # 结果标签页的行数有限，在界面线程中取出显示的文字
+            list_ctrl = tab['list']
+            columns = [column for column in range(list_ctrl.GetColumnCount())
+                       if list_ctrl.GetColumn(column).GetText()]
+            fields = [list_ctrl.GetColumn(column).GetText() for column in columns]
+            rows = [[list_ctrl.GetItemText(index, column) for column in columns]
+                    for index in range(list_ctrl.GetItemCount())]
+            
+        name = os.path.basename(os.path.normpath(tab['path'])) or "listing"
+        dlg = wx.FileDialog(self, "导出列表", defaultFile=name + ".csv",
+                            wildcard="CSV 文件 (*.csv)|*.csv|JSON Lines 文件 (*.jsonl)|*.jsonl",
+                            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+        if dlg.ShowModal() != wx.ID_OK:
+            dlg.Destroy()
+            return
+        dest = dlg.GetPath()
+        fmt = "jsonl" if dlg.GetFilterIndex() == 1 else "csv"
+        dlg.Destroy()
+        
+        job = ExportJob(rows, dest, fmt, fields)
+        dialog = wx.ProgressDialog("导出列表", f"正在导出到 {dest}", parent=self,
+                                   style=wx.PD_CAN_ABORT | wx.PD_APP_MODAL | wx.PD_ELAPSED_TIME)
+        
+        def worker():
+            try:
+                job.run()
+                error = None
+            except Exception as e:
+                error = e
+            wx.CallAfter(self.on_export_done, job, dialog, error)
+        threading.Thread(target=worker, daemon=True).start()
+        wx.CallLater(200, self.on_export_tick, job, dialog)
+
+    def on_export_tick(self, job, dialog):
+        """行数事先未知，进度条只显示已写出的行数"""
+        if not self or job.finished:
+            return
+        keep_going, skip = dialog.Pulse(f"已导出 {job.rows} 行\n{job.current}")
+        if not keep_going:
+            job.cancel()
+        wx.CallLater(200, self.on_export_tick, job, dialog)
+
+    def on_export_done(self, job, dialog, error):
+        if not self:
+            return
+        dialog.Destroy()
+        self.refresh_tabs_at(os.path.dirname(job.dest))
+        if isinstance(error, InterruptedError):
+            self.status_bar.SetStatusText("导出已取消", 0)
+        elif error:
+            wx.MessageBox(f"导出失败: {str(error)}", "错误", wx.OK | wx.ICON_ERROR)
+        else:
+            self.status_bar.SetStatusText(f"已导出 {job.rows} 行到 {job.dest}", 0)
+
+    def check_writable(self, tab):
+        """归档中的内容是只读的，返回是否可以修改 tab 中的文件"""
+        if tab and self.archives.archive_of(tab['path']):
+            wx.MessageBox("归档中的内容是只读的，请先解压", "提示", wx.OK | wx.ICON_INFORMATION)
+            return False
+        return True
+
     def preview_image(self, path):
         """图片预览窗口"""
         preview_win = wx.Frame(self, title="图片预览 - " + os.path.basename(path))
         img = wx.Image(path, wx.BITMAP_TYPE_ANY)
-        img = img.Scale(800, 600, wx.IMAGE_QUALITY_HIGH)
+        width, height = fit_size(img.GetWidth(), img.GetHeight(), 800, 600)
+        img = img.Scale(width, height, wx.IMAGE_QUALITY_HIGH)
         wx.StaticBitmap(preview_win, bitmap=wx.Bitmap(img)).SetFocus()
+        preview_win.SetClientSize(width, height)
         preview_win.Show()
 
-    def preview_text(self, path):
-        """文本预览窗口"""
-        preview_win = wx.Frame(self, title="文本预览 - " + os.path.basename(path))
-        text_ctrl = wx.TextCtrl(preview_win, style=wx.TE_MULTILINE|wx.TE_READONLY)
-        with open(path, 'r', encoding='utf-8') as f:
-            text_ctrl.SetValue(f.read())
+    def preview_text(self, path, follow=False):
+        """文本预览窗口；是否为二进制文件由 prober 在后台判断"""
+        if follow:
+            TextPreviewFrame(self, path, follow=True).Show()
+            return
+        self.prober.run(path, is_binary_file, lambda p, result: wx.CallAfter(self.on_preview_probed, p, result))
+
+    def on_preview_probed(self, path, result):
+        if not self:
+            return
+        if isinstance(result, ProbeResult):
+            message = "该位置没有响应" if result.error in (TIMEOUT, UNRESPONSIVE) else str(result.error)
+            wx.MessageBox(f"无法打开文件: {path}\n{message}", "错误", wx.OK | wx.ICON_ERROR)
+        elif result:
+            self.preview_hex(path)
+        else:
+            TextPreviewFrame(self, path).Show()
+
+    def preview_hex(self, path):
+        """十六进制查看窗口"""
+        try:
+            preview_win = HexViewFrame(self, path)
+        except OSError as e:
+            wx.MessageBox(f"无法打开文件: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+            return
         preview_win.Show()
 
+    def show_checksums(self, paths, tab):
+        """计算选中文件的校验和"""
+        base_dir = tab['path'] if tab and tab['kind'] == "dir" else os.path.dirname(paths[0])
+        dlg = ChecksumDialog(self, paths, base_dir, self.checksum_cache)
+        dlg.Show()
+
     def on_up(self, event):
         """导航到上级目录"""
         current_tab = self.get_current_tab()
         if not current_tab:
             return
             
-        parent = os.path.dirname(current_tab['path'])
+        parent = self.vfs.dirname(current_tab['path'])
         if parent and parent != current_tab['path']:
             self.navigate_to(parent)
 
@@ -1068,23 +4135,42 @@ class FileExplorerFrame(wx.Frame):
     def delete_items(self, event):
         """删除选中的项目"""
         paths = self.get_selected_paths()
-        if not paths:
+        if not paths or not self.check_writable(self.get_current_tab()):
             return
             
         count = len(paths)
-        msg = f"确定要删除选中的 {count} 个项目吗？\n这些项目将被移动到回收站。"
+        if self.vfs.supports_trash(paths[0]):
+            msg = f"确定要删除选中的 {count} 个项目吗？\n这些项目将被移动到回收站。"
+        else:
+            msg = f"确定要删除选中的 {count} 个项目吗？\n该位置没有回收站，这些项目将被永久删除！"
         dlg = wx.MessageDialog(self, msg, "确认删除",
                              wx.YES_NO | wx.NO_DEFAULT | wx.ICON_QUESTION)
-                             
-        if dlg.ShowModal() == wx.ID_YES:
+        confirmed = dlg.ShowModal() == wx.ID_YES
+        dlg.Destroy()
+        if not confirmed:
+            return
+        self.status_bar.SetStatusText(f"正在删除 {count} 项...", 0)
+        
+        def worker():
+            error = None
             for path in paths:
                 try:
-                    send2trash.send2trash(path)
+                    self.vfs.trash(path)
                 except Exception as e:
-                    wx.MessageBox(f"删除失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+                    error = e
                     break
-            self.refresh_file_list()
-        dlg.Destroy()
+            wx.CallAfter(self.on_deleted, paths, error)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_deleted(self, paths, error):
+        if not self:
+            return
+        self.status_bar.SetStatusText("", 0)
+        for folder in {self.vfs.dirname(path) for path in paths}:
+            self.path_completions.subdirs.invalidate(folder)
+            self.refresh_tabs_at(folder)
+        if error:
+            wx.MessageBox(f"删除失败: {str(error)}", "错误", wx.OK | wx.ICON_ERROR)
 
     def on_path_enter(self, event):
         """处理路径输入框回车事件"""
@@ -1101,17 +4187,11 @@ class FileExplorerFrame(wx.Frame):
             path = os.path.expanduser(path)
             
             # 如果是相对路径，转换为绝对路径
-            if not os.path.isabs(path):
-                path = os.path.join(current_tab['path'], path)
-            
-            # 规范化路径
-            path = os.path.normpath(path)
+            if not self.vfs.isabs(path):
+                path = self.vfs.join(current_tab['path'], path)
             
-            if os.path.exists(path):
-                self.navigate_to(path)
-            else:
-                wx.MessageBox("路径不存在", "错误", wx.OK | wx.ICON_ERROR)
-                current_tab['path_ctrl'].SetValue(current_tab['path'])
+            # 规范化路径，是否存在由 navigate_to 在后台检查
+            self.navigate_to(path)
                 
         except Exception as e:
             wx.LogError(f"处理路径输入失败: {str(e)}")
@@ -1128,9 +4208,10 @@ class FileExplorerFrame(wx.Frame):
             if width <= 0:
                 return
                 
-            # 预留滚动条宽度
+            # 预留滚动条和附加列的宽度
             scrollbar_width = wx.SystemSettings.GetMetric(wx.SYS_VSCROLL_X)
-            width = max(0, width - scrollbar_width)
+            extra_width = sum(list_ctrl.GetColumnWidth(i) for i in range(BASE_COLUMN_COUNT, list_ctrl.GetColumnCount()))
+            width = max(0, width - scrollbar_width - extra_width)
             
             # 设置列宽
             list_ctrl.SetColumnWidth(0, 30)  # 图标列
@@ -1242,7 +4323,15 @@ class FileExplorerFrame(wx.Frame):
         paste_item = menu.Append(wx.ID_PASTE, "粘贴(&P)\tCtrl+V")
         menu.AppendSeparator()
         
+        tail_item = menu.Append(wx.ID_ANY, "跟踪日志(&L)")
+        hex_item = menu.Append(wx.ID_ANY, "十六进制查看(&H)")
+        checksum_item = menu.Append(wx.ID_ANY, "校验和(&K)...")
+        extract_item = menu.Append(wx.ID_ANY, "解压到另一侧(&X)")
+        compress_item = menu.Append(wx.ID_ANY, "压缩到(&Z)...")
+        menu.AppendSeparator()
+        
         rename_item = menu.Append(wx.ID_ANY, "重命名(&M)\tF2")
+        batch_rename_item = menu.Append(wx.ID_ANY, "批量重命名(&B)...\tCtrl+M")
         delete_item = menu.Append(wx.ID_DELETE, "删除(&D)\tDelete")
         menu.AppendSeparator()
         
@@ -1251,15 +4340,31 @@ class FileExplorerFrame(wx.Frame):
         
         # 设置菜单项状态
         paste_item.Enable(bool(self.clipboard["paths"]))
-        for item in [cut_item, copy_item, rename_item, delete_item, properties_item]:
+        for item in [cut_item, copy_item, rename_item, batch_rename_item, delete_item, properties_item, checksum_item]:
             item.Enable(bool(paths))
+        in_archive = bool(current_tab and self.archives.archive_of(current_tab['path']))
+        # 用列表中已有的类型判断，不在界面线程访问磁盘
+        tail_item.Enable(len(paths) == 1 and not in_archive and self.vfs.is_local(paths[0])
+                         and self.item_is_dir(current_tab, paths[0]) is False)
+        hex_item.Enable(tail_item.IsEnabled())
+        extract_item.Enable(bool(paths) and in_archive)
+        compress_item.Enable(bool(paths) and not in_archive)
+        if in_archive:
+            for item in [cut_item, rename_item, batch_rename_item, delete_item, checksum_item]:
+                item.Enable(False)
         
         # 绑定事件处理器
         menu.Bind(wx.EVT_MENU, self.on_item_activated, open_item)
         menu.Bind(wx.EVT_MENU, self.on_cut, cut_item)
         menu.Bind(wx.EVT_MENU, self.on_copy, copy_item)
         menu.Bind(wx.EVT_MENU, self.on_paste, paste_item)
+        menu.Bind(wx.EVT_MENU, lambda evt: self.preview_text(paths[0], follow=True), tail_item)
+        menu.Bind(wx.EVT_MENU, lambda evt: self.preview_hex(paths[0]), hex_item)
+        menu.Bind(wx.EVT_MENU, lambda evt: self.show_checksums(paths, current_tab), checksum_item)
+        menu.Bind(wx.EVT_MENU, lambda evt: self.extract_to_other_side(paths, current_tab), extract_item)
+        menu.Bind(wx.EVT_MENU, lambda evt: self.compress_items(paths, current_tab), compress_item)
         menu.Bind(wx.EVT_MENU, self.on_rename, rename_item)
+        menu.Bind(wx.EVT_MENU, lambda evt: self.batch_rename(current_tab), batch_rename_item)
         menu.Bind(wx.EVT_MENU, self.delete_items, delete_item)
         menu.Bind(wx.EVT_MENU, lambda evt: self.refresh_file_list(), refresh_item)
         menu.Bind(wx.EVT_MENU, self.show_properties, properties_item)
@@ -1269,26 +4374,183 @@ class FileExplorerFrame(wx.Frame):
             event.GetEventObject().PopupMenu(menu)
         menu.Destroy()
 
+    def item_is_dir(self, tab, path):
+        """按列表中已有的信息判断 path 是否为文件夹，不访问磁盘；不在列表中时返回 None"""
+        for item in (tab['items'] if tab else ()):
+            if item[4] == path:
+                return item[1]
+        if tab and tab['kind'] == "flat":
+            return False  # 扁平列表只有文件，不使用 items
+        return None
+
     def on_rename(self, event):
         """重命名文件或文件夹"""
         paths = self.get_selected_paths()
-        if not paths:
+        if not paths or not self.check_writable(self.get_current_tab()):
+            return
+        if len(paths) > 1:
+            self.batch_rename()
             return
             
-        path = paths[0]  # 只重命名第一个选中项
-        old_name = os.path.basename(path)
+        path = paths[0]
+        old_name = self.vfs.basename(path)
         
         dlg = wx.TextEntryDialog(self, "请输入新名称:", "重命名", old_name)
-        if dlg.ShowModal() == wx.ID_OK:
-            new_name = dlg.GetValue()
-            if new_name and new_name != old_name:
-                try:
-                    new_path = os.path.join(os.path.dirname(path), new_name)
-                    os.rename(path, new_path)
-                    self.refresh_file_list()
-                except Exception as e:
-                    wx.MessageBox(f"重命名失败: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+        new_name = dlg.GetValue() if dlg.ShowModal() == wx.ID_OK else ""
+        dlg.Destroy()
+        if not new_name or new_name == old_name:
+            return
+        folder = self.vfs.dirname(path)
+        new_path = self.vfs.join(folder, new_name)
+        
+        def worker():
+            error = None
+            try:
+                self.vfs.rename(path, new_path)
+            except Exception as e:
+                error = e
+            wx.CallAfter(self.on_renamed, folder, error)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_renamed(self, folder, error):
+        if not self:
+            return
+        self.path_completions.subdirs.invalidate(folder)
+        self.refresh_tabs_at(folder)
+        if error:
+            wx.MessageBox(f"重命名失败: {str(error)}", "错误", wx.OK | wx.ICON_ERROR)
+
+    def batch_rename(self, tab=None):
+        """批量重命名选中的项目，序号按列表中的顺序分配"""
+        tab = tab or self.get_current_tab()
+        if not tab or tab['kind'] != "dir" or not self.check_writable(tab):
+            return
+        if not self.vfs.is_local(tab['path']):
+            wx.MessageBox("批量重命名只支持本地文件夹", "提示", wx.OK | wx.ICON_INFORMATION)
+            return
+        selected = {os.path.basename(path) for path in self.get_selected_paths(tab)}
+        if not selected:
+            return
+        mtimes = {entry.name: entry.mtime for entry in tab['entries']}
+        items = [item for item in tab['items'] if item[0] in selected]
+        renamer = BatchRename([item[0] for item in items], [item[1] for item in items],
+                              [mtimes.get(item[0], 0.0) for item in items], list(mtimes))
+        dlg = BatchRenameDialog(self, renamer)
+        accepted = dlg.ShowModal() == wx.ID_OK
         dlg.Destroy()
+        if not accepted:
+            return
+        try:
+            pairs = renamer.plan()
+        except ValueError as e:
+            wx.MessageBox(str(e), "错误", wx.OK | wx.ICON_ERROR)
+            return
+
+        # 名称互换（a→b、b→a）等情况经由临时名称完成，所有步骤记录在日志中，可以整体撤销
+        steps = order_renames(pairs)
+        directory = tab['path']
+        dialog = wx.ProgressDialog("批量重命名", f"正在重命名 {len(pairs)} 个项目", maximum=len(steps), parent=self,
+                                   style=wx.PD_APP_MODAL | wx.PD_ELAPSED_TIME)
+        state = {"done": 0, "finished": False}
+
+        def worker():
+            try:
+                self.rename_journal.run(directory, steps, lambda done, total: state.update(done=done))
+                error = None
+            except Exception as e:
+                error = e
+            state["finished"] = True
+            wx.CallAfter(self.on_batch_renamed, tab, directory, pairs, dialog, error)
+
+        def tick():
+            if not self or state["finished"]:
+                return
+            dialog.Update(min(state["done"], len(steps)))
+            wx.CallLater(200, tick)
+        threading.Thread(target=worker, daemon=True).start()
+        wx.CallLater(200, tick)
+
+    def on_batch_renamed(self, tab, directory, pairs, dialog, error):
+        if not self:
+            return
+        dialog.Destroy()
+        if error:
+            wx.MessageBox(f"批量重命名失败，已完成的部分已撤回: {str(error)}", "错误", wx.OK | wx.ICON_ERROR)
+            self.refresh_tabs_at(directory)
+            return
+        # 直接在列表中更新改名的行，不重新扫描目录
+        renamed = dict(pairs)
+        if tab['path'] == directory and (tab in self.tabs['left'] or tab in self.tabs['right']):
+            self.apply_listing(tab, [entry._replace(name=renamed.get(entry.name, entry.name))
+                                     for entry in tab['entries']])
+        self.status_bar.SetStatusText(f"已重命名 {len(pairs)} 个项目（Ctrl+Shift+Z 撤销）", 0)
+
+    def undo_batch_rename(self):
+        """撤销最近一次批量重命名"""
+        path = self.rename_journal.last_undoable()
+        if not path:
+            self.status_bar.SetStatusText("没有可以撤销的批量重命名", 0)
+            return
+        if path in self.undoing_journals:
+            self.status_bar.SetStatusText("正在撤销批量重命名，请稍候", 0)
+            return
+        try:
+            directory, steps, done, state = self.rename_journal.read(path)
+        except (OSError, ValueError, KeyError) as e:
+            wx.MessageBox(f"无法读取重命名日志: {str(e)}", "错误", wx.OK | wx.ICON_ERROR)
+            return
+        if wx.MessageBox(f"撤销在 {directory} 中的批量重命名（{len(steps)} 步）？", "撤销批量重命名",
+                         wx.YES_NO | wx.ICON_QUESTION) != wx.YES:
+            return
+        self.start_rename_undo(path, directory)
+
+    def start_rename_undo(self, path, directory):
+        """在后台撤销日志 path 记录的批量重命名（大批量或网络共享上可能需要较长时间）"""
+        if path in self.undoing_journals:
+            return
+        self.undoing_journals.add(path)
+        self.status_bar.SetStatusText(f"正在撤销 {directory} 中的批量重命名...", 0)
+        
+        def worker():
+            error = None
+            try:
+                self.rename_journal.undo(path)
+            except (OSError, ValueError, KeyError) as e:
+                error = e
+            wx.CallAfter(self.on_rename_undone, path, directory, error)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_rename_undone(self, path, directory, error):
+        if not self:
+            return
+        self.undoing_journals.discard(path)
+        self.refresh_tabs_at(directory)
+        if error:
+            self.status_bar.SetStatusText("", 0)
+            wx.MessageBox(f"撤销失败: {str(error)}", "错误", wx.OK | wx.ICON_ERROR)
+        else:
+            self.status_bar.SetStatusText("已撤销批量重命名", 0)
+
+    def recover_rename_journals(self):
+        """启动时检查上次没有完成的批量重命名（程序崩溃），询问是否恢复原来的名称"""
+        for path in self.rename_journal.incomplete():
+            try:
+                directory, steps, done, state = self.rename_journal.read(path)
+                answer = wx.MessageBox(f"上次在 {directory} 中的批量重命名没有完成（{done}/{len(steps)} 步）。\n"
+                                       "是否恢复原来的名称？", "批量重命名", wx.YES_NO | wx.ICON_QUESTION)
+                if answer == wx.YES:
+                    self.start_rename_undo(path, directory)
+                else:
+                    self.rename_journal.abandon(path)
+            except (OSError, ValueError, KeyError) as e:
+                wx.LogError(f"恢复批量重命名失败: {str(e)}")
+
+    def refresh_tabs_at(self, path):
+        """刷新所有显示 path 的标签页"""
+        path = os.path.normcase(os.path.normpath(path))
+        for tab in self.tabs['left'] + self.tabs['right']:
+            if tab['kind'] == "dir" and os.path.normcase(os.path.normpath(tab['path'])) == path:
+                self.refresh_file_list(tab)
 
     def show_properties(self, event):
         """显示文件属性"""
@@ -1308,31 +4570,133 @@ class FileExplorerFrame(wx.Frame):
 
     def on_item_selected(self, event):
         """处理文件项选中事件"""
-        paths = self.get_selected_paths()
-        if not paths:
+        current_tab = self.get_current_tab()
+        if not current_tab:
+            return
+            
+        # 使用刷新列表时已获取的信息，不在界面线程访问磁盘
+        list_ctrl = current_tab['list']
+        items = current_tab['items']
+        selected = []
+        index = -1
+        while True:
+            index = list_ctrl.GetNextItem(index, wx.LIST_NEXT_ALL, wx.LIST_STATE_SELECTED)
+            if index == -1:
+                break
+            if index < len(items) and items[index][0] != "..":
+                selected.append(index)
+                
+        if not selected:
             self.status_bar.SetStatusText("")
+            self.update_preview(None)
             return
             
-        try:
-            total_size = 0
-            for path in paths:
-                if os.path.isfile(path):
-                    total_size += os.path.getsize(path)
+        total_size = sum(items[i][2] for i in selected if not items[i][1])
+        if len(selected) == 1:
+            name, is_dir, size, modified, path = items[selected[0]]
+            if current_tab['kind'] == "diskusage":
+                current_tab['treemap'].selected = path
+                current_tab['treemap'].Refresh()
+                self.status_bar.SetStatusText(f"大小: {self.format_size(size)}")
+            elif is_dir:
+                self.status_bar.SetStatusText("")
+                self.count_children_async(path)
+            else:
+                self.status_bar.SetStatusText(f"文件大小: {self.format_size(total_size)}")
+        else:
+            self.status_bar.SetStatusText(f"选中: {len(selected)} 项, 总大小: {self.format_size(total_size)}")
             
-            if len(paths) == 1:
-                path = paths[0]
-                if os.path.isfile(path):
-                    self.status_bar.SetStatusText(f"文件大小: {self.format_size(total_size)}")
-                else:
-                    items = os.listdir(path)
-                    files = sum(1 for item in items if os.path.isfile(os.path.join(path, item)))
-                    folders = sum(1 for item in items if os.path.isdir(os.path.join(path, item)))
-                    self.status_bar.SetStatusText(f"包含: {folders} 个文件夹, {files} 个文件")
+        self.update_preview(current_tab, selected[-1])
+
+    def count_children_async(self, path):
+        """在后台统计文件夹包含的项目数
+
+        通过 prober 执行：选择变化时取消上一次统计，没有响应的挂载点直接返回，不会为每次选择堆积线程。
+        """
+        if self.count_request:
+            self.count_request.cancel()
+
+        def count(path):
+            folders = files = 0
+            if self.archives.archive_of(path):
+                listing = self.archives.list_dir(path)
+                folders = sum(1 for entry in listing if entry.is_dir)
+                files = len(listing) - folders
             else:
-                self.status_bar.SetStatusText(f"选中: {len(paths)} 项, 总大小: {self.format_size(total_size)}")
-                
-        except Exception as e:
-            self.status_bar.SetStatusText(f"错误: {str(e)}")
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir():
+                            folders += 1
+                        else:
+                            files += 1
+            return folders, files
+
+        self.count_request = self.prober.run(
+            path, count, lambda p, result: wx.CallAfter(self.on_children_counted, p, result))
+
+    def on_children_counted(self, path, result):
+        # 选择已经变化时丢弃结果
+        if not self or path not in self.get_selected_paths():
+            return
+        self.count_request = None
+        if isinstance(result, ProbeResult):
+            if result.error in (TIMEOUT, UNRESPONSIVE):
+                text = "错误: 该位置没有响应"
+            else:
+                text = f"错误: {str(result.error)}"
+        else:
+            text = f"包含: {result[0]} 个文件夹, {result[1]} 个文件"
+        self.status_bar.SetStatusText(text)
+
+    def show_preview_pane(self, show):
+        """显示或隐藏预览窗格"""
+        self.preview_item.Check(show)
+        if show and not self.content_splitter.IsSplit():
+            self.preview_pane.Show()
+            width = self.content_splitter.GetSize().GetWidth()
+            self.content_splitter.SplitVertically(self.splitter, self.preview_pane, int(width * 0.7))
+            self.on_item_selected(None)
+        elif not show and self.content_splitter.IsSplit():
+            self.content_splitter.Unsplit(self.preview_pane)
+            self.preview_loader.cancel()
+
+    def update_preview(self, tab, index=None):
+        """选中项变化时更新预览，并预读上下相邻的文件"""
+        if not self.content_splitter.IsSplit():
+            return
+        if tab is None:
+            self._preview_path = None
+            self.preview_loader.cancel()
+            self.preview_pane.show_message(None, "")
+            return
+            
+        items = tab['items']
+        name, is_dir, size, modified, path = items[index]
+        self._preview_path = path
+        if is_dir:
+            self.preview_loader.cancel()
+            self.preview_pane.show_message(path, "文件夹")
+            return
+        if self.archives.archive_of(path):
+            self.preview_loader.cancel()
+            self.preview_pane.show_message(path, "归档中的文件，双击解压后打开")
+            return
+            
+        neighbors = [items[i][4] for i in (index + 1, index - 1)
+                     if 0 <= i < len(items) and not items[i][1]]
+        cached = self.preview_loader.request(path, neighbors, self.on_preview_loaded)
+        if cached is not None:
+            self.preview_pane.show_result(path, cached)
+        else:
+            self.preview_pane.show_message(path, "正在加载...")
+
+    def on_preview_loaded(self, path, result):
+        """预览加载完成（工作线程回调）"""
+        wx.CallAfter(self.show_loaded_preview, path, result)
+
+    def show_loaded_preview(self, path, result):
+        if self and path == self._preview_path:
+            self.preview_pane.show_result(path, result)
 
     def on_notebook_dclick(self, event, side):
         """处理标签栏空白处双击事件"""
@@ -1389,9 +4753,18 @@ class FileExplorerFrame(wx.Frame):
         if notebook.GetPageText(index) == "+":
             return
             
-        # 保存标签页数据用于恢复
-        tab_data = self.tabs[side][index].copy()
-        self.closed_tabs[side].append(tab_data)
+        tab_data = self.tabs[side][index]
+        if tab_data['kind'] == "diskusage":
+            tab_data['du_scanner'].cancel()
+        if tab_data['kind'] == "flat":
+            tab_data['flat'].cancel()
+        self.metadata_loader.cancel(tab_data['panel'])
+        # 只保存恢复所需的路径和状态，控件和列表随标签页一起释放
+        if tab_data['kind'] == "dir":
+            record = ClosedTab(tab_data['path'], tuple(tab_data['history']), tuple(tab_data['columns']))
+        else:
+            record = ClosedTab(tab_data['path'], (), None)
+        self.closed_tabs[side].append(record)
         
         # 如果没有其他标签页，选中"+"标签页
         if notebook.GetPageCount() == 1:
@@ -1409,7 +4782,7 @@ class FileExplorerFrame(wx.Frame):
     def on_cut(self, event):
         """剪切文件"""
         selected = self.get_selected_paths()
-        if selected:
+        if selected and self.check_writable(self.get_current_tab()):
             self.clipboard = {"type": "cut", "paths": selected}
             self.status_bar.SetStatusText(f"已剪切 {len(selected)} 项", 0)
 
@@ -1453,8 +4826,8 @@ class FileExplorerFrame(wx.Frame):
         
         # 检查是否有已关闭的标签页
         if self.closed_tabs[side]:
-            tab_data = self.closed_tabs[side].pop()
-            self.add_tab(tab_data['path'], side)
+            record = self.closed_tabs[side].pop()
+            self.add_tab(record.path, side, columns=record.columns, history=record.history)
 
     def clear_icon_cache(self):
         """清理图标缓存"""